@@ -1,6 +1,13 @@
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from kennlinie.speicherformat import write_table, with_output_format
+from kennlinie.datenimport import import_cache, load_dataframe
 from tkinter import filedialog, messagebox
 import tkinter as tk
 
@@ -10,85 +17,96 @@ pd.set_option('display.max_columns', None)  # Alle Spalten anzeigen
 pd.set_option('display.width', 1000)  # Anzeigebreite für DataFrame festlegen
 pd.set_option('display.float_format', lambda x: '{:.19f}'.format(x))  # Volle Genauigkeit für Fließkommazahlen
 
-def interpolate_missing_values(df):
-    # Interpoliert fehlende Werte linear und füllt verbleibende NaNs, die nicht interpoliert werden können,
-    # erst von hinten (bfill) und dann von vorne (ffill).
-    return df.interpolate().bfill().ffill()
-
-def read_txt_file(file_path):
-    data_lines = []
-    data_started = False
-    previous_line = None
-    column_names_with_prefix = None
-    column_names_without_prefix = None
-    Kennlinienwerte = None
-
-    with open(file_path, 'r') as file:
-        for line in file:
-            if data_started:
-                data_lines.append(line.strip().split('\t'))
-            elif 'Startkurve' in line:
-                data_started = True
-                if previous_line:
-                    nk_prefix = 'NK_'
-                    oh_prefix = 'OH_'
-                    uh_prefix = 'UH_'
-                    nk_words_with_prefix = [nk_prefix + word for word in previous_line[:2]]
-                    oh_words_with_prefix = [oh_prefix + word for word in previous_line[2:4]]
-                    uh_words_with_prefix = [uh_prefix + word for word in previous_line[4:]]
-                    column_names_with_prefix = nk_words_with_prefix + oh_words_with_prefix + uh_words_with_prefix
-                    column_names_without_prefix = previous_line[:2] + previous_line[2:4] + previous_line[4:]
-
-                    if column_names_without_prefix[0] == 'FeldstÃ¤rke in A/m' and column_names_without_prefix[1] == 'Flussdichte in T':
-                        Kennlinienwerte = 'B(H) - Kennlinie'
-                    elif column_names_without_prefix[0] == 'Zeit in s' and column_names_without_prefix[1] == 'FeldstÃ¤rke in A/m':
-                        Kennlinienwerte = 'H(t) - Kennlinie'
-                    elif column_names_without_prefix[0] == 'Zeit in s' and column_names_without_prefix[1] == 'Strom in A':
-                        Kennlinienwerte = 'I(t) - Kennlinie'
-                    elif column_names_without_prefix[0] == 'Magnetische Spannung, A' and column_names_without_prefix[1] == 'Magnetischer Fluss, Vs':
-                        Kennlinienwerte = 'Phi(Theta) - Kennlinie'
-                    elif column_names_without_prefix[0] == 'Strom in A' and column_names_without_prefix[1] == 'Verketteter magnetischer Fluss in Vs':
-                        Kennlinienwerte = 'Psi(i) - Kennlinie'
-                    elif column_names_without_prefix[0] == 'Zeit in s' and column_names_without_prefix[1] == 'Spannung in V':
-                        Kennlinienwerte = 'U(t) - Kennlinie'
-                    else:
-                        Kennlinienwerte = 'Unbekannt'
-            previous_line = line.strip().split('\t')
-
-    return data_lines, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte
+def output_filename(Kennlinienwerte, file_path=None, output_format=None):
+    # Dateiname aus der Art der Kennlinie. Mit file_path wird der Name der Eingabedatei vorangestellt,
+    # damit bei der Stapelverarbeitung jede Eingabe eine eigene Ausgabedatei bekommt.
+    name = (Kennlinienwerte or 'Unbekannt').replace(' ', '_').replace('/', '_')
+    if file_path:
+        name = f"{os.path.splitext(os.path.basename(file_path))[0]}_{name}"
+    return with_output_format(f"{name}.csv", output_format)
+
+def plot_curves(ax, df, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte):
+    ax.plot(df[column_names_with_prefix[0]], df[column_names_with_prefix[1]], label="Neukurve", linestyle='-')
+    ax.plot(df[column_names_with_prefix[2]], df[column_names_with_prefix[3]], label="Obere Grenzkurve", linestyle='-')
+    ax.plot(df[column_names_with_prefix[4]], df[column_names_with_prefix[5]], label="Untere Grenzkurve", linestyle='-')
+    ax.set_xlabel(column_names_without_prefix[0], fontsize=11)
+    ax.set_ylabel(column_names_without_prefix[1], fontsize=11)
+    ax.set_title(Kennlinienwerte, fontsize=12)
+    ax.tick_params(axis='both', which='major', labelsize=11)
+    ax.grid(True)
+    ax.legend(fontsize=10)
 
 def process_file(file_path):
-    dataset, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte = read_txt_file(file_path)
-    if dataset:
-        df = pd.DataFrame(dataset, columns=column_names_with_prefix)
-        df = df.apply(pd.to_numeric, errors='coerce')
-        df = interpolate_missing_values(df)
-
-        filename = f"{Kennlinienwerte.replace(' ', '_').replace('/', '_')}.csv"
-        df.to_csv(filename, index=False)
+    df, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte = load_dataframe(file_path)
+    if df is not None:
+        filename = output_filename(Kennlinienwerte)
+        write_table(df, filename, Kennlinie=Kennlinienwerte, Quelldatei=os.path.basename(file_path))
         print(f"Dataframe als '{filename}' gespeichert.")
 
         if not df.empty:
             print("\nDie ersten 150 Zeilen des neuen DataFrames:")
             print(df.head(150))  # Zeigt nur die ersten 150 Zeilen an
 
-            plt.figure(figsize=(10, 6))
-            plt.plot(df[column_names_with_prefix[0]], df[column_names_with_prefix[1]], label="Neukurve", linestyle='-')
-            plt.plot(df[column_names_with_prefix[2]], df[column_names_with_prefix[3]], label="Obere Grenzkurve", linestyle='-')
-            plt.plot(df[column_names_with_prefix[4]], df[column_names_with_prefix[5]], label="Untere Grenzkurve", linestyle='-')
-            plt.xlabel(column_names_without_prefix[0], fontsize=11)
-            plt.ylabel(column_names_without_prefix[1], fontsize=11)
-            plt.title(Kennlinienwerte, fontsize=12)
-            plt.xticks(fontsize=11)
-            plt.yticks(fontsize=11)
-            plt.grid(True)
-            plt.legend(fontsize=10)
+            fig, ax = plt.subplots(figsize=(10, 6))
+            plot_curves(ax, df, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte)
             plt.show()
         else:
             print("Keine gültigen Daten zum Plotten vorhanden.")
     else:
         print("Datensatz nicht gefunden.")
 
+def batch_process_file(file_path, output_dir, save_plots=True, output_format=None, use_cache=True):
+    # Verarbeitet eine Datei ohne Benutzeroberfläche (läuft in einem Worker-Prozess).
+    # Plots werden nur off-screen über das Agg-Backend als PNG gespeichert.
+    start_time = time.perf_counter()
+    summary = {'Datei': os.path.basename(file_path), 'Kennlinie': None, 'Zeilen': 0, 'Zeit in s': 0.0, 'Ausgabe': None, 'Fehler': None}
+    try:
+        df, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte = load_dataframe(file_path, use_cache)
+        if df is None:
+            summary['Fehler'] = "Datensatz nicht gefunden"
+        else:
+            output_path = os.path.join(output_dir, output_filename(Kennlinienwerte, file_path, output_format))
+            write_table(df, output_path, Kennlinie=Kennlinienwerte, Quelldatei=os.path.basename(file_path))
+            summary.update({'Kennlinie': Kennlinienwerte, 'Zeilen': len(df), 'Ausgabe': os.path.basename(output_path)})
+
+            if save_plots and len(column_names_with_prefix) >= 6:
+                fig = Figure(figsize=(10, 6))
+                FigureCanvasAgg(fig)
+                plot_curves(fig.add_subplot(111), df, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte)
+                fig.savefig(os.path.splitext(output_path)[0] + '.png')
+    except Exception as e:
+        summary['Fehler'] = str(e)
+    summary['Zeit in s'] = time.perf_counter() - start_time
+    return summary
+
+def batch_process_folder(folder_path, output_dir=None, workers=None, save_plots=True, output_format=None, use_cache=True):
+    # Verarbeitet alle .txt-Dateien eines Ordners parallel in einem Prozesspool
+    # und gibt am Ende eine Zusammenfassung pro Datei aus.
+    output_dir = output_dir or folder_path
+    os.makedirs(output_dir, exist_ok=True)
+    file_paths = [os.path.join(folder_path, filename) for filename in sorted(os.listdir(folder_path)) if filename.endswith(".txt")]
+    if not file_paths:
+        print("Keine .txt-Dateien im Ordner gefunden.")
+        return pd.DataFrame()
+
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(batch_process_file, file_path, output_dir, save_plots, output_format, use_cache) for file_path in file_paths]
+        results = [future.result() for future in futures]
+    total_time = time.perf_counter() - start_time
+
+    summary = pd.DataFrame(results)
+    summary.to_csv(os.path.join(output_dir, 'Stapelverarbeitung_Zusammenfassung.csv'), index=False)
+
+    print(f"\n{'Datei':<40} {'Kennlinie':<25} {'Zeilen':>10} {'Zeit in s':>10}")
+    for row in results:
+        kennlinie = row['Kennlinie'] if row['Fehler'] is None else f"Fehler: {row['Fehler']}"
+        print(f"{row['Datei']:<40} {kennlinie:<25} {row['Zeilen']:>10} {row['Zeit in s']:>10.2f}")
+    print(f"\n{len(results)} Dateien, {summary['Zeilen'].sum()} Zeilen in {total_time:.2f} s verarbeitet.")
+    for kennlinie, anzahl in summary['Kennlinie'].value_counts().items():
+        print(f"{kennlinie}: {anzahl} Dateien")
+    return summary
+
 def browse_file():
     file_path = filedialog.askopenfilename()
     if file_path:
@@ -107,10 +125,52 @@ def browse_folder():
     else:
         print("Kein Ordner ausgewählt.")
 
-root = tk.Tk()
-root.title("Datei- und Ordnerauswahl")
-browse_file_button = tk.Button(root, text="Datei durchsuchen", command=browse_file)
-browse_folder_button = tk.Button(root, text="Ordner durchsuchen", command=browse_folder)
-browse_file_button.pack(pady=10)
-browse_folder_button.pack(pady=10)
-root.mainloop()
+def browse_folder_batch():
+    folder_path = filedialog.askdirectory()
+    if folder_path:
+        batch_process_folder(folder_path)
+    else:
+        print("Kein Ordner ausgewählt.")
+
+def cache_report_text():
+    return "\n".join(f"{key}: {value:.1f}" if isinstance(value, float) else f"{key}: {value}" for key, value in import_cache.report().items())
+
+def show_cache_report():
+    messagebox.showinfo("Import-Cache", cache_report_text())
+
+def clear_cache():
+    removed = import_cache.clear()
+    messagebox.showinfo("Import-Cache", f"{removed} Einträge gelöscht.")
+
+if __name__ == '__main__':
+    # Stapelverarbeitung ohne Oberfläche: python 0_Datenimport.py --batch ORDNER [--ausgabe ORDNER] [--prozesse N] [--ohne-plots] [--format npz]
+    parser = argparse.ArgumentParser(description="Import von Hysteresigraph-Exportdateien")
+    parser.add_argument('--batch', metavar='ORDNER', help="Alle .txt-Dateien des Ordners ohne Oberfläche verarbeiten")
+    parser.add_argument('--ausgabe', metavar='ORDNER', help="Zielordner für CSV-Dateien und Plots (Standard: Eingabeordner)")
+    parser.add_argument('--prozesse', type=int, default=None, help="Anzahl der Worker-Prozesse (Standard: Anzahl CPU-Kerne)")
+    parser.add_argument('--ohne-plots', action='store_true', help="Keine PNG-Plots erzeugen")
+    parser.add_argument('--format', choices=['csv', 'npz'], default=None, help="Ausgabeformat (Standard: csv bzw. KENNLINIE_FORMAT)")
+    parser.add_argument('--ohne-cache', action='store_true', help="Import-Cache weder lesen noch schreiben")
+    parser.add_argument('--cache-bericht', action='store_true', help="Größe und Inhalt des Import-Caches ausgeben")
+    parser.add_argument('--cache-leeren', action='store_true', help="Alle Einträge des Import-Caches löschen")
+    args = parser.parse_args()
+
+    if args.cache_leeren:
+        print(f"{import_cache.clear()} Cache-Einträge gelöscht.")
+    if args.cache_bericht:
+        print(cache_report_text())
+    if args.batch:
+        batch_process_folder(args.batch, args.ausgabe, args.prozesse, save_plots=not args.ohne_plots, output_format=args.format,
+                             use_cache=not args.ohne_cache)
+    elif not (args.cache_leeren or args.cache_bericht):
+        root = tk.Tk()
+        root.title("Datei- und Ordnerauswahl")
+        browse_file_button = tk.Button(root, text="Datei durchsuchen", command=browse_file)
+        browse_folder_button = tk.Button(root, text="Ordner durchsuchen", command=browse_folder)
+        browse_folder_batch_button = tk.Button(root, text="Ordner stapelweise verarbeiten", command=browse_folder_batch)
+        browse_file_button.pack(pady=10)
+        browse_folder_button.pack(pady=10)
+        browse_folder_batch_button.pack(pady=10)
+        tk.Button(root, text="Cache-Bericht", command=show_cache_report).pack(pady=10)
+        tk.Button(root, text="Cache leeren", command=clear_cache).pack(pady=10)
+        root.mainloop()
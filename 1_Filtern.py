@@ -1,201 +1,220 @@
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import tkinter as tk
 from tkinter import filedialog
-from scipy.signal import butter, filtfilt
-
-def calculate_errors(original, filtered):
-    mae = np.mean(np.abs(original - filtered))
-    mse = np.mean((original - filtered) ** 2)
-    rmse = np.sqrt(mse)
-    mape = np.mean(np.abs((original - filtered) / (original + np.finfo(float).eps))) * 100
-    mean_original = np.mean(original)
-    rmse_percent = (rmse / abs(mean_original)) * 100
-    return mae, mse, rmse, mape, rmse_percent
-
-def calculate_snr(signal, noise):
-    signal_power = np.mean(signal ** 2)
-    noise_power = np.mean(noise ** 2)
-    snr = 10 * np.log10(signal_power / noise_power)
-    return snr
+from kennlinie.speicherformat import read_table, write_table, with_output_format, FILETYPES
+from kennlinie.kurvensatz import CurveSet, padded_dataframe, BRANCH_NAMES
+from kennlinie.darstellung import LinePlot
+from kennlinie.hintergrund import TaskPanel
+from kennlinie.filterung import FILTER_PARAMS_FIRST, FILTER_PARAMS_SECOND, first_filter, second_filter, filter_metrics, sweep_filter_params, best_filter_params
+
+# Filterparameter der ersten Filterung (können über den Parameter-Sweep ersetzt werden)
+filter_params_first = {curve: dict(params) for curve, params in FILTER_PARAMS_FIRST.items()}
 
 def load_and_process_data():
-    global first_filtered_dataframe, final_dataframe, dataframe
-    file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
+    file_path = filedialog.askopenfilename(filetypes=FILETYPES)
     if not file_path:
         print("Keine Datei ausgewählt, Programm wird beendet.")
         root.quit()
         return
 
-    dataframe = pd.read_csv(file_path)
+    # Einlesen und erste Filterung laufen im Hintergrund, die Oberfläche bleibt bedienbar
+    task_panel.run(load_and_filter, show_first_filter, file_path, text="Daten werden geladen ...")
+
+def load_and_filter(task, file_path):
+    dataframe = read_table(file_path)
     print("Dataframe columns:", dataframe.columns)
     print("Dataframe shape:", dataframe.shape)
 
     # Erste Filterung
-    apply_first_filter()
-
-def apply_first_filter():
-    global first_filtered_dataframe, final_dataframe
-    filter_params_first = {
-        0: {'order': 3, 'cutoff': 0.05},  # Erste Filterung Neukurve
-        2: {'order': 3, 'cutoff': 0.05},  # Erste Filterung obere Hysterese
-        4: {'order': 3, 'cutoff': 0.05}   # Erste Filterung untere Hysterese
-    }
-
-    columns_data_first = {}
-    for i in range(0, 6, 2):
-        order_first = filter_params_first[i]['order']
-        cutoff_first = filter_params_first[i]['cutoff']
-        b_first, a_first = butter(order_first, cutoff_first, btype='low', analog=False)
-        original_h = dataframe.iloc[:, i].values
-        original_b = dataframe.iloc[:, i + 1].values
-        filtered_h = filtfilt(b_first, a_first, original_h)
-        filtered_b = filtfilt(b_first, a_first, original_b)
-
-        columns_data_first[f'H_original_{i//2}'] = original_h
-        columns_data_first[f'B_original_{i//2}'] = original_b
-        columns_data_first[f'H_filtered_{i//2}'] = filtered_h
-        columns_data_first[f'B_filtered_{i//2}'] = filtered_b
-
-    first_filtered_dataframe = pd.DataFrame(columns_data_first)
-    first_output_filename = "first_filtered_data.csv"
-    first_filtered_dataframe.to_csv(first_output_filename, index=False)
+    task.progress(0.3, "Erste Filterung ...")
+    return compute_first_filter(task, dataframe, filter_params_first)
+
+def compute_first_filter(task, dataframe, params):
+    # Läuft im Hintergrund-Thread: keine Tk-Widgets verwenden, das Ergebnis zeigt show_first_filter an.
+    # Jede Kurve wird nur über ihre echte Länge gefiltert (ohne NaN-Auffüllung am Ende).
+    # H und B aller Kurven werden gemeinsam mit zwischengespeicherten SOS-Filtern gefiltert.
+    columns_data_first = first_filter(CurveSet.from_dataframe(dataframe), params)
+    task.progress(0.7, "Speichern ...")
+    first_dataframe = padded_dataframe(columns_data_first)
+    first_dataframe.attrs.update(dataframe.attrs)
+    first_dataframe.attrs['Filterparameter_erste'] = params
+    first_output_filename = with_output_format("first_filtered_data.csv")
+    write_table(first_dataframe, first_output_filename)
     print(f"Erste Filterung DataFrame wurde als '{first_output_filename}' gespeichert.")
 
+    # Fehlermaße und SNR der H-Werte aller Kurven in einem Aufruf (jeweils über die echte Kurvenlänge)
+    metrics = filter_metrics([columns_data_first[f'H_original_{i}'] for i in range(3)],
+                             [columns_data_first[f'H_filtered_{i}'] for i in range(3)])
+    return dataframe, columns_data_first, first_dataframe, metrics
+
+def show_first_filter(result):
+    global dataframe, first_filtered_dataframe, final_dataframe, first_filtered_columns
+    dataframe, first_filtered_columns, first_filtered_dataframe, metrics = result
+
     # Fehlerberechnungen und SNR nach der ersten Filterung
     results_text.delete(1.0, tk.END)
     for i in range(3):
-        original_col = i * 4
-        filtered_col = original_col + 2
-        mae, mse, rmse, mape, rmse_percent = calculate_errors(first_filtered_dataframe.iloc[:, original_col], first_filtered_dataframe.iloc[:, filtered_col])
-        snr_original = calculate_snr(first_filtered_dataframe.iloc[:, original_col], first_filtered_dataframe.iloc[:, original_col] - np.mean(first_filtered_dataframe.iloc[:, original_col]))
-        snr_filtered = calculate_snr(first_filtered_dataframe.iloc[:, filtered_col], first_filtered_dataframe.iloc[:, original_col] - first_filtered_dataframe.iloc[:, filtered_col])
-        results_text.insert(tk.END, f"Fehlerberechnungen nach erster Filterung, Paar {i+1}:\n", 'bold')
-        results_text.insert(tk.END, f"MAE: {mae:.4f}, MSE: {mse:.4f}, RMSE: {rmse:.4f}, MAPE: {mape:.2f}%, RMSE%: {rmse_percent:.2f}%\n", 'normal')
-        results_text.insert(tk.END, f"SNR Original: {snr_original:.2f} dB, SNR Gefiltert: {snr_filtered:.2f} dB\n\n", 'normal')
+        show_metrics(f"Fehlerberechnungen nach erster Filterung, Paar {i+1}:\n", metrics[i])
 
     # Leeres DataFrame für die zweite Filterung erstellen
     final_dataframe = pd.DataFrame()
 
-    update_plot()
+    update_plot(data_changed=True)
     save_button['state'] = 'normal'
     filter_again_button['state'] = 'normal'
+    sweep_button['state'] = 'normal'
+
+def show_metrics(title, metric):
+    results_text.insert(tk.END, title, 'bold')
+    results_text.insert(tk.END, f"MAE: {metric['mae']:.4f}, MSE: {metric['mse']:.4f}, RMSE: {metric['rmse']:.4f}, MAPE: {metric['mape']:.2f}%, RMSE%: {metric['rmse_percent']:.2f}%\n", 'normal')
+    results_text.insert(tk.END, f"SNR Original: {metric['snr_original']:.2f} dB, SNR Gefiltert: {metric['snr_filtered']:.2f} dB\n\n", 'normal')
+
+def run_parameter_sweep():
+    # Bewertet ein Raster aus Ordnungen und Grenzfrequenzen je Kurve parallel, zeigt die besten
+    # Pareto-optimalen Einstellungen an und wiederholt die erste Filterung mit der jeweils besten Einstellung.
+    task_panel.run(compute_parameter_sweep, show_parameter_sweep, dataframe, text="Parameter-Sweep ...")
+
+def compute_parameter_sweep(task, dataframe):
+    table = sweep_filter_params(CurveSet.from_dataframe(dataframe), progress=lambda fraction: task.progress(0.9 * fraction))
+    table.to_csv("filter_sweep.csv", index=False)
+    print("Ergebnisse des Parameter-Sweeps wurden als 'filter_sweep.csv' gespeichert.")
+
+    params = dict(filter_params_first)
+    params.update(best_filter_params(table))
+    task.progress(0.9, "Erste Filterung mit den besten Parametern ...")
+    return table, params, compute_first_filter(task, dataframe, params)
+
+def show_parameter_sweep(result):
+    table, params, first_result = result
+    filter_params_first.update(params)
+    show_first_filter(first_result)
+
+    for curve_index, group in table[table['Pareto']].groupby('Kurve'):
+        results_text.insert(tk.END, f"Parameter-Sweep {BRANCH_NAMES[curve_index]} (Pareto-optimal, beste 5):\n", 'bold')
+        for _, row in group.head(5).iterrows():
+            results_text.insert(tk.END, f"Rang {row['Rang']}: order={row['order']}, cutoff={row['cutoff']}, Rauheit: {row['Rauheit']:.2e}, RMSE%: {row['RMSE%']:.2f}%\n", 'normal')
+        results_text.insert(tk.END, "\n", 'normal')
 
 def apply_second_filter():
-    global final_dataframe
-    filter_params_second = {
-        0: {'order': 4, 'cutoff': 0.01}, # Zweite Filterung Neukurve
-        2: {'order': 4, 'cutoff': 0.01}, # Zweite Filterung obere Hysterese
-        4: {'order': 4, 'cutoff': 0.01}  # Zweite Filterung untere Hysterese
-    }
-
-    columns_data_final = {}
-    for i in range(0, 6, 2):
-        order_second = filter_params_second[i]['order']
-        cutoff_second = filter_params_second[i]['cutoff']
-        b_second, a_second = butter(order_second, cutoff_second, btype='low', analog=False)
-        filtered_h = first_filtered_dataframe[f'H_filtered_{i//2}'].values
-        refiltered_h = filtfilt(b_second, a_second, filtered_h)
-        filtered_b = first_filtered_dataframe[f'B_filtered_{i//2}'].values
-
-        columns_data_final[f'H_original_{i//2}'] = first_filtered_dataframe[f'H_original_{i//2}'].values
-        columns_data_final[f'B_original_{i//2}'] = first_filtered_dataframe[f'B_original_{i//2}'].values
-        columns_data_final[f'H_refiltered_{i//2}'] = refiltered_h
-        columns_data_final[f'B_filtered_{i//2}'] = filtered_b
-
-    final_dataframe = pd.DataFrame(columns_data_final)
-    final_output_filename = "final_filtered_data.csv"
-    final_dataframe.to_csv(final_output_filename, index=False)
+    task_panel.run(compute_second_filter, show_second_filter, first_filtered_columns, first_filtered_dataframe.attrs, text="Zweite Filterung ...")
+
+def compute_second_filter(task, first_columns, attrs):
+    # Zweite Filterung nur der H-Werte, alle Kurven in einem Durchgang
+    columns_data_final = second_filter(first_columns, FILTER_PARAMS_SECOND)
+
+    task.progress(0.6, "Speichern ...")
+    final = padded_dataframe(columns_data_final)
+    final.attrs.update(attrs)
+    final.attrs['Filterparameter_zweite'] = FILTER_PARAMS_SECOND
+    final_output_filename = with_output_format("final_filtered_data.csv")
+    write_table(final, final_output_filename)
     print(f"Endgültig gefilterte DataFrame wurde als '{final_output_filename}' gespeichert.")
 
     # Fehlerberechnungen und SNR nach der zweiten Filterung
+    metrics = filter_metrics([columns_data_final[f'H_original_{i}'] for i in range(3)],
+                             [columns_data_final[f'H_refiltered_{i}'] for i in range(3)])
+    return final, metrics
+
+def show_second_filter(result):
+    global final_dataframe
+    final_dataframe, metrics = result
     for i in range(3):
-        original_col = i * 4
-        refiltered_col = original_col + 2
-        mae, mse, rmse, mape, rmse_percent = calculate_errors(final_dataframe.iloc[:, original_col], final_dataframe.iloc[:, refiltered_col])
-        snr_original = calculate_snr(final_dataframe.iloc[:, original_col], final_dataframe.iloc[:, original_col] - np.mean(final_dataframe.iloc[:, original_col]))
-        snr_filtered = calculate_snr(final_dataframe.iloc[:, refiltered_col], final_dataframe.iloc[:, original_col] - final_dataframe.iloc[:, refiltered_col])
-        results_text.insert(tk.END, f"Fehlerberechnungen nach zweiter Filterung, Paar {i+1}:\n", 'bold')
-        results_text.insert(tk.END, f"MAE: {mae:.4f}, MSE: {mse:.4f}, RMSE: {rmse:.4f}, MAPE: {mape:.2f}%, RMSE%: {rmse_percent:.2f}%\n", 'normal')
-        results_text.insert(tk.END, f"SNR Original: {snr_original:.2f} dB, SNR Gefiltert: {snr_filtered:.2f} dB\n\n", 'normal')
-
-    update_plot()
-
-def update_plot():
-    ax.clear()
-    for i in range(3):
-        if show_original.get():
-            ax.plot(first_filtered_dataframe[f'H_original_{i}'], first_filtered_dataframe[f'B_original_{i}'], label=f'Original {i + 1}')
-        if show_filtered_h.get():
-            ax.plot(first_filtered_dataframe[f'H_filtered_{i}'], first_filtered_dataframe[f'B_original_{i}'], label=f'H gefiltert {i + 1}')
-        if show_filtered_b.get():
-            ax.plot(first_filtered_dataframe[f'H_filtered_{i}'], first_filtered_dataframe[f'B_filtered_{i}'], label=f'H & B gefiltert {i + 1}')
-        if show_refiltered.get() and not final_dataframe.empty:
-            ax.plot(final_dataframe[f'H_refiltered_{i}'], final_dataframe[f'B_filtered_{i}'], label=f'H (2. Filterung) gefiltert {i + 1}')
+        show_metrics(f"Fehlerberechnungen nach zweiter Filterung, Paar {i+1}:\n", metrics[i])
+
+    update_plot(data_changed=True)
+
+def update_plot(data_changed=False):
+    # Die Linien werden nur einmal angelegt; neue Daten werden nur nach einer Filterung übernommen,
+    # die Checkboxen schalten lediglich die Sichtbarkeit um.
+    if data_changed:
+        for i in range(3):
+            plot.line(('original', i), first_filtered_columns[f'H_original_{i}'], first_filtered_columns[f'B_original_{i}'], label=f'Original {i + 1}')
+            plot.line(('filtered_h', i), first_filtered_columns[f'H_filtered_{i}'], first_filtered_columns[f'B_original_{i}'], label=f'H gefiltert {i + 1}')
+            plot.line(('filtered_b', i), first_filtered_columns[f'H_filtered_{i}'], first_filtered_columns[f'B_filtered_{i}'], label=f'H & B gefiltert {i + 1}')
+            if final_dataframe.empty:
+                plot.remove(('refiltered', i))
+            else:
+                plot.line(('refiltered', i), final_dataframe[f'H_refiltered_{i}'], final_dataframe[f'B_filtered_{i}'], label=f'H (2. Filterung) gefiltert {i + 1}')
 
-    ax.set_xlabel('H [A/m]', fontsize=11)
-    ax.set_ylabel('B [T]', fontsize=11)
-    ax.set_title('Hystereseschleife', fontsize=12)
-    ax.legend(fontsize=10)
-    ax.grid(True)
-    ax.tick_params(axis='both', which='major', labelsize=11)
-    canvas.draw()
+    for i in range(3):
+        plot.show(('original', i), show_original.get())
+        plot.show(('filtered_h', i), show_filtered_h.get())
+        plot.show(('filtered_b', i), show_filtered_b.get())
+        plot.show(('refiltered', i), show_refiltered.get())
+    plot.redraw(legend_fontsize=10)
 
 def save_filtered_data():
-    file_path_first = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Speichern der ersten Filterung")
+    file_path_first = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=FILETYPES, title="Speichern der ersten Filterung")
     if file_path_first:
-        first_filtered_dataframe.to_csv(file_path_first, index=False)
+        write_table(first_filtered_dataframe, file_path_first)
         print(f"Erste Filterung Daten wurden als '{file_path_first}' gespeichert.")
 
-    file_path_final = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Speichern der endgültigen Filterung")
+    file_path_final = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=FILETYPES, title="Speichern der endgültigen Filterung")
     if file_path_final:
-        final_dataframe.to_csv(file_path_final, index=False)
+        write_table(final_dataframe, file_path_final)
         print(f"Endgültig gefilterte Daten wurden als '{file_path_final}' gespeichert.")
 
-root = tk.Tk()
-root.title("Original- und gefilterte Hystereseschleife")
-fig = plt.Figure(figsize=(10, 5), dpi=100)  # Anpassung der Plotgröße für bessere Übersichtlichkeit
-ax = fig.add_subplot(111)
-canvas = FigureCanvasTkAgg(fig, master=root)
-canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
-toolbar = NavigationToolbar2Tk(canvas, root)
-toolbar.update()
-canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+# Die Oberfläche wird nur beim direkten Start aufgebaut, damit die Worker-Prozesse des Parameter-Sweeps
+# dieses Skript importieren können, ohne ein weiteres Fenster zu öffnen.
+if __name__ == '__main__':
+    root = tk.Tk()
+    root.title("Original- und gefilterte Hystereseschleife")
+    fig = plt.Figure(figsize=(10, 5), dpi=100)  # Anpassung der Plotgröße für bessere Übersichtlichkeit
+    ax = fig.add_subplot(111)
+    canvas = FigureCanvasTkAgg(fig, master=root)
+    canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+    toolbar = NavigationToolbar2Tk(canvas, root)
+    toolbar.update()
+    canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+    ax.set_xlabel('H [A/m]', fontsize=11)
+    ax.set_ylabel('B [T]', fontsize=11)
+    ax.set_title('Hystereseschleife', fontsize=12)
+    ax.grid(True)
+    ax.tick_params(axis='both', which='major', labelsize=11)
+    plot = LinePlot(ax, canvas)
+
+    # Fortschritt und Abbrechen für Berechnungen im Hintergrund
+    task_panel = TaskPanel(root)
+    task_panel.pack(side=tk.BOTTOM, fill=tk.X)
+
+    results_text = tk.Text(root, height=10)
+    results_text.pack(side=tk.BOTTOM, fill=tk.X)
+    results_text.tag_configure('bold', font=('Helvetica', 12, 'bold'))
 
-results_text = tk.Text(root, height=10)
-results_text.pack(side=tk.BOTTOM, fill=tk.X)
-results_text.tag_configure('bold', font=('Helvetica', 12, 'bold'))
+    load_button = tk.Button(root, text="Daten laden", command=load_and_process_data)
+    load_button.pack(side=tk.LEFT, pady=10)
 
-load_button = tk.Button(root, text="Daten laden", command=load_and_process_data)
-load_button.pack(side=tk.LEFT, pady=10)
+    save_button = tk.Button(root, text="Daten speichern", command=save_filtered_data)
+    save_button.pack(side=tk.RIGHT, pady=10)
+    save_button['state'] = 'disabled'
 
-save_button = tk.Button(root, text="Daten speichern", command=save_filtered_data)
-save_button.pack(side=tk.RIGHT, pady=10)
-save_button['state'] = 'disabled'
+    filter_again_button = tk.Button(root, text="Nochmals filtern", command=apply_second_filter)
+    filter_again_button.pack(side=tk.RIGHT, pady=10)
+    filter_again_button['state'] = 'disabled'
 
-filter_again_button = tk.Button(root, text="Nochmals filtern", command=apply_second_filter)
-filter_again_button.pack(side=tk.RIGHT, pady=10)
-filter_again_button['state'] = 'disabled'
+    sweep_button = tk.Button(root, text="Parameter-Sweep", command=run_parameter_sweep)
+    sweep_button.pack(side=tk.RIGHT, pady=10)
+    sweep_button['state'] = 'disabled'
 
-# Checkboxen hinzufügen
-show_original = tk.BooleanVar(value=True)
-show_filtered_h = tk.BooleanVar(value=True)
-show_filtered_b = tk.BooleanVar(value=True)
-show_refiltered = tk.BooleanVar(value=True)
+    # Checkboxen hinzufügen
+    show_original = tk.BooleanVar(value=True)
+    show_filtered_h = tk.BooleanVar(value=True)
+    show_filtered_b = tk.BooleanVar(value=True)
+    show_refiltered = tk.BooleanVar(value=True)
 
-checkbox_original = tk.Checkbutton(root, text="Originaldaten", variable=show_original, command=update_plot)
-checkbox_original.pack(side=tk.LEFT)
+    checkbox_original = tk.Checkbutton(root, text="Originaldaten", variable=show_original, command=update_plot)
+    checkbox_original.pack(side=tk.LEFT)
 
-checkbox_filtered_h = tk.Checkbutton(root, text="Gefilterte H-Werte", variable=show_filtered_h, command=update_plot)
-checkbox_filtered_h.pack(side=tk.LEFT)
+    checkbox_filtered_h = tk.Checkbutton(root, text="Gefilterte H-Werte", variable=show_filtered_h, command=update_plot)
+    checkbox_filtered_h.pack(side=tk.LEFT)
 
-checkbox_filtered_b = tk.Checkbutton(root, text="Gefilterte B-Werte", variable=show_filtered_b, command=update_plot)
-checkbox_filtered_b.pack(side=tk.LEFT)
+    checkbox_filtered_b = tk.Checkbutton(root, text="Gefilterte B-Werte", variable=show_filtered_b, command=update_plot)
+    checkbox_filtered_b.pack(side=tk.LEFT)
 
-checkbox_refiltered = tk.Checkbutton(root, text="Erneut gefilterte H-Werte", variable=show_refiltered, command=update_plot)
-checkbox_refiltered.pack(side=tk.LEFT)
+    checkbox_refiltered = tk.Checkbutton(root, text="Erneut gefilterte H-Werte", variable=show_refiltered, command=update_plot)
+    checkbox_refiltered.pack(side=tk.LEFT)
 
-root.mainloop()
+    root.mainloop()
 
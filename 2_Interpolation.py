@@ -1,84 +1,65 @@
-import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from scipy.interpolate import interp1d
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import warnings
+from kennlinie.speicherformat import read_table, write_table, FILETYPES
+from kennlinie.kurvensatz import CurveSet
+from kennlinie.interpolation import FILTERED_PAIRS, interpolate_curve_set, interpolated_dataframe, knee_smoothing, sweep_smoothing
+from kennlinie.hintergrund import TaskPanel
 
 def load_and_process_data():
-    file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
+    file_path = filedialog.askopenfilename(filetypes=FILETYPES)
     if not file_path:
         messagebox.showerror("Dateiauswahl", "Keine Datei ausgewählt, Programm wird beendet.")
         root.quit()
         return
 
+    # Einlesen und Interpolation laufen im Hintergrund, die Oberfläche bleibt bedienbar
+    task_panel.run(interpolate_file, show_interpolation, file_path, text="Daten werden geladen ...")
+
+def interpolate_file(task, file_path):
+    # Läuft im Hintergrund-Thread: keine Tk-Widgets verwenden
     # Einlesen der Daten
-    dataframe = pd.read_csv(file_path)
-    
-    # Anzahl der Zeilen in der Datei
-    num_rows = len(dataframe)
-    
-    # Berechnung der Anzahl der Punkte für die erste Interpolation 
-    num_points_first_interp = max(10, num_rows // 2)               # Subsample: 2 heisst 50% der Datenpunkte, z.B.: 5 heisst 20% der Datenpunkte, 10 heisst 10% der Datenpunkte
-                                                                   # Haben die Daten aktuell keine oder kaum Restwelligkeit kann Subsample von 1 gewählt werden (100% der Datenpunkte)
-                                                                   # Ist die Restwelligkeit höher und man wünscht eine Minderung, dann Subsample-Wert > 1 wählen 
-                                                                   # -> Ausprobieren bis gewünschtes Ergebnis erreicht wird. 
-                                                                   
-    # Initialisiere den neuen DataFrame für die interpolierten Daten
-    global new_dataframe
-    new_dataframe = pd.DataFrame()
+    dataframe = read_table(file_path)
     
     # Spalten für Interpolation definieren
-    columns_to_process = [(2, 3), (6, 7), (10, 11)]
+    columns_to_process = FILTERED_PAIRS
+    curve_set = CurveSet.from_dataframe(dataframe, pairs=columns_to_process)
     
-    all_data = []  # Zum Speichern der Daten für das Plotting
-    
-    for i, (H_col, B_col) in enumerate(columns_to_process, start=1):
-        H_values = dataframe.iloc[:, H_col].values
-        B_values = dataframe.iloc[:, B_col].values
-
-        # Bereinigung von Duplikaten: Mittelwert von B für jeden eindeutigen H-Wert
-        df_cleaned = pd.DataFrame({'H': H_values, 'B': B_values})
-        df_cleaned = df_cleaned.groupby('H').mean().reset_index()
-
-        # Sortierung der Daten
-        H_sorted = df_cleaned['H'].values
-        B_sorted = df_cleaned['B'].values
-
-        # Erste kubische Interpolation
-        cubic_interp1 = interp1d(H_sorted, B_sorted, kind='cubic', fill_value="extrapolate")
-
-        # Erzeugen diskreter H-Werte und Berechnung der B-Werte
-        H_new = np.linspace(min(H_sorted), max(H_sorted), num=num_points_first_interp)
-        B_new = cubic_interp1(H_new)
-
-        # Zweite kubische Interpolation über die neuen H- und B-Werte
-        cubic_interp2 = interp1d(H_new, B_new, kind='cubic', fill_value="extrapolate")
-        H_fine = np.linspace(min(H_new), max(H_new), num=num_rows)
-        B_fine = cubic_interp2(H_fine)
-
-        # Speichern der Daten im DataFrame für die zweite Interpolation
-        new_dataframe[f'H_fine_{i}'] = H_fine
-        new_dataframe[f'B_fine_{i}'] = B_fine
-
-        # Speichern der Daten für das Plotting
-        all_data.append((H_sorted, B_sorted, H_new, B_new, H_fine, B_fine, i))
+    # Glättung der Interpolation als Anteil des H-Bereichs
+    smoothing = 'auto'                                             # 'auto': Glättung je Kurve automatisch wählen (Knie zwischen Restwelligkeit und Abweichung)
+                                                                   # Fester Wert, z.B. DEFAULT_SMOOTHING = 0.005: Welligkeit schmaler als 0.5% des H-Bereichs wird geglättet
+                                                                   # (0.002 wenig, 0.02 starke Glättung)
+
+    automatic = smoothing == 'auto'
+    if automatic:
+        task.progress(0.1, "Automatische Wahl der Glättung ...")
+        table = sweep_smoothing(curve_set, progress=lambda fraction: task.progress(0.1 + 0.6 * fraction))
+        smoothing = knee_smoothing(table)
+        print(f"Automatisch gewählte Glättung je Kurve: {smoothing}")
+
+    # Spalten des neuen DataFrames für die interpolierten Daten und Daten für das Plotting
+    task.progress(0.7, "Interpolation ...")
+    new_columns, all_data = interpolate_curve_set(curve_set, smoothing, progress=lambda fraction: task.progress(0.7 + 0.3 * fraction))
+    return interpolated_dataframe(new_columns, dataframe.attrs, smoothing, automatic), all_data
+
+def show_interpolation(result):
+    global new_dataframe
+    new_dataframe, all_data = result
     
     # Plotten aller Daten in einem einzigen Plot
     plot_all_data(all_data)
 
 def plot_all_data(all_data):
     fig, ax = plt.subplots()
-    colors = ['blue', 'red', 'green']  # Farben für Originaldaten, erste und zweite Interpolation
+    colors = ['blue', 'red']  # Farben für Originaldaten und Interpolation
     lines = []
 
-    for (H_sorted, B_sorted, H_new, B_new, H_fine, B_fine, index), color in zip(all_data, colors):
+    for H_sorted, B_sorted, H_fine, B_fine, index in all_data:
         line1, = ax.plot(H_sorted, B_sorted, 'x-', label=f'Gefilterte Daten {index}', color=colors[0])  # Linie mit x-Markern
-        line2, = ax.plot(H_new, B_new, 'o-', label=f'Erste Interpolation {index}', color=colors[1], linestyle='-')  # Durchgezogene Linie
-        line3, = ax.plot(H_fine, B_fine, 's-', label=f'Zweite Interpolation {index}', color=colors[2], linestyle='-')  # Durchgezogene Linie
-        lines.append((line1, line2, line3))
+        line2, = ax.plot(H_fine, B_fine, 's-', label=f'Interpolation {index}', color=colors[1], linestyle='-')  # Durchgezogene Linie
+        lines.append((line1, line2))
 
     ax.set_xlabel('Feldstärke H (A/m)', fontsize=12)
     ax.set_ylabel('Flussdichte B (T)', fontsize=12)
@@ -88,23 +69,19 @@ def plot_all_data(all_data):
     ax.tick_params(axis='both', which='major', labelsize=12)
 
     def toggle_lines():
-        for i, (line1, line2, line3) in enumerate(lines):
+        for i, (line1, line2) in enumerate(lines):
             line1.set_visible(var1.get())
             line2.set_visible(var2.get())
-            line3.set_visible(var3.get())
         canvas.draw()
 
     var1 = tk.BooleanVar(value=True)
     var2 = tk.BooleanVar(value=True)
-    var3 = tk.BooleanVar(value=True)
 
     check1 = tk.Checkbutton(root, text="Originaldaten", variable=var1, command=toggle_lines, font=('Helvetica', 11))
-    check2 = tk.Checkbutton(root, text="Erste Interpolation", variable=var2, command=toggle_lines, font=('Helvetica', 11))
-    check3 = tk.Checkbutton(root, text="Zweite Interpolation", variable=var3, command=toggle_lines, font=('Helvetica', 11))
+    check2 = tk.Checkbutton(root, text="Interpolation", variable=var2, command=toggle_lines, font=('Helvetica', 11))
     
     check1.pack(side=tk.LEFT, padx=5)
     check2.pack(side=tk.LEFT, padx=5)
-    check3.pack(side=tk.LEFT, padx=5)
 
     canvas = FigureCanvasTkAgg(fig, master=root)
     canvas.draw()
@@ -117,17 +94,21 @@ def plot_all_data(all_data):
     save_button.pack(side=tk.BOTTOM, pady=10)
 
 def save_data():
-    save_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Speichern der interpolierten Daten")
+    save_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=FILETYPES, title="Speichern der interpolierten Daten")
     if save_path:
-        new_dataframe.to_csv(save_path, index=False)
+        write_table(new_dataframe, save_path)
         print("Interpolierte Daten wurden gespeichert.")
         print(new_dataframe.tail(50))  # Anzeige der letzten 50 Datenpunkte
 
-# Warnungen deaktivieren
-warnings.filterwarnings("ignore", category=UserWarning)
-
-root = tk.Tk()
-root.title("Interaktive Hystereseschleife Anzeige")
-load_button = tk.Button(root, text="Daten laden und verarbeiten", command=load_and_process_data, font=('Helvetica', 12))
-load_button.pack(side=tk.BOTTOM, pady=10)
-root.mainloop()
+if __name__ == '__main__':
+    # Warnungen deaktivieren
+    warnings.filterwarnings("ignore", category=UserWarning)
+
+    root = tk.Tk()
+    root.title("Interaktive Hystereseschleife Anzeige")
+    # Fortschritt und Abbrechen für Berechnungen im Hintergrund
+    task_panel = TaskPanel(root)
+    task_panel.pack(side=tk.BOTTOM, fill=tk.X)
+    load_button = tk.Button(root, text="Daten laden und verarbeiten", command=load_and_process_data, font=('Helvetica', 12))
+    load_button.pack(side=tk.BOTTOM, pady=10)
+    root.mainloop()
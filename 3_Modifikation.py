@@ -1,22 +1,26 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from scipy.interpolate import CubicSpline, interp1d
+from kennlinie.speicherformat import read_table, write_table, with_output_format, FILETYPES
+from kennlinie.kurvensatz import CurveSet, padded_dataframe
+from kennlinie.modifikation import BoundNotReached, InterpolatorCache, generate_points, reduce_points
+from kennlinie.tabellen import export_tables, format_report
 
 def load_file():
-    file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
+    file_path = filedialog.askopenfilename(filetypes=FILETYPES)
     if file_path:
-        df = pd.read_csv(file_path)
+        df = read_table(file_path)
         if len(df.columns) >= 6:
-            original_data['H_neu'] = df.iloc[:, 0].values
-            original_data['B_neu'] = df.iloc[:, 1].values
-            original_data['H_oben'] = df.iloc[:, 2].values
-            original_data['B_oben'] = df.iloc[:, 3].values
-            original_data['H_unten'] = df.iloc[:, 4].values
-            original_data['B_unten'] = df.iloc[:, 5].values
+            metadata.clear()
+            metadata.update(df.attrs)
+            # Neue Originaldaten: alle angepassten Interpolatoren verwerfen
+            interpolators.invalidate()
+            curve_set = CurveSet.from_dataframe(df, pairs=[(0, 1), (2, 3), (4, 5)])
+            original_data['H_neu'], original_data['B_neu'] = curve_set[0]
+            original_data['H_oben'], original_data['B_oben'] = curve_set[1]
+            original_data['H_unten'], original_data['B_unten'] = curve_set[2]
             update_plot()
         else:
             messagebox.showerror("Datei Fehler", "Die ausgewählte Datei hat nicht genügend Spalten.")
@@ -24,44 +28,61 @@ def load_file():
         messagebox.showerror("Datei Fehler", "Keine Datei ausgewählt.")
 
 def modify_data():
+    # Mit maximaler Abweichung werden die Punkte adaptiv verteilt und die Punktzahlen ignoriert
+    max_error_text = max_error_entry.get().strip()
     try:
-        num_points_neu = int(neu_points_entry.get())
-        num_points_oben = int(oben_points_entry.get())
-        num_points_unten = int(unten_points_entry.get())
+        if max_error_text:
+            max_error = float(max_error_text.replace(',', '.'))
+        else:
+            max_error = None
+            num_points_neu = int(neu_points_entry.get())
+            num_points_oben = int(oben_points_entry.get())
+            num_points_unten = int(unten_points_entry.get())
     except ValueError:
-        messagebox.showerror("Eingabefehler", "Bitte gültige Zahlen für die Anzahl der Datenpunkte eingeben.")
+        messagebox.showerror("Eingabefehler", "Bitte gültige Zahlen für die Anzahl der Datenpunkte bzw. die maximale Abweichung eingeben.")
         return
 
-    def generate_points(H, B, num_points, method):
-        sorted_indices = np.argsort(H)
-        H_sorted = np.array(H)[sorted_indices]
-        B_sorted = np.array(B)[sorted_indices]
-        if method == 'cubic':
-            interpolator = CubicSpline(H_sorted, B_sorted)
-        elif method == 'quadratic':
-            interpolator = interp1d(H_sorted, B_sorted, kind='quadratic')
-        H_new = np.linspace(H_sorted.min(), H_sorted.max(), num_points)
-        B_new = interpolator(H_new)
-        return H_new, B_new
-
+    # Die modifizierten Kurven werden neu berechnet
+    interpolators.invalidate('neu_modifiziert', 'oben_modifiziert', 'unten_modifiziert')
     try:
-        modified_data['H_neu_cubic'], modified_data['B_neu_cubic'] = generate_points(original_data['H_neu'], original_data['B_neu'], num_points_neu, 'cubic')
-        modified_data['H_oben_cubic'], modified_data['B_oben_cubic'] = generate_points(original_data['H_oben'], original_data['B_oben'], num_points_oben, 'cubic')
-        modified_data['H_unten_cubic'], modified_data['B_unten_cubic'] = generate_points(original_data['H_unten'], original_data['B_unten'], num_points_unten, 'cubic')
-        
-        modified_data['H_neu_quad'], modified_data['B_neu_quad'] = generate_points(original_data['H_neu'], original_data['B_neu'], num_points_neu, 'quadratic')
-        modified_data['H_oben_quad'], modified_data['B_oben_quad'] = generate_points(original_data['H_oben'], original_data['B_oben'], num_points_oben, 'quadratic')
-        modified_data['H_unten_quad'], modified_data['B_unten_quad'] = generate_points(original_data['H_unten'], original_data['B_unten'], num_points_unten, 'quadratic')
+        if max_error is not None:
+            reduce_curves(max_error, relative_error_var.get())
+        else:
+            modified_data['H_neu_cubic'], modified_data['B_neu_cubic'] = generate_points(original_data['H_neu'], original_data['B_neu'], num_points_neu, 'cubic', interpolators, 'neu')
+            modified_data['H_oben_cubic'], modified_data['B_oben_cubic'] = generate_points(original_data['H_oben'], original_data['B_oben'], num_points_oben, 'cubic', interpolators, 'oben')
+            modified_data['H_unten_cubic'], modified_data['B_unten_cubic'] = generate_points(original_data['H_unten'], original_data['B_unten'], num_points_unten, 'cubic', interpolators, 'unten')
+
+            modified_data['H_neu_quad'], modified_data['B_neu_quad'] = generate_points(original_data['H_neu'], original_data['B_neu'], num_points_neu, 'quadratic', interpolators, 'neu')
+            modified_data['H_oben_quad'], modified_data['B_oben_quad'] = generate_points(original_data['H_oben'], original_data['B_oben'], num_points_oben, 'quadratic', interpolators, 'oben')
+            modified_data['H_unten_quad'], modified_data['B_unten_quad'] = generate_points(original_data['H_unten'], original_data['B_unten'], num_points_unten, 'quadratic', interpolators, 'unten')
     except KeyError as e:
         messagebox.showerror("Datenfehler", f"Fehlende Originaldaten: {str(e)}")
         return
-    
+    except BoundNotReached as e:
+        messagebox.showerror("Maximale Abweichung", str(e))
+        return
+    if max_error is not None:
+        metadata['Max_Abweichung_B'] = max_error
+        metadata['Max_Abweichung_relativ'] = relative_error_var.get()
+    else:
+        metadata.pop('Max_Abweichung_B', None)
+        metadata.pop('Max_Abweichung_relativ', None)
+
     save_modified_data()
     update_plot()
     calculate_differences()
 
+def reduce_curves(max_error, relative=False):
+    # Kleinste Tabellen je Kurve und Methode, deren Interpolation die Originaldaten bis auf max_error (in T bzw.
+    # mit relative=True als Anteil von max|B|) trifft
+    for name in ('neu', 'oben', 'unten'):
+        for method, suffix in (('cubic', 'cubic'), ('quadratic', 'quad')):
+            H_new, B_new, error = reduce_points(original_data[f'H_{name}'], original_data[f'B_{name}'], max_error, method, relative=relative, cache=interpolators, curve=name)
+            modified_data[f'H_{name}_{suffix}'], modified_data[f'B_{name}_{suffix}'] = H_new, B_new
+            print(f"Adaptive Punkte für {name} ({method}): {len(H_new)} Punkte, maximale Differenz {error}")
+
 def save_modified_data():
-    mod_df_cubic = pd.DataFrame({
+    mod_df_cubic = padded_dataframe({
         'H_neu_cubic': modified_data['H_neu_cubic'],
         'B_neu_cubic': modified_data['B_neu_cubic'],
         'H_oben_cubic': modified_data['H_oben_cubic'],
@@ -69,9 +90,10 @@ def save_modified_data():
         'H_unten_cubic': modified_data['H_unten_cubic'],
         'B_unten_cubic': modified_data['B_unten_cubic']
     })
-    mod_df_cubic.to_csv('modified_data_cubic.csv', index=False)
+    mod_df_cubic.attrs.update(metadata)
+    write_table(mod_df_cubic, with_output_format('modified_data_cubic.csv'), Modifikation='kubisch')
 
-    mod_df_quad = pd.DataFrame({
+    mod_df_quad = padded_dataframe({
         'H_neu_quad': modified_data['H_neu_quad'],
         'B_neu_quad': modified_data['B_neu_quad'],
         'H_oben_quad': modified_data['H_oben_quad'],
@@ -79,20 +101,39 @@ def save_modified_data():
         'H_unten_quad': modified_data['H_unten_quad'],
         'B_unten_quad': modified_data['B_unten_quad']
     })
-    mod_df_quad.to_csv('modified_data_quad.csv', index=False)
+    mod_df_quad.attrs.update(metadata)
+    write_table(mod_df_quad, with_output_format('modified_data_quad.csv'), Modifikation='quadratisch')
+
+def modified_interpolator(name, method):
+    # Interpolator der modifizierten Kurve name ('neu', 'oben', 'unten') aus dem Cache
+    suffix = 'cubic' if method == 'cubic' else 'quad'
+    return interpolators.get(f'{name}_modifiziert', modified_data[f'H_{name}_{suffix}'], modified_data[f'B_{name}_{suffix}'], method)
 
 def calculate_differences():
     differences = {
-        'Neukurve (kubisch)': np.abs(original_data['B_neu'] - CubicSpline(modified_data['H_neu_cubic'], modified_data['B_neu_cubic'])(original_data['H_neu'])),
-        'Obere Hysterese (kubisch)': np.abs(original_data['B_oben'] - CubicSpline(modified_data['H_oben_cubic'], modified_data['B_oben_cubic'])(original_data['H_oben'])),
-        'Untere Hysterese (kubisch)': np.abs(original_data['B_unten'] - CubicSpline(modified_data['H_unten_cubic'], modified_data['B_unten_cubic'])(original_data['H_unten'])),
-        'Neukurve (quadratisch)': np.abs(original_data['B_neu'] - interp1d(modified_data['H_neu_quad'], modified_data['B_neu_quad'], kind='quadratic')(original_data['H_neu'])),
-        'Obere Hysterese (quadratisch)': np.abs(original_data['B_oben'] - interp1d(modified_data['H_oben_quad'], modified_data['B_oben_quad'], kind='quadratic')(original_data['H_oben'])),
-        'Untere Hysterese (quadratisch)': np.abs(original_data['B_unten'] - interp1d(modified_data['H_unten_quad'], modified_data['B_unten_quad'], kind='quadratic')(original_data['H_unten']))
+        'Neukurve (kubisch)': np.abs(original_data['B_neu'] - modified_interpolator('neu', 'cubic')(original_data['H_neu'])),
+        'Obere Hysterese (kubisch)': np.abs(original_data['B_oben'] - modified_interpolator('oben', 'cubic')(original_data['H_oben'])),
+        'Untere Hysterese (kubisch)': np.abs(original_data['B_unten'] - modified_interpolator('unten', 'cubic')(original_data['H_unten'])),
+        'Neukurve (quadratisch)': np.abs(original_data['B_neu'] - modified_interpolator('neu', 'quadratic')(original_data['H_neu'])),
+        'Obere Hysterese (quadratisch)': np.abs(original_data['B_oben'] - modified_interpolator('oben', 'quadratic')(original_data['H_oben'])),
+        'Untere Hysterese (quadratisch)': np.abs(original_data['B_unten'] - modified_interpolator('unten', 'quadratic')(original_data['H_unten']))
     }
     for key, value in differences.items():
         print(f"Maximale Differenz für {key}: {np.max(value)}")
 
+def export_lookup_tables():
+    # Nachschlagetabellen B(H) und H(B) der kubisch modifizierten Kurven für Simulationsprogramme
+    if 'H_neu_cubic' not in modified_data:
+        messagebox.showerror("Datenfehler", "Bitte zuerst die Daten modifizieren.")
+        return
+    output_dir = filedialog.askdirectory(title="Zielordner für die Tabellen")
+    if not output_dir:
+        return
+    for name in ('neu', 'oben', 'unten'):
+        report = export_tables(modified_interpolator(name, 'cubic'), output_dir, f'tabelle_{name}')
+        print(format_report(f'tabelle_{name}', report))
+    print(f"Tabellen wurden in '{output_dir}' gespeichert.")
+
 def update_plot():
     ax.clear()
     ax.grid(True)
@@ -111,8 +152,7 @@ def update_plot():
         ax.plot(modified_data['H_unten_cubic'], modified_data['B_unten_cubic'], 'rx', label='Modifiziert untere Hysterese (kubisch)', linestyle='None')
         for curve, label in zip(['H_neu_cubic', 'H_oben_cubic', 'H_unten_cubic'], ['Neukurve (kubisch)', 'obere Hysterese (kubisch)', 'untere Hysterese (kubisch)']):
             H = modified_data[curve]
-            B = modified_data[f'B_{curve.split("_")[1]}_cubic']
-            cs = CubicSpline(H, B)
+            cs = modified_interpolator(curve.split("_")[1], 'cubic')
             H_smooth = np.linspace(H.min(), H.max(), 500)
             B_smooth = cs(H_smooth)
             ax.plot(H_smooth, B_smooth, label=f'Modifiziert {label}', alpha=0.5)
@@ -123,8 +163,7 @@ def update_plot():
         ax.plot(modified_data['H_unten_quad'], modified_data['B_unten_quad'], 'r+', label='Modifiziert untere Hysterese (quadratisch)', linestyle='None')
         for curve, label in zip(['H_neu_quad', 'H_oben_quad', 'H_unten_quad'], ['Neukurve (quadratisch)', 'obere Hysterese (quadratisch)', 'untere Hysterese (quadratisch)']):
             H = modified_data[curve]
-            B = modified_data[f'B_{curve.split("_")[1]}_quad']
-            qs = interp1d(H, B, kind='quadratic')
+            qs = modified_interpolator(curve.split("_")[1], 'quadratic')
             H_smooth = np.linspace(H.min(), H.max(), 500)
             B_smooth_qs = qs(H_smooth)
             ax.plot(H_smooth, B_smooth_qs, label=f'Modifiziert {label}', alpha=0.5, linestyle='dashed')
@@ -132,46 +171,62 @@ def update_plot():
     ax.legend(fontsize=11)
     canvas.draw()
 
-root = tk.Tk()
-root.title("CSV File Modifier")
-
 original_data = {}
 modified_data = {}
+metadata = {}
+# Angepasste Interpolatoren für Modifikation, Differenzen und Darstellung
+interpolators = InterpolatorCache()
+
+# Die Oberfläche wird nur beim direkten Start aufgebaut, damit das Skript importierbar bleibt
+if __name__ == '__main__':
+    root = tk.Tk()
+    root.title("CSV File Modifier")
+
+    frame = tk.Frame(root)
+    frame.pack(padx=10, pady=10)
+
+    tk.Button(frame, text="Datei laden", command=load_file, font=('Helvetica', 13)).grid(row=0, column=0, padx=5, pady=5)
+
+    tk.Label(frame, text="Anzahl Datenpunkte Neukurve:", font=('Helvetica', 13)).grid(row=1, column=0, padx=5, pady=5)
+    neu_points_entry = tk.Entry(frame, font=('Helvetica', 13))
+    neu_points_entry.grid(row=1, column=1, padx=5, pady=5)
 
-frame = tk.Frame(root)
-frame.pack(padx=10, pady=10)
+    tk.Label(frame, text="Anzahl Datenpunkte obere Hysterese:", font=('Helvetica', 13)).grid(row=2, column=0, padx=5, pady=5)
+    oben_points_entry = tk.Entry(frame, font=('Helvetica', 13))
+    oben_points_entry.grid(row=2, column=1, padx=5, pady=5)
 
-tk.Button(frame, text="Datei laden", command=load_file, font=('Helvetica', 13)).grid(row=0, column=0, padx=5, pady=5)
+    tk.Label(frame, text="Anzahl Datenpunkte untere Hysterese:", font=('Helvetica', 13)).grid(row=3, column=0, padx=5, pady=5)
+    unten_points_entry = tk.Entry(frame, font=('Helvetica', 13))
+    unten_points_entry.grid(row=3, column=1, padx=5, pady=5)
 
-tk.Label(frame, text="Anzahl Datenpunkte Neukurve:", font=('Helvetica', 13)).grid(row=1, column=0, padx=5, pady=5)
-neu_points_entry = tk.Entry(frame, font=('Helvetica', 13))
-neu_points_entry.grid(row=1, column=1, padx=5, pady=5)
+    # Leer: feste Punktzahlen oben, sonst kleinste adaptive Tabelle mit dieser maximalen Abweichung
+    tk.Label(frame, text="Max. Abweichung B in T (optional):", font=('Helvetica', 13)).grid(row=4, column=0, padx=5, pady=5)
+    max_error_entry = tk.Entry(frame, font=('Helvetica', 13))
+    max_error_entry.grid(row=4, column=1, padx=5, pady=5)
 
-tk.Label(frame, text="Anzahl Datenpunkte obere Hysterese:", font=('Helvetica', 13)).grid(row=2, column=0, padx=5, pady=5)
-oben_points_entry = tk.Entry(frame, font=('Helvetica', 13))
-oben_points_entry.grid(row=2, column=1, padx=5, pady=5)
+    # Angehakt: maximale Abweichung als Anteil von max|B| (z.B. 0,001 = 0,1 %)
+    relative_error_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(frame, text="Abweichung relativ zu max|B|", variable=relative_error_var, font=('Helvetica', 13)).grid(row=5, column=0, columnspan=2, padx=5, pady=5)
 
-tk.Label(frame, text="Anzahl Datenpunkte untere Hysterese:", font=('Helvetica', 13)).grid(row=3, column=0, padx=5, pady=5)
-unten_points_entry = tk.Entry(frame, font=('Helvetica', 13))
-unten_points_entry.grid(row=3, column=1, padx=5, pady=5)
+    tk.Button(frame, text="Daten modifizieren", command=modify_data, font=('Helvetica', 13)).grid(row=6, column=0, columnspan=2, padx=5, pady=5)
 
-tk.Button(frame, text="Daten modifizieren", command=modify_data, font=('Helvetica', 13)).grid(row=4, column=0, columnspan=2, padx=5, pady=5)
+    tk.Button(frame, text="Tabellen exportieren", command=export_lookup_tables, font=('Helvetica', 13)).grid(row=10, column=0, columnspan=2, padx=5, pady=5)
 
-show_original_var = tk.BooleanVar(value=True)
-tk.Checkbutton(frame, text="Originaldaten anzeigen", variable=show_original_var, command=update_plot, font=('Helvetica', 13)).grid(row=5, column=0, columnspan=2, padx=5, pady=5)
+    show_original_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(frame, text="Originaldaten anzeigen", variable=show_original_var, command=update_plot, font=('Helvetica', 13)).grid(row=7, column=0, columnspan=2, padx=5, pady=5)
 
-show_cubic_var = tk.BooleanVar(value=True)
-tk.Checkbutton(frame, text="Modifizierte Daten (kubisch) anzeigen", variable=show_cubic_var, command=update_plot, font=('Helvetica', 13)).grid(row=6, column=0, columnspan=2, padx=5, pady=5)
+    show_cubic_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(frame, text="Modifizierte Daten (kubisch) anzeigen", variable=show_cubic_var, command=update_plot, font=('Helvetica', 13)).grid(row=8, column=0, columnspan=2, padx=5, pady=5)
 
-show_quadratic_var = tk.BooleanVar(value=True)
-tk.Checkbutton(frame, text="Modifizierte Daten (quadratisch) anzeigen", variable=show_quadratic_var, command=update_plot, font=('Helvetica', 13)).grid(row=7, column=0, columnspan=2, padx=5, pady=5)
+    show_quadratic_var = tk.BooleanVar(value=True)
+    tk.Checkbutton(frame, text="Modifizierte Daten (quadratisch) anzeigen", variable=show_quadratic_var, command=update_plot, font=('Helvetica', 13)).grid(row=9, column=0, columnspan=2, padx=5, pady=5)
 
-fig, ax = plt.subplots()
-canvas = FigureCanvasTkAgg(fig, master=root)
-canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    fig, ax = plt.subplots()
+    canvas = FigureCanvasTkAgg(fig, master=root)
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-toolbar = NavigationToolbar2Tk(canvas, root)
-toolbar.update()
-canvas.get_tk_widget().pack()
+    toolbar = NavigationToolbar2Tk(canvas, root)
+    toolbar.update()
+    canvas.get_tk_widget().pack()
 
-root.mainloop()
+    root.mainloop()
@@ -1,57 +1,34 @@
-import pandas as pd
 import matplotlib.pyplot as plt
-import numpy as np
 from tkinter import Tk, filedialog, Button
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.widgets import CheckButtons
 from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
-
-# Konstante für die magnetische Feldkonstante μ0
-mu_0 = 4 * np.pi * 10**-7
-
-# Funktion zur Berechnung der Magnetisierung
-def magnetization(B, H):
-    return B / mu_0 - H
-
-# Funktion zur Berechnung der Polarisation
-def polarization(B, H):
-    return B - mu_0 * H
+from kennlinie.speicherformat import read_table, write_table, with_output_format, FILETYPES
+from kennlinie.kurvensatz import BRANCH_NAMES, CurveSet
+from kennlinie.kennwerte import CURVE_SUFFIXES, derived_quantities
+from kennlinie.darstellung import LinePlot
 
 # Funktion zur Verarbeitung der ausgewählten Datei
 def process_file(file_path):
     if not file_path:
         print("Keine Datei ausgewählt. Das Programm wird beendet.")
         return
-    data = pd.read_csv(file_path)
+    data = read_table(file_path)
     print("Rohdaten:")
     print(data.head())  # Debugging-Ausgabe: Zeige die ersten Zeilen der Rohdaten
     
-    result_data_magnetization = []
-    result_data_polarization = []
+    # Berechnung der Magnetisierung und Polarisation für alle Kurven (Neukurve, obere und untere Hystereseschleife)
+    curve_set = CurveSet.from_dataframe(data)
+    results = derived_quantities(curve_set, energy=True)
+    suffixes = CURVE_SUFFIXES[:len(curve_set)]
     
-    # Berechnung der Magnetisierung und Polarisation für obere Hystereseschleife
-    for index, row in data.iterrows():
-        H_upper = float(row['H_fine_2'])
-        B_upper = float(row['B_fine_2'])
-        M_upper = magnetization(B_upper, H_upper)
-        J_upper = polarization(B_upper, H_upper)
-        result_data_magnetization.append({'H_upper': H_upper, 'M_upper': M_upper})
-        result_data_polarization.append({'H_upper': H_upper, 'J_upper': J_upper})
-        
-    # Berechnung der Magnetisierung und Polarisation für untere Hystereseschleife
-    for index, row in data.iterrows():
-        H_lower = float(row['H_fine_3'])
-        B_lower = float(row['B_fine_3'])
-        M_lower = magnetization(B_lower, H_lower)
-        J_lower = polarization(B_lower, H_lower)
-        result_data_magnetization.append({'H_lower': H_lower, 'M_lower': M_lower})
-        result_data_polarization.append({'H_lower': H_lower, 'J_lower': J_lower})
+    result_df_magnetization = results[[f'{name}_{suffix}' for suffix in suffixes for name in ('H', 'M')]]
+    result_df_polarization = results[[f'{name}_{suffix}' for suffix in suffixes for name in ('H', 'J', 'w')]]
     
-    result_df_magnetization = pd.DataFrame(result_data_magnetization)
-    result_df_polarization = pd.DataFrame(result_data_polarization)
-    
-    result_df_magnetization.to_csv('berechnete_magnetisierung.csv', index=False)
-    result_df_polarization.to_csv('berechnete_polarisation.csv', index=False)
+    result_df_magnetization.attrs.update(data.attrs)
+    result_df_polarization.attrs.update(data.attrs)
+    write_table(result_df_magnetization, with_output_format('berechnete_magnetisierung.csv'))
+    write_table(result_df_polarization, with_output_format('berechnete_polarisation.csv'))
     
     # Erstelle ein Tkinter-Fenster und bette den Matplotlib-Plot darin ein
     plot_window = Tk()
@@ -61,9 +38,19 @@ def process_file(file_path):
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
     plt.subplots_adjust(left=0.3, hspace=0.5)  # Platz für die Checkbuttons lassen und Abstand zwischen den Plots
 
-    # Erster Plot: Magnetisierungsdaten
-    l1, = ax1.plot(result_df_magnetization['H_upper'], result_df_magnetization['M_upper'], label='Magnetisierung oben', color='blue')
-    l2, = ax1.plot(result_df_magnetization['H_lower'], result_df_magnetization['M_lower'], label='Magnetisierung unten', color='cyan')
+    # Canvas erstellen und Matplotlib-Figur einbetten
+    canvas = FigureCanvasTkAgg(fig, master=plot_window)
+    plots = {'Magnetisierung': LinePlot(ax1, canvas), 'Polarisation': LinePlot(ax2, canvas)}
+
+    # Erster Plot: Magnetisierungsdaten, zweiter Plot: Polarisationsdaten (ausgedünnt gezeichnet)
+    colors = {'Magnetisierung': ['navy', 'blue', 'cyan'], 'Polarisation': ['darkgreen', 'green', 'lightgreen']}
+    labels = []
+    for quantity, column in (('Magnetisierung', 'M'), ('Polarisation', 'J')):
+        for i, suffix in enumerate(suffixes):
+            label = f'{quantity} {BRANCH_NAMES[i]}'
+            plots[quantity].line(label, results[f'H_{suffix}'].to_numpy(), results[f'{column}_{suffix}'].to_numpy(), label=label, color=colors[quantity][i % 3])
+            labels.append(label)
+
     ax1.set_xlabel('H [A/m]', fontsize=13)
     ax1.set_ylabel('M [A/m]', fontsize=13)
     ax1.set_title('Magnetisierung', fontsize=13)
@@ -71,9 +58,6 @@ def process_file(file_path):
     ax1.legend(loc='upper right', fontsize=11)
     ax1.tick_params(axis='both', which='major', labelsize=13)
 
-    # Zweiter Plot: Polarisationsdaten
-    l3, = ax2.plot(result_df_polarization['H_upper'], result_df_polarization['J_upper'], label='Polarisation oben', color='green')
-    l4, = ax2.plot(result_df_polarization['H_lower'], result_df_polarization['J_lower'], label='Polarisation unten', color='lightgreen')
     ax2.set_xlabel('H [A/m]', fontsize=13)
     ax2.set_ylabel('J [T]', fontsize=13)
     ax2.set_title('Polarisation', fontsize=13)
@@ -83,26 +67,18 @@ def process_file(file_path):
 
     # Checkbuttons erstellen
     rax = plt.axes([0.05, 0.4, 0.2, 0.2])
-    labels = ['Magnetisierung oben', 'Magnetisierung unten', 'Polarisation oben', 'Polarisation unten']
-    visibility = [True, True, True, True]
+    visibility = [True] * len(labels)
     check = CheckButtons(rax, labels, visibility)
 
     # Funktion zum Ein- und Ausblenden der Linien
     def func(label):
-        if label == 'Magnetisierung oben':
-            l1.set_visible(not l1.get_visible())
-        elif label == 'Magnetisierung unten':
-            l2.set_visible(not l2.get_visible())
-        elif label == 'Polarisation oben':
-            l3.set_visible(not l3.get_visible())
-        elif label == 'Polarisation unten':
-            l4.set_visible(not l4.get_visible())
-        plt.draw()
+        plot = plots[label.split()[0]]
+        plot.show(label, not plot.lines[label].get_visible())
+        plot.refine()
+        canvas.draw_idle()
 
     check.on_clicked(func)
 
-    # Canvas erstellen und Matplotlib-Figur einbetten
-    canvas = FigureCanvasTkAgg(fig, master=plot_window)
     canvas.draw()
     canvas.get_tk_widget().pack(side='top', fill='both', expand=1)
 
@@ -117,14 +93,15 @@ def process_file(file_path):
 def open_file_dialog():
     root = Tk()
     root.withdraw()  # Verhindert das Anzeigen des leeren Fensters
-    file_path = filedialog.askopenfilename()  # Öffnet den Dateiauswahldialog
+    file_path = filedialog.askopenfilename(filetypes=FILETYPES)  # Öffnet den Dateiauswahldialog
     root.destroy()  # Schließt das Tkinter-Fenster
     process_file(file_path)
 
-# Den Tkinter-Hauptloop starten
-root = Tk()
-root.geometry("200x50")  # Setze die Größe des Fensters
-button = Button(root, text="Durchsuchen", command=open_file_dialog, font=('Helvetica', 13))
-button.pack()
+# Den Tkinter-Hauptloop starten (nur beim direkten Start, das Skript bleibt importierbar)
+if __name__ == '__main__':
+    root = Tk()
+    root.geometry("200x50")  # Setze die Größe des Fensters
+    button = Button(root, text="Durchsuchen", command=open_file_dialog, font=('Helvetica', 13))
+    button.pack()
 
-root.mainloop()
+    root.mainloop()
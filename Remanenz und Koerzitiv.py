@@ -1,95 +1,42 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-from tkinter import Tk, filedialog, Button, Label
+from tkinter import Tk, filedialog, Button, Label, X
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.widgets import CheckButtons
 from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
-
-# Funktion zur Berechnung der Remanenz mit linearer Interpolation
-def calculate_remanence(h_values, b_values):
-    zero_crossing_index = np.where(np.diff(np.sign(h_values)))[0]
-
-    if len(zero_crossing_index) == 0:
-        return None  # Kein Schnittpunkt mit der Y-Achse gefunden
-
-    zero_crossing_index = zero_crossing_index[0]
-
-    # Werte vor und nach dem Schnittpunkt
-    h1, h2 = h_values.iloc[zero_crossing_index], h_values.iloc[zero_crossing_index + 1]
-    b1, b2 = b_values.iloc[zero_crossing_index], b_values.iloc[zero_crossing_index + 1]
-
-    # Lineare Interpolation
-    remanence = b1 + (b2 - b1) * (0 - h1) / (h2 - h1)
-    
-    return remanence
-
-# Funktion zur Berechnung der Koerzitivfeldstärke mit linearer Interpolation
-def calculate_coercivity(h_values, b_values):
-    zero_crossing_index = np.where(np.diff(np.sign(b_values)))[0]
-
-    if len(zero_crossing_index) == 0:
-        return None  # Kein Schnittpunkt mit der X-Achse gefunden
-
-    zero_crossing_index = zero_crossing_index[0]
-
-    # Werte vor und nach dem Schnittpunkt
-    b1, b2 = b_values.iloc[zero_crossing_index], b_values.iloc[zero_crossing_index + 1]
-    h1, h2 = h_values.iloc[zero_crossing_index], h_values.iloc[zero_crossing_index + 1]
-
-    # Lineare Interpolation
-    coercivity = h1 + (h2 - h1) * (0 - b1) / (b2 - b1)
-    
-    return coercivity
+from kennlinie.speicherformat import read_table, FILETYPES
+from kennlinie.kennwerte import axis_crossings, loop_characteristics
+from kennlinie.kurvensatz import CurveSet
+from kennlinie.hintergrund import TaskPanel
+from kennlinie.serie import remanence_table
 
 # Funktion zur Verarbeitung der ausgewählten Datei
 def process_file(file_path):
     if not file_path:
         print("Keine Datei ausgewählt. Das Programm wird beendet.")
         return
-    data = pd.read_csv(file_path)
+    data = read_table(file_path)
     print("Rohdaten:")
     print(data.head())  # Debugging-Ausgabe: Zeige die ersten Zeilen der Rohdaten
 
-    # Berechne die obere Remanenz
-    h_values_upper = data.iloc[:, 2]
-    b_values_upper = data.iloc[:, 3]
-    upper_remanence = calculate_remanence(h_values_upper, b_values_upper)
-
-    if upper_remanence is None:
-        print("Kein Schnittpunkt mit der Y-Achse für obere Remanenz gefunden.")
-        upper_remanence = "Nicht gefunden"
-    else:
-        print(f"Obere Remanenz: {upper_remanence}")
-
-    # Berechne die untere Remanenz
-    h_values_lower = data.iloc[:, 4]
-    b_values_lower = data.iloc[:, 5]
-    lower_remanence = calculate_remanence(h_values_lower, b_values_lower)
-
-    if lower_remanence is None:
-        print("Kein Schnittpunkt mit der Y-Achse für untere Remanenz gefunden.")
-        lower_remanence = "Nicht gefunden"
-    else:
-        print(f"Untere Remanenz: {lower_remanence}")
-
-    # Berechne die negative Koerzitivfeldstärke (obere Hystereseschleife)
-    negative_coercivity = calculate_coercivity(h_values_upper, b_values_upper)
-
-    if negative_coercivity is None:
-        print("Kein Schnittpunkt mit der X-Achse für negative Koerzitivfeldstärke gefunden.")
-        negative_coercivity = "Nicht gefunden"
-    else:
-        print(f"Negative Koerzitivfeldstärke: {negative_coercivity}")
-
-    # Berechne die positive Koerzitivfeldstärke (untere Hystereseschleife)
-    positive_coercivity = calculate_coercivity(h_values_lower, b_values_lower)
-
-    if positive_coercivity is None:
-        print("Kein Schnittpunkt mit der X-Achse für positive Koerzitivfeldstärke gefunden.")
-        positive_coercivity = "Nicht gefunden"
-    else:
-        print(f"Positive Koerzitivfeldstärke: {positive_coercivity}")
+    # Alle Nulldurchgänge von H und B auf allen Kurven; Br±, Hc± und Asymmetrie aus den Grenzkurven
+    # Kürzere Kurven sind am Ende mit leeren Zellen aufgefüllt, diese werden nicht berücksichtigt
+    curve_set = CurveSet.from_dataframe(data)
+    crossings = axis_crossings(curve_set)
+    results = loop_characteristics(curve_set, crossings=crossings)
+    print("Nulldurchgänge:")
+    print(crossings.to_string(index=False))
+
+    values = {}
+    for name, key, unit in (('Positive Remanenz', 'Br+ in T', 'T'), ('Negative Remanenz', 'Br- in T', 'T'),
+                            ('Positive Koerzitivfeldstärke', 'Hc+ in A/m', 'A/m'),
+                            ('Negative Koerzitivfeldstärke', 'Hc- in A/m', 'A/m')):
+        if np.isnan(results[key]):
+            print(f"{name}: kein Nulldurchgang gefunden.")
+            values[name] = "Nicht gefunden"
+        else:
+            print(f"{name}: {results[key]}")
+            values[name] = f"{results[key]:.6g} {unit}"
 
     # Erstelle ein Tkinter-Fenster und bette den Matplotlib-Plot darin ein
     plot_window = Tk()
@@ -108,6 +55,8 @@ def process_file(file_path):
     ax.set_ylabel('B [T]', fontsize=13)
     ax.set_title('Hystereseschleifen', fontsize=13)
     ax.grid(True)
+    # Nulldurchgänge markieren
+    ax.plot(crossings['H in A/m'], crossings['B in T'], 'o', color='black', markersize=5, label='Nulldurchgänge')
     ax.legend(loc='upper right', fontsize=11)
     ax.tick_params(axis='both', which='major', labelsize=13)
 
@@ -140,7 +89,10 @@ def process_file(file_path):
     canvas.get_tk_widget().pack(side='top', fill='both', expand=1)
 
     # Remanenz- und Koerzitivfeldstärkewerte unterhalb des Plots anzeigen
-    label = Label(plot_window, text=f"Obere Remanenz: {upper_remanence} T \nUntere Remanenz: {lower_remanence} T\nNegative Koerzitivfeldstärke: {negative_coercivity} A/m\nPositive Koerzitivfeldstärke: {positive_coercivity} A/m", font=('Helvetica', 13))
+    text = "\n".join(f"{name}: {value}" for name, value in values.items())
+    text += (f"\nAsymmetrie Br: {results['Asymmetrie Br in T']:.4g} T ({results['Asymmetrie Br in %']:.2f} %)"
+             f"\nAsymmetrie Hc: {results['Asymmetrie Hc in A/m']:.4g} A/m ({results['Asymmetrie Hc in %']:.2f} %)")
+    label = Label(plot_window, text=text, font=('Helvetica', 13))
     label.pack()
 
     plot_window.mainloop()
@@ -149,14 +101,41 @@ def process_file(file_path):
 def open_file_dialog():
     root = Tk()
     root.withdraw()  # Verhindert das Anzeigen des leeren Fensters
-    file_path = filedialog.askopenfilename()  # Öffnet den Dateiauswahldialog
+    file_path = filedialog.askopenfilename(filetypes=FILETYPES)  # Öffnet den Dateiauswahldialog
     root.destroy()  # Schließt das Tkinter-Fenster
     process_file(file_path)
 
-# Den Tkinter-Hauptloop starten
-root = Tk()
-root.geometry("200x50")  # Setze die Größe des Fensters
-button = Button(root, text="Durchsuchen", command=open_file_dialog, font=('Helvetica', 13))
-button.pack()
-
-root.mainloop()
+# Serienauswertung: alle Kurvensätze eines Ordners (z.B. einer Fertigungscharge) parallel auswerten.
+# Die Auswertung läuft im Hintergrund, das Fenster bleibt bedienbar.
+def open_folder_dialog():
+    folder = filedialog.askdirectory()
+    if not folder:
+        print("Kein Ordner ausgewählt.")
+        return
+    task_panel.run(compute_remanence_series, show_remanence_series, folder, text="Ordner wird ausgewertet ...")
+
+def compute_remanence_series(task, folder):
+    # Läuft im Hintergrund-Thread: keine Tk-Widgets verwenden. Fortschritt je ausgewerteter Datei, beim Abbrechen
+    # werden die ausstehenden Dateien verworfen.
+    return remanence_table([folder], progress=task.progress)
+
+def show_remanence_series(table):
+    print(table.to_string(index=False))
+    output_path = filedialog.asksaveasfilename(defaultextension='.csv', initialfile='Remanenz_Koerzitiv_Serie.csv',
+                                               filetypes=[("CSV-Dateien", "*.csv")])
+    if output_path:
+        table.to_csv(output_path, index=False)
+        print(f"{len(table)} Dateien ausgewertet, Tabelle gespeichert als '{output_path}'.")
+
+# Den Tkinter-Hauptloop starten (nur beim direkten Start, das Skript bleibt importierbar)
+if __name__ == '__main__':
+    root = Tk()
+    root.geometry("420x120")  # Setze die Größe des Fensters
+    button = Button(root, text="Durchsuchen", command=open_file_dialog, font=('Helvetica', 13))
+    button.pack()
+    folder_button = Button(root, text="Ordner auswerten", command=open_folder_dialog, font=('Helvetica', 13))
+    folder_button.pack()
+    task_panel = TaskPanel(root)
+    task_panel.pack(fill=X)
+
+    root.mainloop()
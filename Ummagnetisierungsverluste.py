@@ -1,52 +1,51 @@
+import os
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from scipy.interpolate import interp1d
-from scipy.optimize import brentq
+from kennlinie.speicherformat import read_table, FILETYPES
+from kennlinie.darstellung import LinePlot
+from kennlinie.kennwerte import loss_area, loss_factor
+from kennlinie.hintergrund import TaskPanel
+from kennlinie.serie import DEFAULT_OUTPUTS, loss_map, loss_table, map_path, read_manifest
+from kennlinie.verlustmodell import fit_models, format_models, save_models
 
 def load_file():
-    file_path = filedialog.askopenfilename()
+    file_path = filedialog.askopenfilename(filetypes=FILETYPES)
     if file_path:
         process_file(file_path)
 
-def find_intersection(H_upper_interp, H_lower_interp, B_diff):
-    H_values = np.linspace(0, min(H_upper_interp.x[-1], H_lower_interp.x[-1]), 10000)
-    intersections = []
-
-    for i in range(len(H_values) - 1):
-        if B_diff(H_values[i]) * B_diff(H_values[i + 1]) < 0:
-            H_intersection = brentq(B_diff, H_values[i], H_values[i + 1])
-            intersections.append(H_intersection)
-
-    return intersections
-
-def find_zero_crossing(interp_func, H_range):
-    for i in range(len(H_range) - 1):
-        if interp_func(H_range[i]) * interp_func(H_range[i + 1]) < 0:
-            return brentq(interp_func, H_range[i], H_range[i + 1])
-    return None
-
 def process_file(file_path):
-    global total_area
-    data = pd.read_csv(file_path)
-    H_upper = data.iloc[:, 2]
-    B_upper = data.iloc[:, 3]
-    H_lower = data.iloc[:, 4]
-    B_lower = data.iloc[:, 5]
-
-    # Lineare Interpolation innerhalb der Datenbereiche
-    H_upper_interp = interp1d(H_upper, B_upper, kind='linear', fill_value="extrapolate")
-    H_lower_interp = interp1d(H_lower, B_lower, kind='linear', fill_value="extrapolate")
-    B_diff = lambda H: H_upper_interp(H) - H_lower_interp(H)
-
-    # Find intersections
-    intersections = find_intersection(H_upper_interp, H_lower_interp, B_diff)
-    
-    upper_zero_crossing = find_zero_crossing(H_upper_interp, np.linspace(H_upper.min(), H_upper.max(), 10000))
-    lower_zero_crossing = find_zero_crossing(H_lower_interp, np.linspace(H_lower.min(), H_lower.max(), 10000))
+    # Einlesen und Flächenberechnung laufen im Hintergrund, die Oberfläche bleibt bedienbar
+    task_panel.run(compute_losses, show_losses, file_path, text="Verluste werden berechnet ...")
+
+def compute_losses(task, file_path):
+    # Läuft im Hintergrund-Thread: keine Tk-Widgets verwenden
+    data = read_table(file_path)
+    # Kürzere Kurven sind am Ende mit leeren Zellen aufgefüllt, diese werden nicht berücksichtigt
+    H_upper = data.iloc[:, 2].dropna()
+    B_upper = data.iloc[:, 3].dropna()
+    H_lower = data.iloc[:, 4].dropna()
+    B_lower = data.iloc[:, 5].dropna()
+
+    # Schnittpunkte, Nulldurchgänge, Flächen unter beiden Kurven und umschlossene Fläche der Schleife
+    task.progress(0.2, "Schnittpunkte und Flächen ...")
+    return file_path, H_upper, B_upper, H_lower, B_lower, loss_area(H_upper, B_upper, H_lower, B_lower)
+
+def file_key(file_path):
+    # Vergleichbarer Schlüssel eines Dateipfads (absolut, unter Windows ohne Groß-/Kleinschreibung)
+    return os.path.normcase(os.path.abspath(file_path))
+
+def show_losses(losses):
+    global total_area, B_peak, loaded_file
+    loaded_file, H_upper, B_upper, H_lower, B_lower, result = losses
+    # Amplitude der Schleife für die Vorhersage mit dem Verlustmodell
+    B_peak = (max(B_upper.max(), B_lower.max()) - min(B_upper.min(), B_lower.min())) / 2
+    H_upper_interp, H_lower_interp = result['H_upper_interp'], result['H_lower_interp']
+    intersections = result['intersections']
+    upper_zero_crossing = result['upper_zero_crossing']
+    lower_zero_crossing = result['lower_zero_crossing']
     
     if upper_zero_crossing is not None:
         print(f"Die obere Hysteresekurve schneidet die H-Achse bei H = {upper_zero_crossing}")
@@ -61,93 +60,62 @@ def process_file(file_path):
     if intersections:
         for H in intersections:
             print(f"Ja, es gibt einen Schnittpunkt bei H = {H}")
-        upper_limit = intersections[0]
     else:
         print("Nein, es gibt keinen Schnittpunkt")
         if H_upper.iloc[-1] < H_lower.iloc[-1]:
             print(f"Obere Hysteresekurve ist etwas kürzer. Der letzte H Wert liegt bei H = {H_upper.iloc[-1]}")
-            upper_limit = H_upper.iloc[-1]
         elif H_lower.iloc[-1] < H_upper.iloc[-1]:
             print(f"Untere Hysteresekurve ist etwas kürzer. Der letzte H Wert liegt bei H = {H_lower.iloc[-1]}")
-            upper_limit = H_lower.iloc[-1]
         else:
             print(f"Die Kurven sind gleich lang. Der letzte H Wert beider Kurven liegt bei H = {H_upper.iloc[-1]}")
-            upper_limit = H_upper.iloc[-1]
 
-    # Calculate the area under the upper hysteresis curve using the trapezoidal rule
-    if upper_zero_crossing is not None:
-        H_values_for_area_upper = np.linspace(upper_zero_crossing, upper_limit, 10000)
-        B_values_for_area_upper = H_upper_interp(H_values_for_area_upper)
-        area_upper = np.trapz(B_values_for_area_upper, H_values_for_area_upper)
-        print(f"Fläche unter der oberen Hysteresekurve liegt bei {area_upper}")
+    if result['area_upper'] is not None:
+        print(f"Fläche unter der oberen Hysteresekurve liegt bei {result['area_upper']}")
     else:
         print("Keine Fläche unter der oberen Hysteresekurve berechnet.")
 
-    # Calculate the area under the lower hysteresis curve using the trapezoidal rule
-    if lower_zero_crossing is not None:
-        H_values_for_area_lower = np.linspace(lower_zero_crossing, upper_limit, 10000)
-        B_values_for_area_lower = H_lower_interp(H_values_for_area_lower)
-        area_lower = np.trapz(B_values_for_area_lower, H_values_for_area_lower)
-        print(f"Fläche unter der unteren Hysteresekurve liegt bei {area_lower}")
+    if result['area_lower'] is not None:
+        print(f"Fläche unter der unteren Hysteresekurve liegt bei {result['area_lower']}")
     else:
         print("Keine Fläche unter der unteren Hysteresekurve berechnet.")
 
-    # Calculate the difference, double it, and display the result
-    if 'area_upper' in locals() and 'area_lower' in locals():
-        area_difference = abs(area_upper - area_lower)
-        total_area = 2 * area_difference
-        result_label.config(text=f"Gesamtfläche zwischen beiden Kurven: {total_area:.2f} Ws/m³")
-        print(f"Gesamtfläche zwischen beiden Kurven liegt bei {total_area} Ws/m³")
+    # Von der Schleife umschlossene Fläche (exakt aus den Messpunkten, auch für unsymmetrische Schleifen)
+    total_area = result['total_area']
+    if total_area is not None:
+        result_label.config(text=f"Von der Schleife umschlossene Fläche: {total_area:.2f} Ws/m³")
+        print(f"Von der Schleife umschlossene Fläche liegt bei {total_area} Ws/m³")
         # Activate the input fields
         duration_entry.config(state='normal')
         density_entry.config(state='normal')
     else:
-        total_area = None
         result_label.config(text="Gesamtfläche konnte nicht berechnet werden.")
         print("Gesamtfläche konnte nicht berechnet werden.")
 
-    # Plot the data
-    fig, ax = plt.subplots()
+    # Plot the data (Linien und Achse werden wiederverwendet, nur die Daten werden ersetzt)
     H_range_upper = np.linspace(H_upper.min(), H_upper.max(), 10000)
     H_range_lower = np.linspace(H_lower.min(), H_lower.max(), 10000)
     
     # Plot original data
-    ax.plot(H_upper, B_upper, 'o', label='Original Obere Hysteresekurve')
-    ax.plot(H_lower, B_lower, 'o', label='Original Untere Hysteresekurve')
+    plot.line('original_upper', H_upper, B_upper, 'o', label='Original Obere Hysteresekurve')
+    plot.line('original_lower', H_lower, B_lower, 'o', label='Original Untere Hysteresekurve')
     
     # Plot interpolated data
-    ax.plot(H_range_upper, H_upper_interp(H_range_upper), '-', label='Interpoliert Obere Hysteresekurve')
-    ax.plot(H_range_lower, H_lower_interp(H_range_lower), '-', label='Interpoliert Untere Hysteresekurve')
+    plot.line('interp_upper', H_range_upper, H_upper_interp(H_range_upper), '-', label='Interpoliert Obere Hysteresekurve')
+    plot.line('interp_lower', H_range_lower, H_lower_interp(H_range_lower), '-', label='Interpoliert Untere Hysteresekurve')
     
     # Schraffierte Fläche obere Hysteresekurve
     if upper_zero_crossing is not None:
-        ax.fill_between(H_values_for_area_upper, B_values_for_area_upper, alpha=0.3, color='blue', hatch='//')
+        plot.fill('area_upper', result['H_area_upper'], result['B_area_upper'], alpha=0.3, color='blue', hatch='//')
+    else:
+        plot.fill('area_upper', None, None)
 
     # Schraffierte Fläche untere Hysteresekurve
     if lower_zero_crossing is not None:
-        ax.fill_between(H_values_for_area_lower, B_values_for_area_lower, alpha=0.3, color='red', hatch='\\')
-
-    ax.legend(fontsize=11)
-    ax.set_xlabel('H [A/m]', fontsize=13)
-    ax.set_ylabel('B [T]', fontsize=13)
-    ax.set_title('Ummagnetisierungsverluste', fontsize=13)
-    ax.axhline(0, color='black', linewidth=0.5)
-    ax.axvline(0, color='black', linewidth=0.5)
-    ax.grid(color='gray', linestyle='--', linewidth=0.5)
-    ax.tick_params(axis='both', which='major', labelsize=13)
-
-    # Display plot in Tkinter window
-    for widget in plot_frame.winfo_children():
-        widget.destroy()
-
-    canvas = FigureCanvasTkAgg(fig, master=plot_frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        plot.fill('area_lower', result['H_area_lower'], result['B_area_lower'], alpha=0.3, color='red', hatch='\\')
+    else:
+        plot.fill('area_lower', None, None)
 
-    # Add the toolbar
-    toolbar = NavigationToolbar2Tk(canvas, plot_frame)
-    toolbar.update()
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    plot.redraw(legend_fontsize=11)
 
 def calculate_loss_factor():
     global total_area
@@ -155,53 +123,129 @@ def calculate_loss_factor():
         duration = float(duration_entry.get())
         density = float(density_entry.get())
         if total_area is not None:
-            loss_factor = total_area / (0.8 * duration * density)
-            frequency = 1 / (0.8 * duration)
-            loss_factor_label.config(text=f"Verlustkennzahl: {loss_factor:.2f} W/kg bei {frequency:.2f} Hz", font=('Helvetica', 13))
-            # Hochrechnen der Verlustkennzahl auf 50 Hz
-            loss_factor_50Hz = loss_factor * 50 * 0.8 * duration
-            loss_factor_50Hz_label.config(text=f"Verlustkennzahl: {loss_factor_50Hz:.2f} W/kg bei 50 Hz", font=('Helvetica', 13))
+            loss, frequency, loss_50Hz = loss_factor(total_area, duration, density)
+            loss_factor_label.config(text=f"Verlustkennzahl: {loss:.2f} W/kg bei {frequency:.2f} Hz", font=('Helvetica', 13))
+            # Verlustkennzahl bei 50 Hz: mit dem Bertotti-Modell, wenn die geladene Datei zur ausgewerteten Messreihe
+            # gehört (das Modell gilt nur für dieses Material), sonst linear hochgerechnet
+            if loss_models is not None and loaded_file is not None and file_key(loaded_file) in loss_model_files:
+                loss_50Hz = float(loss_models['Bertotti'].predict(50, B_peak))
+                loss_factor_50Hz_label.config(text=f"Verlustkennzahl: {loss_50Hz:.2f} W/kg bei 50 Hz und {B_peak:.2f} T "
+                                                   f"(Bertotti-Modell der Messreihe)", font=('Helvetica', 13))
+            else:
+                loss_factor_50Hz_label.config(text=f"Verlustkennzahl: {loss_50Hz:.2f} W/kg bei 50 Hz (linear hochgerechnet)", font=('Helvetica', 13))
         else:
             loss_factor_label.config(text="Berechnen Sie zuerst die Gesamtfläche.", font=('Helvetica', 13))
     except ValueError:
         messagebox.showerror("Eingabefehler", "Bitte geben Sie gültige Zahlen für die Messdauer und die Dichte ein.")
 
-root = tk.Tk()
-root.title("CSV File Loader")
-root.geometry("800x600")
-
-btn = tk.Button(root, text="Datei auswählen", command=load_file, font=('Helvetica', 13))
-btn.pack(pady=20)
-
-plot_frame = tk.Frame(root)
-plot_frame.pack(fill=tk.BOTH, expand=True)
+# Messreihe (Manifest mit Datei, Frequenz in Hz, B_peak in T, Dichte in kg/m3 je Schleife) auf einmal auswerten
+def load_manifest():
+    manifest_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+    if manifest_path:
+        task_panel.run(compute_loss_series, show_loss_series, manifest_path, text="Messreihe wird ausgewertet ...")
+
+def compute_loss_series(task, manifest_path):
+    # Läuft im Hintergrund-Thread, die Schleifen werden in eigenen Prozessen ausgewertet. Ab drei Schleifen werden
+    # die Verlustmodelle angepasst. Fortschritt je ausgewerteter Schleife, beim Abbrechen werden die ausstehenden
+    # Schleifen verworfen.
+    table = loss_table([manifest_path], progress=lambda fraction: task.progress(0.9 * fraction))
+    task.progress(0.9, "Verlustmodelle werden angepasst ...")
+    models = fit_models(table) if table['Fehler'].isna().sum() >= 3 else None
+    files = {file_key(entry['Datei']) for entry in read_manifest(manifest_path)}
+    return table, models, files
+
+def show_loss_series(series):
+    global loss_models, loss_model_files
+    table, loss_models, loss_model_files = series
+    losses = loss_map(table)
+    print(table.to_string(index=False))
+    print("Verluste in W/kg (Zeilen: B_peak in T, Spalten: Frequenz in Hz):")
+    print(losses.to_string())
+    text = f"Messreihe: {table['Fehler'].isna().sum()} von {len(table)} Schleifen ausgewertet"
+    if loss_models is not None:
+        print(format_models(loss_models))
+        bertotti = loss_models['Bertotti']
+        text += (f"\nBertotti-Modell: Abweichung {100 * bertotti.errors['RMS rel. Abweichung']:.1f} % (RMS), "
+                 f"wird für die Verlustkennzahl bei 50 Hz der Dateien dieser Messreihe verwendet")
+    result_label.config(text=text)
+    output_path = filedialog.asksaveasfilename(defaultextension='.csv', initialfile=DEFAULT_OUTPUTS['verluste'],
+                                               filetypes=[("CSV files", "*.csv")])
+    if output_path:
+        table.to_csv(output_path, index=False)
+        losses.to_csv(map_path(output_path))
+        print(f"Tabelle gespeichert als '{output_path}', Verlustkarte als '{map_path(output_path)}'.")
+        if loss_models is not None:
+            model_path = f"{os.path.splitext(output_path)[0]}_Modell.json"
+            save_models(loss_models, model_path)
+            print(f"Verlustmodelle gespeichert als '{model_path}'.")
+
+# Die Oberfläche wird nur beim direkten Start aufgebaut, damit das Skript importierbar bleibt
+if __name__ == '__main__':
+    root = tk.Tk()
+    root.title("CSV File Loader")
+    root.geometry("800x600")
+    # Verlustmodelle der zuletzt ausgewerteten Messreihe und die Dateien, für die sie gelten
+    loss_models = None
+    loss_model_files = set()
+    loaded_file = None
+
+    button_frame = tk.Frame(root)
+    button_frame.pack(pady=20)
+    btn = tk.Button(button_frame, text="Datei auswählen", command=load_file, font=('Helvetica', 13))
+    btn.pack(side=tk.LEFT, padx=5)
+    manifest_button = tk.Button(button_frame, text="Messreihe auswerten", command=load_manifest, font=('Helvetica', 13))
+    manifest_button.pack(side=tk.LEFT, padx=5)
+
+    # Fortschritt und Abbrechen für Berechnungen im Hintergrund
+    task_panel = TaskPanel(root)
+    task_panel.pack(fill=tk.X)
+
+    plot_frame = tk.Frame(root)
+    plot_frame.pack(fill=tk.BOTH, expand=True)
+
+    # Zeichenfläche und Toolbar werden einmal angelegt und für jede geladene Datei wiederverwendet
+    fig = Figure()
+    ax = fig.add_subplot(111)
+    ax.set_xlabel('H [A/m]', fontsize=13)
+    ax.set_ylabel('B [T]', fontsize=13)
+    ax.set_title('Ummagnetisierungsverluste', fontsize=13)
+    ax.axhline(0, color='black', linewidth=0.5)
+    ax.axvline(0, color='black', linewidth=0.5)
+    ax.grid(color='gray', linestyle='--', linewidth=0.5)
+    ax.tick_params(axis='both', which='major', labelsize=13)
+    canvas = FigureCanvasTkAgg(fig, master=plot_frame)
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    toolbar = NavigationToolbar2Tk(canvas, plot_frame)
+    toolbar.update()
+    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    plot = LinePlot(ax, canvas)
 
-result_label = tk.Label(root, text="", font=('Helvetica', 13))
-result_label.pack(pady=10)
+    result_label = tk.Label(root, text="", font=('Helvetica', 13))
+    result_label.pack(pady=10)
 
-# Eingabefelder für Messdauer und Dichte, initial ausgegraut
-input_frame = tk.Frame(root)
-input_frame.pack(pady=5)
+    # Eingabefelder für Messdauer und Dichte, initial ausgegraut
+    input_frame = tk.Frame(root)
+    input_frame.pack(pady=5)
 
-duration_label = tk.Label(input_frame, text="Messdauer in s:", font=('Helvetica', 13))
-duration_label.grid(row=0, column=0, padx=5)
+    duration_label = tk.Label(input_frame, text="Messdauer in s:", font=('Helvetica', 13))
+    duration_label.grid(row=0, column=0, padx=5)
 
-duration_entry = tk.Entry(input_frame, state='disabled', font=('Helvetica', 13))
-duration_entry.grid(row=0, column=1, padx=5)
+    duration_entry = tk.Entry(input_frame, state='disabled', font=('Helvetica', 13))
+    duration_entry.grid(row=0, column=1, padx=5)
 
-density_label = tk.Label(input_frame, text="Dichte in kg/m³:", font=('Helvetica', 13))
-density_label.grid(row=0, column=2, padx=5)
+    density_label = tk.Label(input_frame, text="Dichte in kg/m³:", font=('Helvetica', 13))
+    density_label.grid(row=0, column=2, padx=5)
 
-density_entry = tk.Entry(input_frame, state='disabled', font=('Helvetica', 13))
-density_entry.grid(row=0, column=3, padx=5)
+    density_entry = tk.Entry(input_frame, state='disabled', font=('Helvetica', 13))
+    density_entry.grid(row=0, column=3, padx=5)
 
-calculate_button = tk.Button(input_frame, text="Verlustkennzahl berechnen", command=calculate_loss_factor, font=('Helvetica', 13))
-calculate_button.grid(row=0, column=4, padx=5)
+    calculate_button = tk.Button(input_frame, text="Verlustkennzahl berechnen", command=calculate_loss_factor, font=('Helvetica', 13))
+    calculate_button.grid(row=0, column=4, padx=5)
 
-loss_factor_label = tk.Label(root, text="", font=('Helvetica', 13))
-loss_factor_label.pack(pady=10)
+    loss_factor_label = tk.Label(root, text="", font=('Helvetica', 13))
+    loss_factor_label.pack(pady=10)
 
-loss_factor_50Hz_label = tk.Label(root, text="", font=('Helvetica', 13))
-loss_factor_50Hz_label.pack(pady=10)
+    loss_factor_50Hz_label = tk.Label(root, text="", font=('Helvetica', 13))
+    loss_factor_50Hz_label.pack(pady=10)
 
-root.mainloop()
+    root.mainloop()
@@ -0,0 +1 @@
+from .speicherformat import read_table, write_table
@@ -0,0 +1,309 @@
+import sys
+import time
+import numpy as np
+from scipy.signal import butter, filtfilt, sosfiltfilt
+from .filterung import butter_sos, filter_columns, filter_metrics, stream_filtfilt
+from .interpolation import DEFAULT_SMOOTHING, interpolate_curve
+from .kennwerte import derived_quantities, find_intersection, find_zero_crossing, loop_area, magnetization, polarization, trapezoid
+from .kurvensatz import CurveSet
+from .verlustmodell import fit_bertotti, fit_steinmetz
+
+# Laufzeitvergleiche der optimierten Verfahren mit der bisherigen Umsetzung.
+# Aufruf: python -m kennlinie.benchmark [Name ...]
+
+# Bisherige Berechnung der Fehlermaße und des SNR je Spaltenpaar (Referenz für filter_metrics)
+def calculate_errors(original, filtered):
+    mae = np.mean(np.abs(original - filtered))
+    mse = np.mean((original - filtered) ** 2)
+    rmse = np.sqrt(mse)
+    mape = np.mean(np.abs((original - filtered) / (original + np.finfo(float).eps))) * 100
+    mean_original = np.mean(original)
+    rmse_percent = (rmse / abs(mean_original)) * 100
+    return mae, mse, rmse, mape, rmse_percent
+
+def calculate_snr(signal, noise):
+    signal_power = np.mean(signal ** 2)
+    noise_power = np.mean(noise ** 2)
+    snr = 10 * np.log10(signal_power / noise_power)
+    return snr
+
+def synthetic_loop(num_samples, seed=0):
+    # Verrauschte Hystereseschleife (Neukurve, obere und untere Grenzkurve) mit num_samples Punkten je Spalte
+    rng = np.random.default_rng(seed)
+    H = 1000 * np.sin(np.linspace(0, np.pi, num_samples))
+    columns = []
+    for offset in (0.0, 100.0, -100.0):
+        H_noisy = H + rng.normal(0, 5, num_samples)
+        B_noisy = 1.5 * np.tanh((H + offset) / 300) + rng.normal(0, 0.01, num_samples)
+        columns += [H_noisy, B_noisy]
+    return columns
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def benchmark_filter(num_samples=1_000_000, repeat=3, order=4, cutoff=0.01):
+    columns = synthetic_loop(num_samples)
+
+    def legacy():
+        # Bisheriges Vorgehen: Filterentwurf und filtfilt je Spalte
+        result = []
+        for values in columns:
+            b, a = butter(order, cutoff, btype='low', analog=False)
+            result.append(filtfilt(b, a, values))
+        return result
+
+    def batched():
+        return filter_columns(columns, [(order, cutoff)] * len(columns))
+
+    time_legacy, result_legacy = best_time(legacy, repeat)
+    time_batched, result_batched = best_time(batched, repeat)
+    deviation = max(np.max(np.abs(old - new)) / np.max(np.abs(old)) for old, new in zip(result_legacy, result_batched))
+    print(f"Filterung, 6 Spalten x {num_samples} Punkte (order={order}, cutoff={cutoff}):")
+    print(f"  butter + filtfilt je Spalte: {time_legacy:.3f} s")
+    print(f"  SOS, gemeinsam (sosfiltfilt): {time_batched:.3f} s  (Faktor {time_legacy / time_batched:.2f})")
+    print(f"  max. relative Abweichung: {deviation:.2e}")
+    return {'alt': time_legacy, 'neu': time_batched, 'abweichung': deviation}
+
+def benchmark_stream(num_samples=10_000_000, chunksize=1 << 20, order=4, cutoff=0.01):
+    # Blockweise Filterung aus einer memmap im Vergleich zu sosfiltfilt auf dem ganzen Signal
+    import os
+    import tempfile
+    signal = np.cumsum(np.random.default_rng(0).normal(size=num_samples))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = np.lib.format.open_memmap(os.path.join(temp_dir, 'signal.npy'), mode='w+', dtype=np.float64, shape=(num_samples,))
+        source[:] = signal
+        source.flush()
+        target = np.lib.format.open_memmap(os.path.join(temp_dir, 'gefiltert.npy'), mode='w+', dtype=np.float64, shape=(num_samples,))
+        time_memory, result_memory = best_time(lambda: sosfiltfilt(butter_sos(order, cutoff), signal), 1)
+        time_stream, _ = best_time(lambda: stream_filtfilt(source, order, cutoff, out=target, chunksize=chunksize, temp_dir=temp_dir), 1)
+        deviation = np.max(np.abs(result_memory - target)) / np.max(np.abs(result_memory))
+        del source, target
+    print(f"Blockweise Filterung, {num_samples} Punkte, Blockgröße {chunksize} (order={order}, cutoff={cutoff}):")
+    print(f"  sosfiltfilt im Arbeitsspeicher: {time_memory:.3f} s")
+    print(f"  blockweise aus memmap:          {time_stream:.3f} s  (Faktor {time_memory / time_stream:.2f})")
+    print(f"  Arbeitsspeicher je Block: {chunksize * 8 / 1e6:.1f} MB statt ca. {num_samples * 8 * 4 / 1e6:.1f} MB")
+    print(f"  max. relative Abweichung: {deviation:.2e}")
+    return {'alt': time_memory, 'neu': time_stream, 'abweichung': deviation}
+
+def benchmark_metrics(num_samples=100_000, repeat=20):
+    # Fehlermaße und SNR aller sechs Spalten: bisher je Paar auf pandas-Series, jetzt ein Aufruf von filter_metrics
+    import pandas as pd
+    columns = synthetic_loop(num_samples)
+    filtered = filter_columns(columns, [(4, 0.01)] * len(columns))
+    frame = pd.DataFrame({i: values for i, values in enumerate(columns + filtered)})
+    num_columns = len(columns)
+
+    def legacy():
+        result = []
+        for i in range(num_columns):
+            original, result_column = frame.iloc[:, i], frame.iloc[:, num_columns + i]
+            snr_original = calculate_snr(original, original - np.mean(original))
+            snr_filtered = calculate_snr(result_column, original - result_column)
+            result.append(calculate_errors(original, result_column) + (snr_original, snr_filtered))
+        return np.array(result)
+
+    def fused():
+        return filter_metrics(columns, filtered)
+
+    time_legacy, result_legacy = best_time(legacy, repeat)
+    time_fused, result_fused = best_time(fused, repeat)
+    result_fused = np.array(result_fused.tolist())
+    deviation = np.max(np.abs(result_legacy - result_fused) / np.abs(result_legacy))
+    print(f"Fehlermaße und SNR, 6 Spalten x {num_samples} Punkte:")
+    print(f"  calculate_errors/calculate_snr je Paar: {time_legacy * 1000:.1f} ms")
+    print(f"  filter_metrics für alle Spalten:        {time_fused * 1000:.1f} ms  (Faktor {time_legacy / time_fused:.2f})")
+    print(f"  max. relative Abweichung: {deviation:.2e}")
+    return {'alt': time_legacy, 'neu': time_fused, 'abweichung': deviation}
+
+def peak_memory(func):
+    # Laufzeit und Spitzenwert des zusätzlich belegten Speichers (numpy-Arrays werden von tracemalloc erfasst)
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak, result
+
+def benchmark_interpolation(sizes=(100_000, 1_000_000, 10_000_000), subsample=2, smoothing=DEFAULT_SMOOTHING):
+    # Interpolation einer gefilterten Grenzkurve: bisher groupby-Mittelwert und zweimal interp1d (kubisch),
+    # jetzt np.unique-artige Zusammenfassung und eine glättende Spline. Abweichung gegen die rauschfreie Kurve.
+    import pandas as pd
+    from scipy.interpolate import interp1d
+
+    def legacy(H_values, B_values):
+        num_rows = len(H_values)
+        df_cleaned = pd.DataFrame({'H': H_values, 'B': B_values}).groupby('H').mean().reset_index()
+        H_sorted, B_sorted = df_cleaned['H'].values, df_cleaned['B'].values
+        H_new = np.linspace(min(H_sorted), max(H_sorted), num=max(10, num_rows // subsample))
+        B_new = interp1d(H_sorted, B_sorted, kind='cubic', fill_value="extrapolate")(H_new)
+        H_fine = np.linspace(min(H_new), max(H_new), num=num_rows)
+        return H_fine, interp1d(H_new, B_new, kind='cubic', fill_value="extrapolate")(H_fine)
+
+    results = {}
+    for num_samples in sizes:
+        rng = np.random.default_rng(0)
+        H = 1000 * np.sin(np.linspace(0, np.pi / 2, num_samples))
+        H_filtered, B_filtered = filter_columns([H + rng.normal(0, 5, num_samples),
+                                                 1.5 * np.tanh((H - 100) / 300) + rng.normal(0, 0.01, num_samples)], [(4, 0.01)] * 2)
+        print(f"Interpolation einer Grenzkurve, {num_samples} Punkte (subsample={subsample}, Glättung={smoothing}):")
+        row = {}
+        for name, label, func in (('alt', 'groupby + 2x interp1d kubisch', lambda: legacy(H_filtered, B_filtered)),
+                                  ('neu', 'Zusammenfassung + Glättungsspline', lambda: interpolate_curve(H_filtered, B_filtered, smoothing)[2:])):
+            elapsed, peak, (H_fine, B_fine) = peak_memory(func)
+            inner = (H_fine > 50) & (H_fine < 950)
+            error = np.max(np.abs(B_fine - 1.5 * np.tanh((H_fine - 100) / 300))[inner])
+            print(f"  {label:<34} {elapsed:7.3f} s  Spitze {peak / 1e6:8.1f} MB  max. Abweichung {error:.2e} T")
+            row[name] = elapsed
+            row[f'speicher_{name}'] = peak
+            row[f'abweichung_{name}'] = error
+        results[num_samples] = row
+    return results
+
+def benchmark_derived(legacy_samples=100_000, sizes=(100_000, 1_000_000, 10_000_000)):
+    # Magnetisierung und Polarisation: bisher iterrows über obere und untere Grenzkurve mit einem dict je Zeile,
+    # jetzt derived_quantities für alle drei Kurven (mit Energiedichte) auf Arrays
+    import pandas as pd
+
+    def legacy(data):
+        result_data_magnetization = []
+        result_data_polarization = []
+        for suffix, column in (('upper', 2), ('lower', 3)):
+            for _, row in data[[f'H_fine_{column}', f'B_fine_{column}']].dropna().iterrows():
+                H, B = float(row.iloc[0]), float(row.iloc[1])
+                result_data_magnetization.append({f'H_{suffix}': H, f'M_{suffix}': magnetization(B, H)})
+                result_data_polarization.append({f'H_{suffix}': H, f'J_{suffix}': polarization(B, H)})
+        return pd.DataFrame(result_data_magnetization), pd.DataFrame(result_data_polarization)
+
+    columns = synthetic_loop(legacy_samples)
+    data = pd.DataFrame({f'{name}_fine_{i}': columns[2 * (i - 1) + offset] for i in (1, 2, 3) for offset, name in enumerate('HB')})
+    time_legacy, _ = best_time(lambda: legacy(data), 1)
+    print(f"Magnetisierung/Polarisation, {legacy_samples} Punkte je Kurve:")
+    print(f"  iterrows (2 Kurven, nur M und J):     {time_legacy:8.3f} s")
+    results = {'alt': time_legacy}
+    for num_samples in sizes:
+        curve_set = CurveSet(list(zip(*[iter(synthetic_loop(num_samples))] * 2)))
+        elapsed, _ = best_time(lambda: derived_quantities(curve_set, energy=True), 1)
+        print(f"  derived_quantities, 3 Kurven x {num_samples:>8}: {elapsed:8.3f} s  ({elapsed / num_samples * 1e9:.1f} ns je Punkt)")
+        results[num_samples] = elapsed
+    return results
+
+def benchmark_roots(sizes=(1_000, 10_000, 100_000), num_points=10000):
+    # Schnittpunkte und Nulldurchgänge der Grenzkurven (Ummagnetisierungsverluste): bisher Schleife über das
+    # Gitter mit skalaren interp1d-Aufrufen und brentq, jetzt vektorisiert mit geschlossenen linearen Nullstellen
+    from scipy.interpolate import interp1d
+    from scipy.optimize import brentq
+
+    def legacy(H_upper_interp, H_lower_interp, B_diff, ranges):
+        H_values = np.linspace(0, min(H_upper_interp.x[-1], H_lower_interp.x[-1]), num_points)
+        intersections = [brentq(B_diff, H_values[i], H_values[i + 1]) for i in range(len(H_values) - 1)
+                         if B_diff(H_values[i]) * B_diff(H_values[i + 1]) < 0]
+        zero_crossings = []
+        for interp_func, H_range in zip((H_upper_interp, H_lower_interp), ranges):
+            zero_crossings.append(next((brentq(interp_func, H_range[i], H_range[i + 1]) for i in range(len(H_range) - 1)
+                                        if interp_func(H_range[i]) * interp_func(H_range[i + 1]) < 0), None))
+        return intersections, zero_crossings
+
+    def vectorized(H_upper_interp, H_lower_interp, B_diff, ranges):
+        return (find_intersection(H_upper_interp, H_lower_interp, B_diff),
+                [find_zero_crossing(interp_func, H_range) for interp_func, H_range in zip((H_upper_interp, H_lower_interp), ranges)])
+
+    print(f"Schnittpunkte und Nulldurchgänge je Datei (Gitter mit {num_points} Punkten):")
+    results = {}
+    for num_samples in sizes:
+        # Grenzkurven, die sich in der Sättigung durch das Rauschen mehrfach schneiden
+        rng = np.random.default_rng(0)
+        H = np.linspace(-1000, 1000, num_samples)
+        H_upper_interp = interp1d(H, 1.5 * np.tanh((H + 100) / 300) + rng.normal(0, 5e-3, num_samples), fill_value='extrapolate')
+        H_lower_interp = interp1d(H, 1.5 * np.tanh((H - 100) / 300) + rng.normal(0, 5e-3, num_samples), fill_value='extrapolate')
+        B_diff = lambda H: H_upper_interp(H) - H_lower_interp(H)
+        ranges = [np.linspace(H.min(), H.max(), num_points)] * 2
+        time_legacy, result_legacy = best_time(lambda: legacy(H_upper_interp, H_lower_interp, B_diff, ranges), 1)
+        time_new, result_new = best_time(lambda: vectorized(H_upper_interp, H_lower_interp, B_diff, ranges), 5)
+        old, new = np.array(result_legacy[0] + result_legacy[1]), np.array(result_new[0] + result_new[1])
+        deviation = np.max(np.abs(old - new)) if len(old) == len(new) else np.inf
+        print(f"  {num_samples:>7} Punkte je Kurve, {len(result_new[0])} Schnittpunkte: brentq-Schleife {time_legacy:.3f} s, "
+              f"vektorisiert {time_new * 1e3:.2f} ms (Faktor {time_legacy / time_new:.0f}), max. Abweichung {deviation:.1e} A/m")
+        results[num_samples] = {'alt': time_legacy, 'neu': time_new, 'abweichung': deviation}
+    return results
+
+def benchmark_loop_area(num_samples=2000, num_points=10000, repeat=20):
+    # Umschlossene Fläche elliptischer Schleifen H = a cos t, B = c + b sin(t + phi) (exakt: pi a b cos phi):
+    # bisher Neuabtastung auf num_points Punkte, Trapezregel ab dem Nulldurchgang und verdoppelte Differenz
+    # (nur für symmetrische Schleifen gültig), jetzt Polygonfläche der Messpunkte
+    from scipy.interpolate import interp1d
+
+    def legacy(H_upper, B_upper, H_lower, B_lower):
+        H_upper_interp = interp1d(H_upper, B_upper, kind='linear', fill_value="extrapolate")
+        H_lower_interp = interp1d(H_lower, B_lower, kind='linear', fill_value="extrapolate")
+        intersections = find_intersection(H_upper_interp, H_lower_interp, lambda H: H_upper_interp(H) - H_lower_interp(H))
+        upper_limit = intersections[0] if intersections else min(H_upper[-1], H_lower[-1])
+        areas = []
+        for H, interp in ((H_upper, H_upper_interp), (H_lower, H_lower_interp)):
+            zero_crossing = find_zero_crossing(interp, np.linspace(H.min(), H.max(), num_points))
+            if zero_crossing is None:
+                return None
+            H_values_for_area = np.linspace(zero_crossing, upper_limit, num_points)
+            areas.append(trapezoid(interp(H_values_for_area), H_values_for_area))
+        return 2 * abs(areas[0] - areas[1])
+
+    cases = {'symmetrisch': (1000, 1.5, 0.3, 0.0, 0.0), 'verschoben': (1000, 1.5, 0.3, 80.0, 0.2),
+             'Teilschleife': (200, 0.2, 0.5, 400.0, 1.0)}
+    print(f"Umschlossene Fläche, {num_samples} Messpunkte je Kurve (Neuabtastung: {num_points} Punkte):")
+    results = {}
+    for name, (a, b, phi, H_offset, B_offset) in cases.items():
+        # Obere Grenzkurve t in [0, pi], untere t in [pi, 2 pi], beide mit steigendem H und ungleichmäßigen Abständen
+        t = np.pi * np.sort(np.random.default_rng(0).uniform(0, 1, num_samples))
+        H_upper, B_upper = (H_offset + a * np.cos(t))[::-1], (B_offset + b * np.sin(t + phi))[::-1]
+        H_lower, B_lower = H_offset + a * np.cos(t + np.pi), B_offset + b * np.sin(t + np.pi + phi)
+        exact = np.pi * a * b * np.cos(phi)
+        time_legacy, area_legacy = best_time(lambda: legacy(H_upper, B_upper, H_lower, B_lower), 3)
+        time_new, area_new = best_time(lambda: loop_area(H_upper, B_upper, H_lower, B_lower), repeat)
+        error_legacy = f"{abs(area_legacy - exact) / exact:.1e}" if area_legacy is not None else "kein Ergebnis"
+        print(f"  {name:<13} exakt {exact:9.3f} Ws/m³: Neuabtastung {time_legacy * 1e3:6.2f} ms (rel. Fehler {error_legacy}), "
+              f"Polygon {time_new * 1e3:6.3f} ms (rel. Fehler {abs(area_new - exact) / exact:.1e})")
+        results[name] = {'alt': time_legacy, 'neu': time_new, 'flaeche_alt': area_legacy, 'flaeche_neu': area_new, 'exakt': exact}
+    return results
+
+def benchmark_loss_model(num_queries=10_000_000, noise=0.01):
+    # Anpassung beider Verlustmodelle an eine synthetische Messreihe (Bertotti mit bekannten Koeffizienten und
+    # Messrauschen) und Vorhersagen je Sekunde für viele Betriebspunkte (z.B. Fahrzyklus)
+    k_h, beta_h, k_c, k_e = 0.02, 1.9, 6.5e-6, 1.0e-4
+    f, B_peak = (grid.ravel() for grid in np.meshgrid([10, 25, 50, 100, 200, 400, 800], [0.2, 0.5, 0.8, 1.0, 1.2, 1.5]))
+    W = (k_h * B_peak ** beta_h + k_c * f * B_peak ** 2 + k_e * np.sqrt(f) * B_peak ** 1.5) * (1 + np.random.default_rng(0).normal(0, noise, len(f)))
+    elapsed_fit, models = best_time(lambda: (fit_steinmetz(f, B_peak, W * f), fit_bertotti(f, B_peak, W)), 3)
+    print(f"Verlustmodelle, {len(f)} Schleifen mit {100 * noise:.0f} % Rauschen, Anpassung beider Modelle in {elapsed_fit * 1e3:.1f} ms:")
+    print(f"  wahr:      k_h = {k_h:.4g}, beta_h = {beta_h:.3g}, k_c = {k_c:.4g}, k_e = {k_e:.4g}")
+    print(f"  angepasst: k_h = {models[1].k_h:.4g}, beta_h = {models[1].beta_h:.3g}, k_c = {models[1].k_c:.4g}, k_e = {models[1].k_e:.4g}")
+    rng = np.random.default_rng(1)
+    f_queries, B_queries = rng.uniform(1, 1000, num_queries), rng.uniform(0.05, 1.8, num_queries)
+    results = {'anpassung': elapsed_fit}
+    for model in models:
+        elapsed, _ = best_time(lambda: model.predict(f_queries, B_queries), 3)
+        print(f"  {model.name:<10} predict: {num_queries / elapsed / 1e6:6.1f} Mio. Betriebspunkte/s "
+              f"(RMS rel. Abweichung der Anpassung {100 * model.errors['RMS rel. Abweichung']:.2f} %)")
+        results[model.name] = num_queries / elapsed
+    return results
+
+BENCHMARKS = {
+    'filter': benchmark_filter,
+    'stream': benchmark_stream,
+    'metriken': benchmark_metrics,
+    'interpolation': benchmark_interpolation,
+    'magnetisierung': benchmark_derived,
+    'nullstellen': benchmark_roots,
+    'verlustflaeche': benchmark_loop_area,
+    'verlustmodell': benchmark_loss_model,
+}
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
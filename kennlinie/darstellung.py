@@ -0,0 +1,167 @@
+import numpy as np
+from matplotlib.backend_bases import TimerBase
+
+# Gemeinsame Darstellungsschicht für die interaktiven Fenster.
+# Linien werden einmal angelegt und danach nur noch über set_data/set_visible geändert. Gezeichnet wird eine
+# Min/Max-Ausdünnung passend zur aktuellen Breite der Achse in Pixeln; beim Zoomen und Verschieben über die
+# NavigationToolbar wird der sichtbare Ausschnitt neu und entsprechend feiner ausgedünnt.
+
+# Punkte je Pixel, ab denen ausgedünnt wird (je Abschnitt bleiben bis zu 4 Punkte erhalten)
+POINTS_PER_PIXEL = 2
+
+def minmax_indices(x, y, indices, num_bins):
+    # Teilt die (zeitlich geordneten) Indizes in num_bins Abschnitte und behält je Abschnitt die Punkte mit
+    # minimalem und maximalem x und y in ursprünglicher Reihenfolge. Damit bleiben Hüllkurve und Extremwerte
+    # der Schleife erhalten, auch wenn x nicht monoton ist.
+    bin_size = len(indices) // num_bins
+    if bin_size < 2:
+        return indices
+    full = indices[:bin_size * num_bins].reshape(num_bins, bin_size)
+    x_block, y_block = x[full], y[full]
+    rows = np.arange(num_bins)[:, None]
+    picks = np.stack([x_block.argmin(axis=1), x_block.argmax(axis=1), y_block.argmin(axis=1), y_block.argmax(axis=1)], axis=1)
+    picks.sort(axis=1)
+    selected = full[rows, picks].ravel()
+    return np.concatenate([selected, indices[bin_size * num_bins:]])
+
+def decimate(x, y, num_bins, xlim=None, ylim=None):
+    # Liefert die darzustellenden Punkte von (x, y). Mit xlim/ylim nur der sichtbare Ausschnitt (plus je ein
+    # Nachbarpunkt, damit Linien bis zum Rand reichen). Wo zwischen zwei behaltenen Punkten Daten außerhalb
+    # des Ausschnitts liegen, wird die Linie mit NaN unterbrochen.
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if xlim is None:
+        mask = np.isfinite(x) & np.isfinite(y)
+    else:
+        mask = (x >= min(xlim)) & (x <= max(xlim)) & (y >= min(ylim)) & (y <= max(ylim))
+        mask[1:] |= mask[:-1].copy()
+        mask[:-1] |= mask[1:].copy()
+    indices = np.flatnonzero(mask)
+    if len(indices) > POINTS_PER_PIXEL * num_bins:
+        indices = minmax_indices(x, y, indices, num_bins)
+    if len(indices) == len(x):
+        return x, y
+
+    outside = np.cumsum(~mask)
+    breaks = np.flatnonzero(outside[indices[1:]] != outside[indices[:-1]]) + 1
+    x_out, y_out = x[indices], y[indices]
+    if len(breaks):
+        x_out = np.insert(x_out, breaks, np.nan)
+        y_out = np.insert(y_out, breaks, np.nan)
+    return x_out, y_out
+
+class LinePlot:
+    # Verwaltet die Linien und Flächen einer Achse: line()/fill() legen Artists beim ersten Aufruf an und
+    # ersetzen danach nur ihre Daten, show() schaltet die Sichtbarkeit um, redraw() zeichnet neu.
+    # Je Linie wird die Ausdünnung der gesamten Daten (Übersicht) einmal berechnet und wiederverwendet,
+    # solange der Ausschnitt alle Daten enthält.
+    def __init__(self, ax, canvas):
+        self.ax = ax
+        self.canvas = canvas
+        self.lines = {}
+        self.data = {}
+        self.overview = {}
+        self.bounds = {}
+        self.fills = {}
+        self._refining = False
+        self._timer = None
+        ax.callbacks.connect('xlim_changed', self._on_limits_changed)
+        ax.callbacks.connect('ylim_changed', self._on_limits_changed)
+        canvas.mpl_connect('resize_event', self._on_resize)
+
+    def _num_bins(self):
+        return max(int(self.ax.bbox.width), 100)
+
+    def _update_overview(self, key):
+        x, y = self.data[key]
+        self.overview[key] = decimate(x, y, self._num_bins())
+        finite = np.isfinite(x) & np.isfinite(y)
+        self.bounds[key] = (x[finite].min(), x[finite].max(), y[finite].min(), y[finite].max()) if finite.any() else None
+
+    def line(self, key, x, y, *args, **kwargs):
+        # Legt die Linie key an bzw. ersetzt ihre Daten; Format und Stil gelten nur beim Anlegen
+        self.data[key] = (np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        self._update_overview(key)
+        if key in self.lines:
+            self.lines[key].set_data(*self.overview[key])
+        else:
+            self.lines[key], = self.ax.plot(*self.overview[key], *args, **kwargs)
+        return self.lines[key]
+
+    def fill(self, key, x, y, **kwargs):
+        # Fläche zwischen y und 0 (fill_between) mit ausgedünnten Stützstellen; eine vorhandene Fläche
+        # gleichen Namens wird ersetzt, x = None entfernt sie nur.
+        if key in self.fills:
+            self.fills.pop(key).remove()
+        if x is not None:
+            x_plot, y_plot = decimate(x, y, self._num_bins())
+            self.fills[key] = self.ax.fill_between(x_plot, y_plot, **kwargs)
+
+    def show(self, key, visible=True):
+        if key in self.lines:
+            self.lines[key].set_visible(visible)
+
+    def remove(self, key):
+        if key in self.lines:
+            self.lines.pop(key).remove()
+            for store in (self.data, self.overview, self.bounds):
+                del store[key]
+
+    def visible_lines(self):
+        return [line for line in self.lines.values() if line.get_visible()]
+
+    def _on_limits_changed(self, ax):
+        # Zoom und Verschieben ändern x- und y-Grenzen nacheinander; verfeinert wird einmal danach
+        # (über einen Timer des Backends, ohne Oberfläche sofort).
+        if self._refining or self._timer is not None:
+            return
+        timer = self.canvas.new_timer(interval=1)
+        if type(timer) is TimerBase:
+            self.refine()
+            return
+        timer.single_shot = True
+        timer.add_callback(self._refine_and_draw)
+        self._timer = timer
+        timer.start()
+
+    def _refine_and_draw(self):
+        self._timer = None
+        self.refine()
+        self.canvas.draw_idle()
+
+    def _on_resize(self, event):
+        for key in self.lines:
+            self._update_overview(key)
+        self.refine()
+
+    def refine(self):
+        # Dünnt die sichtbaren Linien für den aktuellen Ausschnitt und die aktuelle Breite aus
+        xlim, ylim = self.ax.get_xlim(), self.ax.get_ylim()
+        for key, line in self.lines.items():
+            if not line.get_visible():
+                continue
+            bounds = self.bounds[key]
+            if bounds is None or (min(xlim) <= bounds[0] and bounds[1] <= max(xlim) and min(ylim) <= bounds[2] and bounds[3] <= max(ylim)):
+                line.set_data(*self.overview[key])
+            else:
+                line.set_data(*decimate(*self.data[key], self._num_bins(), xlim, ylim))
+
+    def redraw(self, legend_fontsize=None, autoscale=True):
+        # Passt die Achsen an die sichtbaren Linien an (die Übersicht enthält die Extremwerte), verfeinert
+        # für den neuen Ausschnitt und zeichnet neu, ohne auf das Zeichnen zu warten.
+        if autoscale:
+            self._refining = True
+            try:
+                for key in self.lines:
+                    self.lines[key].set_data(*self.overview[key])
+                self.ax.relim(visible_only=True)
+                self.ax.autoscale_view()
+            finally:
+                self._refining = False
+        self.refine()
+        handles = self.visible_lines()
+        if handles:
+            self.ax.legend(handles=handles, fontsize=legend_fontsize)
+        elif self.ax.get_legend() is not None:
+            self.ax.get_legend().remove()
+        self.canvas.draw_idle()
@@ -0,0 +1,66 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from .rohdaten import CHUNK_ROWS, find_data_start, parse_header, iter_data_blocks
+from .importcache import ImportCache, file_hash
+from .kurvensatz import CurveSet
+
+# Import von Hysteresigraph-Exportdateien ohne Oberfläche (genutzt von 0_Datenimport.py und der Pipeline)
+
+# Zwischenspeicher für bereits bereinigte Importe (Schlüssel: Inhalts-Hash + Parser-Version)
+import_cache = ImportCache()
+
+def interpolate_missing_values(df):
+    # Interpoliert fehlende Werte innerhalb jeder Kurve (H/B-Spaltenpaar) linear und füllt Lücken am Kurvenrand
+    # mit dem nächsten gültigen Wert. Kürzere Kurven behalten ihre echte Länge, der Rest bleibt leer (NaN)
+    # statt mit wiederholten Endpunkten aufgefüllt zu werden.
+    return CurveSet.from_dataframe(df, drop_repeated_padding=False).to_dataframe()
+
+def read_txt_file(file_path, chunksize=CHUNK_ROWS):
+    column_names_with_prefix = None
+    column_names_without_prefix = None
+    Kennlinienwerte = None
+
+    start_time = time.perf_counter()
+    header_line, data_offset = find_data_start(file_path)
+    if data_offset is None:
+        return None, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte
+
+    if header_line:
+        column_names_with_prefix, column_names_without_prefix, Kennlinienwerte = parse_header(header_line)
+        num_columns = len(column_names_with_prefix)
+    else:
+        num_columns = None
+
+    # Die Messwerte werden blockweise vom C-Parser direkt in float64-Arrays gelesen.
+    # Nicht numerische Einträge werden wie bisher zu NaN.
+    blocks = list(iter_data_blocks(file_path, data_offset, num_columns, chunksize))
+    values = np.concatenate(blocks) if blocks else np.empty((0, num_columns or 0))
+    df = pd.DataFrame(values, columns=column_names_with_prefix, copy=False)
+
+    elapsed = time.perf_counter() - start_time
+    size_mb = os.path.getsize(file_path) / 1e6
+    print(f"{size_mb:.1f} MB in {elapsed:.2f} s eingelesen ({size_mb / max(elapsed, 1e-9):.1f} MB/s, {len(df)} Zeilen).")
+
+    return df, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte
+
+def load_dataframe(file_path, use_cache=True):
+    # Liest eine Exportdatei ein und füllt fehlende Werte auf. Gibt None zurück, wenn kein Datensatz gefunden wurde.
+    # Unveränderte Dateien werden direkt aus dem Cache geladen.
+    # Der Inhalts-Hash wird nur einmal berechnet und für Abfrage und Speichern verwendet
+    digest = file_hash(file_path) if use_cache else None
+    if use_cache:
+        dataset = import_cache.get(file_path, digest)
+        if dataset is not None:
+            print(f"'{os.path.basename(file_path)}' aus dem Cache geladen.")
+            return dataset, list(dataset.columns), dataset.attrs['Spalten_ohne_Praefix'], dataset.attrs['Kennlinie']
+
+    dataset, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte = read_txt_file(file_path)
+    if dataset is not None and len(dataset):
+        dataset = interpolate_missing_values(dataset)
+        if use_cache and column_names_with_prefix:
+            import_cache.put(file_path, dataset, digest, Kennlinie=Kennlinienwerte, Spalten_ohne_Praefix=column_names_without_prefix)
+    else:
+        dataset = None
+    return dataset, column_names_with_prefix, column_names_without_prefix, Kennlinienwerte
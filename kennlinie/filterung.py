@@ -0,0 +1,368 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import product
+import numpy as np
+import pandas as pd
+from scipy.signal import butter, sosfilt, sosfilt_zi, sosfiltfilt
+
+# Tiefpassfilterung der Kennlinien mit Butterworth-Filtern in Second-Order-Sections-Form (SOS).
+# Die SOS-Form ist bei kleinen Grenzfrequenzen (z.B. cutoff=0.01) numerisch stabiler als die
+# Übertragungsfunktion (b, a). Jeder Filterentwurf wird nur einmal berechnet und zwischengespeichert,
+# Spalten gleicher Länge mit gleichen Filterparametern werden gemeinsam in einem 2D-Aufruf gefiltert.
+
+# Blockgröße (Anzahl Abtastwerte) für die Filterung langer Aufzeichnungen in Blöcken
+STREAM_CHUNK = 1 << 20
+
+# Standardraster für den Parameter-Sweep
+SWEEP_ORDERS = (1, 2, 3, 4, 5, 6)
+SWEEP_CUTOFFS = tuple(np.round(np.geomspace(0.005, 0.2, 12), 4))
+
+# Felder des Ergebnisses von filter_metrics (eine Zeile je Kanal)
+METRICS_DTYPE = np.dtype([('mae', 'f8'), ('mse', 'f8'), ('rmse', 'f8'), ('mape', 'f8'), ('rmse_percent', 'f8'),
+                          ('snr_original', 'f8'), ('snr_filtered', 'f8')])
+
+def _stacked_metrics(original, filtered):
+    # original, filtered: 2D-Arrays (Kanäle x Punkte). Die Differenz wird nur einmal gebildet, Quadratsummen
+    # über einsum ohne weitere Zwischenarrays. SNR Original wie bisher: Leistung des Signals bezogen auf die
+    # Leistung der Abweichung vom Mittelwert (= Varianz). Die Varianz wird aus den zentrierten Werten berechnet,
+    # nicht als Leistung - Mittelwert², die bei großem Mittelwert und kleiner Streuung (Zeitachse, Offset) auslöscht.
+    num_points = original.shape[-1]
+    difference = original - filtered
+    abs_difference = np.abs(difference)
+    mean_original = original.mean(axis=-1)
+    power_original = np.einsum('ij,ij->i', original, original) / num_points
+    centered = original - mean_original[:, None]
+    variance_original = np.einsum('ij,ij->i', centered, centered) / num_points
+    del centered
+    power_filtered = np.einsum('ij,ij->i', filtered, filtered) / num_points
+
+    result = np.empty(len(original), dtype=METRICS_DTYPE)
+    result['mae'] = abs_difference.mean(axis=-1)
+    result['mse'] = np.einsum('ij,ij->i', difference, difference) / num_points
+    result['rmse'] = np.sqrt(result['mse'])
+    abs_difference /= np.abs(original + np.finfo(float).eps)
+    result['mape'] = abs_difference.mean(axis=-1) * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['rmse_percent'] = result['rmse'] / np.abs(mean_original) * 100
+        result['snr_original'] = 10 * np.log10(power_original / variance_original)
+        result['snr_filtered'] = 10 * np.log10(power_filtered / result['mse'])
+    return result
+
+def filter_metrics(originals, filtereds):
+    # Fehlermaße (MAE, MSE, RMSE, MAPE, RMSE%) und SNR (Original, gefiltert) für alle Kanäle auf einmal.
+    # originals, filtereds: 2D-Arrays oder Listen von 1D-Arrays (Kurven unterschiedlicher Länge werden nach
+    # Länge gruppiert). Ergebnis: strukturiertes Array mit einer Zeile je Kanal, z.B. metrics['rmse'][i].
+    if isinstance(originals, np.ndarray) and originals.ndim == 2:
+        return _stacked_metrics(np.asarray(originals, dtype=np.float64), np.asarray(filtereds, dtype=np.float64))
+
+    groups = {}
+    for i, values in enumerate(originals):
+        groups.setdefault(len(values), []).append(i)
+    result = np.empty(len(originals), dtype=METRICS_DTYPE)
+    for indices in groups.values():
+        result[indices] = _stacked_metrics(np.array([originals[i] for i in indices], dtype=np.float64),
+                                           np.array([filtereds[i] for i in indices], dtype=np.float64))
+    return result
+
+def roughness(values):
+    # Effektivwert der zweiten Differenzen bezogen auf die Spannweite als Maß für die Restwelligkeit
+    # (konstante Kanäle haben keine Welligkeit)
+    span = np.ptp(values)
+    if span == 0:
+        return 0.0
+    return np.sqrt(np.mean(np.diff(values, 2) ** 2)) / span
+
+@lru_cache(maxsize=None)
+def butter_sos(order, cutoff):
+    sos = butter(order, cutoff, btype='low', analog=False, output='sos')
+    return sos
+
+def filter_columns(columns, params):
+    # columns: Liste von 1D-Arrays, params: (order, cutoff) je Spalte. Gibt die gefilterten Spalten in gleicher Reihenfolge zurück.
+    groups = {}
+    for i, (values, (order, cutoff)) in enumerate(zip(columns, params)):
+        groups.setdefault((len(values), order, cutoff), []).append(i)
+
+    results = [None] * len(columns)
+    for (_, order, cutoff), indices in groups.items():
+        # Zeilen = Spalten der Kennlinie, Abtastachse zuletzt (zusammenhängend im Speicher)
+        stacked = np.vstack([np.asarray(columns[i], dtype=np.float64) for i in indices])
+        filtered = sosfiltfilt(butter_sos(order, cutoff), stacked, axis=-1)
+        for row, i in enumerate(indices):
+            results[i] = filtered[row]
+    return results
+
+def sos_padlen(sos):
+    # Länge der Randerweiterung wie in scipy.signal.sosfiltfilt
+    return 3 * (2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum()))
+
+def stream_filtfilt(x, order, cutoff, out=None, chunksize=STREAM_CHUNK, temp_dir=None):
+    # Nullphasige Filterung (vorwärts und rückwärts) langer Signale in Blöcken, z.B. direkt aus einer memmap.
+    # Der Filterzustand wird von Block zu Block weitergegeben; die ungerade Randerweiterung und die
+    # Anfangszustände entsprechen sosfiltfilt, daher stimmt das Ergebnis bis auf Rundungsfehler überein
+    # (auch an den Rändern). Das Zwischenergebnis der Vorwärtsfilterung liegt in einer temporären Datei,
+    # im Arbeitsspeicher befinden sich immer nur einzelne Blöcke. Das Ergebnis wird blockweise in out
+    # geschrieben (z.B. eine np.memmap), ohne out wird ein Array angelegt.
+    sos = butter_sos(order, cutoff)
+    num_samples = len(x)
+    padlen = sos_padlen(sos)
+    if out is None:
+        out = np.empty(num_samples, dtype=np.float64)
+    if num_samples <= max(chunksize, 2 * padlen + 2):
+        out[:] = sosfiltfilt(sos, np.asarray(x, dtype=np.float64))
+        return out
+
+    zi = sosfilt_zi(sos)
+    head = np.asarray(x[:padlen + 1], dtype=np.float64)
+    tail = np.asarray(x[num_samples - padlen - 1:], dtype=np.float64)
+    head_ext = 2 * head[0] - head[padlen:0:-1]
+    tail_ext = 2 * tail[-1] - tail[-2::-1]
+    extended_length = num_samples + 2 * padlen
+
+    fd, temp_path = tempfile.mkstemp(suffix='.f64', dir=temp_dir)
+    os.close(fd)
+    try:
+        forward = np.memmap(temp_path, dtype=np.float64, mode='w+', shape=(extended_length,))
+
+        # Vorwärtsfilterung: Randerweiterung links, Signal blockweise, Randerweiterung rechts
+        state = zi * head_ext[0]
+        forward[:padlen], state = sosfilt(sos, head_ext, zi=state)
+        for start in range(0, num_samples, chunksize):
+            stop = min(start + chunksize, num_samples)
+            forward[padlen + start:padlen + stop], state = sosfilt(sos, np.asarray(x[start:stop], dtype=np.float64), zi=state)
+        forward[padlen + num_samples:], state = sosfilt(sos, tail_ext, zi=state)
+
+        # Rückwärtsfilterung vom Ende her; nur der Bereich ohne Randerweiterung wird ausgegeben
+        state = zi * forward[-1]
+        for stop in range(extended_length, 0, -chunksize):
+            start = max(stop - chunksize, 0)
+            block, state = sosfilt(sos, forward[start:stop][::-1], zi=state)
+            block = block[::-1]
+            out_start, out_stop = max(start, padlen), min(stop, padlen + num_samples)
+            if out_start < out_stop:
+                out[out_start - padlen:out_stop - padlen] = block[out_start - start:out_stop - start]
+        del forward
+    finally:
+        os.remove(temp_path)
+    return out
+
+def stream_fill_gaps(x, out, chunksize=STREAM_CHUNK):
+    # Füllt fehlende Werte (NaN) blockweise wie interpolate_missing_values: Lücken im Inneren linear, Lücken am
+    # Rand mit dem nächsten gültigen Wert. Schreibt nach out (darf x sein) und gibt die Anzahl gültiger Werte zurück.
+    # Eine Lücke über Blockgrenzen wird erst gefüllt, wenn der nächste gültige Wert gelesen ist.
+    num_samples = len(x)
+    last_index, last_value = -1, np.nan
+    num_valid = 0
+    for start in range(0, num_samples, chunksize):
+        stop = min(start + chunksize, num_samples)
+        block = np.array(x[start:stop], dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(block))
+        if len(valid) == 0:
+            continue
+        first = start + valid[0]
+        if last_index < 0:
+            out[:first] = block[valid[0]]
+        elif first > last_index + 1:
+            out[last_index + 1:first] = np.interp(np.arange(last_index + 1, first), [last_index, first], [last_value, block[valid[0]]])
+        out[first:start + valid[-1] + 1] = np.interp(np.arange(valid[0], valid[-1] + 1), valid, block[valid])
+        last_index, last_value = start + valid[-1], block[valid[-1]]
+        num_valid += len(valid)
+    if num_valid:
+        out[last_index + 1:] = last_value
+    return num_valid
+
+def stream_filter_raw_export(export, order, cutoff, output_path, columns=None, chunksize=STREAM_CHUNK):
+    # Filtert Spalten einer RawExport-Datei (memmap) blockweise und schreibt alle Spalten als .npy
+    # (Zeilen x Spalten wie die Seitendatei). columns: Indizes oder Namen der zu filternden Spalten
+    # (Standard: alle), die übrigen Spalten werden unverändert übernommen. Gefiltert wird nur über die
+    # echte Länge jeder Spalte, der Rest bleibt NaN. Fehlende Werte werden vor dem Filtern gefüllt
+    # (stream_fill_gaps); Spalten mit höchstens padlen gültigen Werten sind zu kurz für die Filterung und
+    # werden nur gefüllt übernommen. Gibt (Ergebnis, Namen bzw. Indizes der ungefilterten Spalten) zurück.
+    num_rows, num_columns = export.values.shape
+    selected = range(num_columns) if columns is None else {export.column_index(c) for c in columns}
+    padlen = sos_padlen(butter_sos(order, cutoff))
+    out = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float64, shape=(num_rows, num_columns))
+    unfiltered = []
+    for column in range(num_columns):
+        length = export.valid_lengths[column]
+        if column in selected:
+            target = out[:length, column]
+            if stream_fill_gaps(export.column(column, trim=True), target, chunksize) > padlen:
+                stream_filtfilt(target, order, cutoff, out=target, chunksize=chunksize)
+            else:
+                unfiltered.append(export.column_names_with_prefix[column] if export.column_names_with_prefix else column)
+        else:
+            for start in range(0, length, chunksize):
+                out[start:min(start + chunksize, length), column] = export.values[start:min(start + chunksize, length), column]
+        out[length:, column] = np.nan
+    out.flush()
+    return out, unfiltered
+
+def filter_curve_set(curve_set, params):
+    # Filtert H und B jeder Kurve mit den Parametern der jeweiligen Kurve ({'order': ..., 'cutoff': ...} je Kurve)
+    columns = [values for branch in curve_set for values in branch]
+    column_params = [(p['order'], p['cutoff']) for p in params for _ in range(2)]
+    filtered = filter_columns(columns, column_params)
+    return list(zip(filtered[::2], filtered[1::2]))
+
+# Standardparameter der beiden Filterstufen je Kurve (Schlüssel 0, 2, 4: Neukurve, obere und untere Grenzkurve)
+FILTER_PARAMS_FIRST = {
+    0: {'order': 3, 'cutoff': 0.05},
+    2: {'order': 3, 'cutoff': 0.05},
+    4: {'order': 3, 'cutoff': 0.05}
+}
+FILTER_PARAMS_SECOND = {
+    0: {'order': 4, 'cutoff': 0.01},
+    2: {'order': 4, 'cutoff': 0.01},
+    4: {'order': 4, 'cutoff': 0.01}
+}
+
+def first_filter(curve_set, params=FILTER_PARAMS_FIRST):
+    # Erste Filterung (H und B jeder Kurve). Ergebnis: Spalten H_original_i, B_original_i, H_filtered_i, B_filtered_i
+    # in echter Kurvenlänge, wie sie 1_Filtern.py speichert.
+    filtered_curves = filter_curve_set(curve_set, [params[i] for i in range(0, 6, 2)])
+    columns = {}
+    for i, ((original_h, original_b), (filtered_h, filtered_b)) in enumerate(zip(curve_set, filtered_curves)):
+        columns[f'H_original_{i}'] = original_h
+        columns[f'B_original_{i}'] = original_b
+        columns[f'H_filtered_{i}'] = filtered_h
+        columns[f'B_filtered_{i}'] = filtered_b
+    return columns
+
+def second_filter(first_columns, params=FILTER_PARAMS_SECOND):
+    # Zweite Filterung nur der H-Werte, alle Kurven in einem Durchgang.
+    # Ergebnis: Spalten H_original_i, B_original_i, H_refiltered_i, B_filtered_i.
+    num_curves = len(first_columns) // 4
+    refiltered = filter_columns([first_columns[f'H_filtered_{i}'] for i in range(num_curves)],
+                                [(params[2 * i]['order'], params[2 * i]['cutoff']) for i in range(num_curves)])
+    columns = {}
+    for i in range(num_curves):
+        columns[f'H_original_{i}'] = first_columns[f'H_original_{i}']
+        columns[f'B_original_{i}'] = first_columns[f'B_original_{i}']
+        columns[f'H_refiltered_{i}'] = refiltered[i]
+        columns[f'B_filtered_{i}'] = first_columns[f'B_filtered_{i}']
+    return columns
+
+def evaluate_filter(curve, order, cutoff):
+    # Bewertet eine Filtereinstellung für eine Kurve (H, B) mit den Fehlermaßen und dem SNR.
+    # RMSE% von H und B werden geometrisch gemittelt, damit die Rangfolge nicht von der Größenordnung abhängt
+    # (bei symmetrischen Schleifen ist der Mittelwert von H nahe 0 und RMSE% von H entsprechend groß).
+    row = {'order': order, 'cutoff': cutoff}
+    filtered = filter_columns(list(curve), [(order, cutoff)] * 2)
+    metrics = filter_metrics(np.asarray(curve), np.asarray(filtered))
+    for name, metric, result in zip(('H', 'B'), metrics, filtered):
+        row[f'MAE_{name}'] = metric['mae']
+        row[f'RMSE_{name}'] = metric['rmse']
+        row[f'RMSE%_{name}'] = metric['rmse_percent']
+        row[f'SNR_gefiltert_{name}'] = metric['snr_filtered']
+        row[f'Rauheit_{name}'] = roughness(result)
+    row['RMSE%'] = np.sqrt(row['RMSE%_H'] * row['RMSE%_B'])
+    row['Rauheit'] = (row['Rauheit_H'] + row['Rauheit_B']) / 2
+    return row
+
+# Kurven für die Worker-Prozesse des Sweeps (einmal pro Prozess übergeben, nicht pro Aufgabe)
+_sweep_curves = None
+
+def _init_sweep(curves):
+    global _sweep_curves
+    _sweep_curves = curves
+
+def _evaluate_sweep_point(task):
+    curve_index, order, cutoff = task
+    try:
+        row = evaluate_filter(_sweep_curves[curve_index], order, cutoff)
+    except ValueError:
+        # Kurve zu kurz für die Filterordnung
+        return None
+    row['Kurve'] = curve_index
+    return row
+
+def pareto_front(costs):
+    # Maske der Pareto-optimalen Zeilen (alle Spalten werden minimiert)
+    costs = np.asarray(costs, dtype=np.float64)
+    dominated = np.any(np.all(costs[:, None, :] >= costs[None, :, :], axis=2) & np.any(costs[:, None, :] > costs[None, :, :], axis=2), axis=1)
+    return ~dominated
+
+def sweep_filter_params(curve_set, orders=SWEEP_ORDERS, cutoffs=SWEEP_CUTOFFS, workers=None, progress=None):
+    # Bewertet alle Kombinationen aus Ordnung und Grenzfrequenz für jede Kurve parallel und liefert eine Tabelle,
+    # sortiert nach Kurve und Rang. Pareto-optimal bzgl. Rauheit und RMSE% sind die Zeilen mit 'Pareto' = True;
+    # der Rang ergibt sich aus dem Abstand zum Idealpunkt (beide Größen auf [0, 1] normiert).
+    # progress(Anteil) wird nach jeder bewerteten Einstellung aufgerufen; eine Ausnahme darin (z.B. Abbruch)
+    # verwirft die noch ausstehenden Einstellungen.
+    curves = [tuple(branch) for branch in curve_set]
+    tasks = list(product(range(len(curves)), orders, cutoffs))
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep, initargs=(curves,))
+    try:
+        rows = []
+        for done, row in enumerate(executor.map(_evaluate_sweep_point, tasks, chunksize=max(1, len(tasks) // 64)), start=1):
+            if row is not None:
+                rows.append(row)
+            if progress is not None:
+                progress(done / len(tasks))
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    table = pd.DataFrame(rows)
+    ranked = []
+    for _, group in table.groupby('Kurve'):
+        group = group.copy()
+        costs = group[['Rauheit', 'RMSE%']].to_numpy()
+        group['Pareto'] = pareto_front(costs)
+        span = np.ptp(costs, axis=0)
+        normalized = (costs - costs.min(axis=0)) / np.where(span > 0, span, 1)
+        group['Abstand'] = np.hypot(normalized[:, 0], normalized[:, 1])
+        group['Rang'] = group['Abstand'].rank(method='first').astype(int)
+        ranked.append(group.sort_values('Rang'))
+    columns = ['Kurve', 'Rang', 'Pareto', 'order', 'cutoff', 'Rauheit', 'RMSE%']
+    table = pd.concat(ranked, ignore_index=True)
+    return table[columns + [column for column in table.columns if column not in columns]]
+
+def best_filter_params(table):
+    # Beste Einstellung (Rang 1) je Kurve im Format von filter_params_first
+    best = table[table['Rang'] == 1]
+    return {2 * int(row['Kurve']): {'order': int(row['order']), 'cutoff': float(row['cutoff'])} for _, row in best.iterrows()}
+
+if __name__ == '__main__':
+    # Parameter-Sweep ohne Oberfläche: python -m kennlinie.filterung DATEI [--ordnungen 2 3 4] [--cutoffs 0.01 0.05] [--prozesse N]
+    # Blockweise Filterung einer langen Rohdatei: python -m kennlinie.filterung ROHDATEI --stream [--ordnung 4] [--cutoff 0.01] [--spalten 1]
+    from .speicherformat import read_table
+    from .kurvensatz import CurveSet, BRANCH_NAMES
+    from .rohdaten import RawExport
+
+    parser = argparse.ArgumentParser(description="Parameter-Sweep und blockweise Filterung für die Butterworth-Filterung")
+    parser.add_argument('datei', help="Importierte Kennlinie (CSV oder NPZ), mit --stream die Rohdatei")
+    parser.add_argument('--ordnungen', type=int, nargs='+', default=list(SWEEP_ORDERS))
+    parser.add_argument('--cutoffs', type=float, nargs='+', default=list(SWEEP_CUTOFFS))
+    parser.add_argument('--prozesse', type=int, default=None)
+    parser.add_argument('--ausgabe', default=None, help="Tabelle aller bewerteten Einstellungen bzw. gefilterte Daten (.npy)")
+    parser.add_argument('--stream', action='store_true', help="Rohdatei blockweise nullphasig filtern statt Sweep")
+    parser.add_argument('--ordnung', type=int, default=4)
+    parser.add_argument('--cutoff', type=float, default=0.01)
+    parser.add_argument('--spalten', type=int, nargs='+', default=None, help="Zu filternde Spalten (Standard: alle)")
+    parser.add_argument('--blockgroesse', type=int, default=STREAM_CHUNK)
+    args = parser.parse_args()
+
+    if args.stream:
+        export = RawExport(args.datei)
+        output_path = args.ausgabe or os.path.splitext(args.datei)[0] + '_gefiltert.npy'
+        start = time.perf_counter()
+        _, unfiltered = stream_filter_raw_export(export, args.ordnung, args.cutoff, output_path, args.spalten, args.blockgroesse)
+        elapsed = time.perf_counter() - start
+        print(f"{len(export)} Zeilen in {elapsed:.2f} s gefiltert ({len(export) / max(elapsed, 1e-9) / 1e6:.2f} Mio. Zeilen/s).")
+        if unfiltered:
+            print(f"Zu wenige gültige Werte, ungefiltert übernommen: {', '.join(map(str, unfiltered))}")
+        print(f"Gefilterte Daten gespeichert als '{output_path}'.")
+    else:
+        output_path = args.ausgabe or 'filter_sweep.csv'
+        curve_set = CurveSet.from_dataframe(read_table(args.datei))
+        table = sweep_filter_params(curve_set, args.ordnungen, args.cutoffs, args.prozesse)
+        table.to_csv(output_path, index=False)
+        for curve_index, group in table[table['Pareto']].groupby('Kurve'):
+            print(f"\n{BRANCH_NAMES[curve_index]} - Pareto-optimale Einstellungen:")
+            print(group[['Rang', 'order', 'cutoff', 'Rauheit', 'RMSE%']].to_string(index=False))
+        print(f"\nEmpfohlene Parameter: {best_filter_params(table)}")
+        print(f"Tabelle gespeichert als '{output_path}'.")
@@ -0,0 +1,136 @@
+import queue
+import threading
+import tkinter as tk
+from tkinter import messagebox, ttk
+
+# Ausführung langer Berechnungen in einem Hintergrund-Thread, damit die Oberfläche bedienbar bleibt
+# (Zoomen, Umschalten der Linien usw.). Der Worker meldet Fortschritt und Ergebnis über eine Queue,
+# die Oberfläche fragt die Queue regelmäßig mit after() ab und ruft die Rückgabefunktion im Tk-Thread auf.
+# Tk-Widgets dürfen nur in dieser Rückgabefunktion angefasst werden, nie in der Worker-Funktion.
+
+class Cancelled(Exception):
+    pass
+
+class Task:
+    # Wird der Worker-Funktion als erstes Argument übergeben
+    def __init__(self, events):
+        self._events = events
+        self._cancel = threading.Event()
+
+    def progress(self, fraction, text=None):
+        # Fortschritt zwischen 0 und 1 melden; löst Cancelled aus, wenn abgebrochen wurde
+        self.check()
+        self._events.put(('progress', self, (fraction, text)))
+
+    def check(self):
+        if self._cancel.is_set():
+            raise Cancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+class TaskPanel(tk.Frame):
+    # Fortschrittsbalken, Statustext und Abbrechen-Knopf; run() startet eine Worker-Funktion
+    POLL_MS = 50
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.progress_bar = ttk.Progressbar(self, length=200, mode='determinate', maximum=1.0)
+        self.progress_bar.pack(side=tk.LEFT, padx=5)
+        self.status_label = tk.Label(self, text="", anchor='w')
+        self.status_label.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        self.cancel_button = tk.Button(self, text="Abbrechen", command=self.cancel, state='disabled')
+        self.cancel_button.pack(side=tk.RIGHT, padx=5)
+        self.events = queue.Queue()
+        self.task = None
+        self.callbacks = None
+        self._polling = False
+
+    @property
+    def busy(self):
+        return self.task is not None
+
+    def run(self, func, on_done, *args, text="Berechnung läuft ...", on_error=None):
+        # Führt func(task, *args) im Hintergrund aus und ruft anschließend on_done(Ergebnis) im Tk-Thread auf.
+        # Läuft bereits eine Berechnung, wird nichts gestartet und False zurückgegeben.
+        if self.busy:
+            self.status_label.config(text="Bitte warten, die vorherige Berechnung läuft noch.")
+            return False
+        self.task = Task(self.events)
+        self.callbacks = (on_done, on_error)
+        self.progress_bar['value'] = 0
+        self.status_label.config(text=text)
+        self.cancel_button['state'] = 'normal'
+        threading.Thread(target=self._work, args=(self.task, func, args), daemon=True).start()
+        if not self._polling:
+            self._polling = True
+            self.after(self.POLL_MS, self._poll)
+        return True
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.status_label.config(text="Wird abgebrochen ...")
+
+    def _work(self, task, func, args):
+        try:
+            self.events.put(('done', task, func(task, *args)))
+        except Cancelled:
+            self.events.put(('cancelled', task, None))
+        except Exception as e:
+            self.events.put(('error', task, e))
+
+    def _finish(self, text):
+        self.task = None
+        self.cancel_button['state'] = 'disabled'
+        self.status_label.config(text=text)
+
+    def _poll(self):
+        # Rückgabefunktionen laufen geschützt: Fehler darin werden wie Fehler der Berechnung gemeldet und die Abfrage
+        # wird in jedem Fall neu geplant bzw. beendet, damit spätere run()-Aufrufe wieder abgefragt werden
+        try:
+            while True:
+                try:
+                    kind, task, payload = self.events.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not self.task:
+                    continue
+                on_done, on_error = self.callbacks
+                if kind == 'progress':
+                    fraction, text = payload
+                    self.progress_bar['value'] = fraction
+                    if text:
+                        self.status_label.config(text=text)
+                elif kind == 'done':
+                    self.progress_bar['value'] = 1.0
+                    self._finish("Fertig.")
+                    try:
+                        on_done(payload)
+                    except Exception as e:
+                        self.status_label.config(text=f"Fehler: {e}")
+                        self._report_error(on_error, e)
+                elif kind == 'cancelled':
+                    self.progress_bar['value'] = 0
+                    self._finish("Abgebrochen.")
+                elif kind == 'error':
+                    self._finish(f"Fehler: {payload}")
+                    self._report_error(on_error, payload)
+        finally:
+            if self.task is not None:
+                self.after(self.POLL_MS, self._poll)
+            else:
+                self._polling = False
+
+    def _report_error(self, on_error, error):
+        if on_error is not None:
+            try:
+                on_error(error)
+                return
+            except Exception as e:
+                error = e
+        messagebox.showerror("Fehler", str(error))
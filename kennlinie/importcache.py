@@ -0,0 +1,110 @@
+import hashlib
+import os
+import time
+import zipfile
+from .speicherformat import read_binary, write_binary
+from .rohdaten import PARSER_VERSION
+
+# Zwischenspeicher für bereits eingelesene und bereinigte Exportdateien.
+# Schlüssel ist der Hash des Dateiinhalts zusammen mit der Parser-Version, d.h. umbenannte oder kopierte
+# Dateien werden wiedererkannt und Änderungen am Parser machen alte Einträge automatisch ungültig.
+# Die Einträge liegen im binären Zwischenformat (.npz) vor und werden nach LRU-Prinzip entfernt,
+# sobald die Gesamtgröße die Obergrenze überschreitet.
+
+DEFAULT_CACHE_DIR = os.environ.get('KENNLINIE_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'kennlinie'))
+DEFAULT_MAX_BYTES = int(float(os.environ.get('KENNLINIE_CACHE_MB', 2048)) * 1e6)
+HASH_BLOCK_SIZE = 1 << 20
+
+def file_hash(file_path):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ImportCache:
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_path(self, file_path, digest=None):
+        # digest: bereits berechneter file_hash(file_path), damit die Datei nur einmal gelesen wird
+        return os.path.join(self.cache_dir, f"{digest or file_hash(file_path)}_v{PARSER_VERSION}.npz")
+
+    def get(self, file_path, digest=None):
+        # Liefert den gespeicherten DataFrame oder None. Ein Treffer frischt den Zeitstempel für die LRU-Verdrängung auf.
+        # Beschädigte Einträge (z.B. abgebrochenes Schreiben) werden entfernt, die Datei wird dann neu eingelesen.
+        path = self.entry_path(file_path, digest)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = read_binary(path)
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return df
+
+    def put(self, file_path, df, digest=None, **metadata):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.entry_path(file_path, digest)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        write_binary(df, temp_path, {**df.attrs, **metadata})
+        os.replace(temp_path, path)
+        self.evict()
+
+    def entries(self):
+        # (Pfad, Größe, letzter Zugriff) aller Einträge, älteste zuerst
+        if not os.path.isdir(self.cache_dir):
+            return []
+        result = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                result.append((entry.path, stat.st_size, stat.st_mtime))
+        return sorted(result, key=lambda item: item[2])
+
+    def evict(self, max_bytes=None):
+        # Entfernt die am längsten nicht genutzten Einträge, bis die Obergrenze eingehalten ist
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def report(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        current = sum(1 for path, _, _ in entries if path.endswith(f"_v{PARSER_VERSION}.npz"))
+        oldest = time.strftime('%Y-%m-%d %H:%M', time.localtime(entries[0][2])) if entries else '-'
+        return {'Verzeichnis': self.cache_dir, 'Einträge': len(entries), 'Einträge aktuelle Version': current,
+                'Größe in MB': total / 1e6, 'Obergrenze in MB': self.max_bytes / 1e6, 'Ältester Zugriff': oldest}
+
+    def clear(self):
+        removed = 0
+        for path, _, _ in self.entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
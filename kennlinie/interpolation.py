@@ -0,0 +1,233 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import numpy as np
+import pandas as pd
+from scipy.linalg import solveh_banded
+from .kurvensatz import padded_dataframe
+
+# Interpolation der gefilterten Kurven auf ein gleichmäßiges H-Raster (genutzt von 2_Interpolation.py und der Pipeline).
+# Je Kurve: Duplikate von H zusammenfassen (Mittelwert von B), eine glättende kubische Spline anpassen und auf dem
+# Zielraster auswerten. Die Spline ist ein P-Spline (kubische B-Splines auf gleichabständigen Knoten mit Strafterm
+# auf den zweiten Differenzen der Koeffizienten); Aufbau der Normalgleichungen und Auswertung sind O(n) und laufen
+# blockweise, das Bandsystem ist nur so groß wie die Zahl der Knoten.
+
+# Spaltenpaare (H_refiltered_i, B_filtered_i) in der Ausgabe der zweiten Filterung
+FILTERED_PAIRS = [(2, 3), (6, 7), (10, 11)]
+
+# Glättungslänge als Anteil des H-Bereichs: Welligkeit, die schmaler ist, wird geglättet, breitere Strukturen bleiben.
+# 0 heisst keine Glättung (nur so viele Knoten wie Datenpunkte), z.B. 0.002 wenig, 0.02 starke Glättung.
+DEFAULT_SMOOTHING = 0.005
+
+# Kandidaten für die automatische Wahl der Glättung (smoothing='auto')
+SMOOTHING_CANDIDATES = tuple(np.round(np.geomspace(0.0005, 0.05, 16), 6))
+
+# Knotenintervalle je Glättungslänge und Obergrenze der Knotenintervalle
+KNOTS_PER_SMOOTHING = 8
+MAX_INTERVALS = 100_000
+
+# Punkte je Block beim Aufbau der Normalgleichungen und bei der Auswertung
+CHUNK = 1 << 18
+
+def dedup_mean(H_values, B_values):
+    # Sortiert nach H und fasst gleiche H-Werte zusammen: (H eindeutig, Mittelwert von B, Anzahl je H-Wert).
+    # Nicht endliche Werte werden verworfen.
+    H_values = np.asarray(H_values, dtype=np.float64)
+    B_values = np.asarray(B_values, dtype=np.float64)
+    finite = np.isfinite(H_values) & np.isfinite(B_values)
+    if not finite.all():
+        H_values, B_values = H_values[finite], B_values[finite]
+    order = np.argsort(H_values, kind='stable')
+    H_sorted, B_sorted = H_values[order], B_values[order]
+    starts = np.flatnonzero(np.concatenate(([True], H_sorted[1:] != H_sorted[:-1])))
+    counts = np.diff(np.append(starts, len(H_sorted)))
+    return H_sorted[starts], np.add.reduceat(B_sorted, starts) / counts, counts
+
+def _basis(x, x0, step, num_intervals):
+    # Intervallindex und die vier Gewichte der gleichabständigen kubischen B-Splines an den Stellen x
+    # (außerhalb des Knotenbereichs wird das Randpolynom fortgesetzt)
+    s = (x - x0) / step
+    q = np.clip(np.floor(s), 0, num_intervals - 1).astype(np.intp)
+    u = s - q
+    u2 = u * u
+    u3 = u2 * u
+    return q, ((1 - u) ** 3 / 6, (3 * u3 - 6 * u2 + 4) / 6, (-3 * u3 + 3 * u2 + 3 * u + 1) / 6, u3 / 6)
+
+def _basis_derivative(x, x0, step, num_intervals):
+    # Wie _basis, aber die Ableitungen der vier Gewichte nach x
+    s = (x - x0) / step
+    q = np.clip(np.floor(s), 0, num_intervals - 1).astype(np.intp)
+    u = s - q
+    u2 = u * u
+    return q, (-(1 - u) ** 2 / (2 * step), (3 * u2 - 4 * u) / (2 * step), (-3 * u2 + 2 * u + 1) / (2 * step), u2 / (2 * step))
+
+class SmoothingSpline:
+    # Kubische B-Spline auf gleichabständigen Knoten ab x0 mit Abstand step; Aufruf wertet sie an x aus
+    def __init__(self, x0, step, coefficients, smoothing):
+        self.x0 = x0
+        self.step = step
+        self.coefficients = coefficients
+        self.smoothing = smoothing
+
+    @property
+    def num_intervals(self):
+        return len(self.coefficients) - 3
+
+    def __call__(self, x):
+        return self._evaluate(x, _basis)
+
+    def derivative(self, x):
+        # Erste Ableitung an den Stellen x
+        return self._evaluate(x, _basis_derivative)
+
+    def _evaluate(self, x, basis):
+        x = np.asarray(x, dtype=np.float64)
+        flat = x.ravel()
+        result = np.empty(flat.shape)
+        c = self.coefficients
+        for start in range(0, len(flat), CHUNK):
+            q, b = basis(flat[start:start + CHUNK], self.x0, self.step, self.num_intervals)
+            result[start:start + CHUNK] = c[q] * b[0] + c[q + 1] * b[1] + c[q + 2] * b[2] + c[q + 3] * b[3]
+        return result.reshape(x.shape)
+
+def fit_smoothing_spline(H, B, weights=None, smoothing=DEFAULT_SMOOTHING):
+    # Glättende kubische Spline durch (H, B) mit Gewichten (z.B. Anzahl der zusammengefassten Punkte).
+    # Minimiert sum(w * (B - f(H))^2) + n * smoothing^4 * Integral(f''^2) mit H auf [0, 1] normiert;
+    # smoothing ist damit die Länge (Anteil des H-Bereichs), unterhalb der geglättet wird.
+    H = np.asarray(H, dtype=np.float64)
+    B = np.asarray(B, dtype=np.float64)
+    weights = np.ones(len(H)) if weights is None else np.asarray(weights, dtype=np.float64)
+    if len(H) < 4:
+        raise ValueError("Für die Interpolation werden mindestens 4 verschiedene H-Werte benötigt")
+    H_min, H_max = H.min(), H.max()
+    if smoothing > 0:
+        num_intervals = int(np.ceil(KNOTS_PER_SMOOTHING / smoothing))
+    else:
+        num_intervals = MAX_INTERVALS
+    num_intervals = max(1, min(num_intervals, len(H) - 3, MAX_INTERVALS))
+    num_coefficients = num_intervals + 3
+    step = (H_max - H_min) / num_intervals
+
+    # Normalgleichungen als Bandmatrix (obere Form für solveh_banded, Bandbreite 3)
+    bands = np.zeros((4, num_coefficients))
+    rhs = np.zeros(num_coefficients)
+    for start in range(0, len(H), CHUNK):
+        q, b = _basis(H[start:start + CHUNK], H_min, step, num_intervals)
+        w = weights[start:start + CHUNK]
+        for r in range(4):
+            wb = w * b[r]
+            rhs += np.bincount(q + r, weights=wb * B[start:start + CHUNK], minlength=num_coefficients)
+            for s in range(r, 4):
+                bands[3 - (s - r)] += np.bincount(q + s, weights=wb * b[s], minlength=num_coefficients)
+
+    # Strafterm auf den zweiten Differenzen der Koeffizienten: D2^T D2 (fünfdiagonal)
+    lam = weights.sum() * smoothing ** 4 * num_intervals ** 3
+    ones = np.ones(num_coefficients - 2)
+    bands[3] += lam * np.convolve(ones, [1, 4, 1])
+    bands[2, 1:] += lam * np.convolve(ones, [-2, -2])
+    bands[1, 2:] += lam * ones
+    # Kleine Regularisierung für Knotenintervalle ohne Datenpunkte
+    bands[3] += 1e-12 * bands[3].max()
+    coefficients = solveh_banded(bands, rhs, check_finite=False)
+    return SmoothingSpline(H_min, step, coefficients, smoothing)
+
+def interpolate_curve(H_values, B_values, smoothing=DEFAULT_SMOOTHING, num_points=None):
+    # Gibt (H_sorted, B_sorted, H_fine, B_fine) zurück: bereinigte Daten und die geglättete Kurve auf einem
+    # gleichmäßigen Raster mit num_points (Standard: ursprüngliche Punktzahl) Punkten.
+    num_rows = len(H_values)
+    H_sorted, B_sorted, counts = dedup_mean(H_values, B_values)
+    spline = fit_smoothing_spline(H_sorted, B_sorted, counts, smoothing)
+    H_fine = np.linspace(H_sorted[0], H_sorted[-1], num=num_points or num_rows)
+    return H_sorted, B_sorted, H_fine, spline(H_fine)
+
+def evaluate_smoothing(curve, smoothing):
+    # Bewertung einer Glättung für eine bereinigte Kurve (H, B, Anzahl, Punktzahl der Ausgabe):
+    # Restwelligkeit als Energie der zweiten Differenzen auf dem Ausgaberaster (bezogen auf die Spannweite)
+    # und Abweichung als gewichteter Effektivwert gegenüber den gefilterten Daten in T.
+    H_sorted, B_sorted, counts, num_rows = curve
+    spline = fit_smoothing_spline(H_sorted, B_sorted, counts, smoothing)
+    B_fine = spline(np.linspace(H_sorted[0], H_sorted[-1], num=num_rows))
+    residual = spline(H_sorted) - B_sorted
+    return {'Glaettung': smoothing,
+            'Restwelligkeit': np.mean(np.diff(B_fine, 2) ** 2) / np.ptp(B_fine) ** 2,
+            'Abweichung in T': np.sqrt(np.sum(counts * residual ** 2) / np.sum(counts))}
+
+_smoothing_curves = None
+
+def _init_smoothing(curves):
+    global _smoothing_curves
+    _smoothing_curves = curves
+
+def _evaluate_smoothing_point(task):
+    curve_index, smoothing = task
+    row = evaluate_smoothing(_smoothing_curves[curve_index], smoothing)
+    row['Kurve'] = curve_index
+    return row
+
+def knee_index(x, y):
+    # Knie einer fallenden Abwägungskurve y(x) (x steigend): der Punkt mit dem größten Abstand unterhalb der
+    # Verbindungslinie von erstem und letztem Punkt, beide Achsen logarithmisch und auf [0, 1] normiert.
+    x = np.log10(np.maximum(x, np.finfo(float).tiny))
+    y = np.log10(np.maximum(y, np.finfo(float).tiny))
+    x = (x - x.min()) / max(np.ptp(x), np.finfo(float).eps)
+    y = (y - y.min()) / max(np.ptp(y), np.finfo(float).eps)
+    chord = (y[-1] - y[0]) * (x - x[0]) - (x[-1] - x[0]) * (y - y[0])
+    return int(np.argmax(chord))
+
+def sweep_smoothing(curve_set, candidates=SMOOTHING_CANDIDATES, workers=None, progress=None):
+    # Bewertet alle Glättungen für jede Kurve parallel (workers=1: ohne Prozesse) und liefert eine Tabelle mit
+    # Restwelligkeit und Abweichung; 'Knie' markiert je Kurve die gewählte Glättung. progress(Anteil) wird nach
+    # jeder bewerteten Glättung aufgerufen; eine Ausnahme darin (z.B. Abbruch) verwirft die ausstehenden.
+    curves = [dedup_mean(H_values, B_values) + (len(H_values),) for H_values, B_values in curve_set]
+    tasks = list(product(range(len(curves)), sorted(candidates)))
+    rows = []
+    if workers == 1:
+        _init_smoothing(curves)
+        for done, task in enumerate(tasks, start=1):
+            rows.append(_evaluate_smoothing_point(task))
+            if progress is not None:
+                progress(done / len(tasks))
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_smoothing, initargs=(curves,))
+        try:
+            for done, row in enumerate(executor.map(_evaluate_smoothing_point, tasks), start=1):
+                rows.append(row)
+                if progress is not None:
+                    progress(done / len(tasks))
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    table = pd.DataFrame(rows)
+    table['Knie'] = False
+    for _, group in table.groupby('Kurve'):
+        # Größere Glättung: Restwelligkeit fällt, Abweichung steigt
+        knee = knee_index(group['Abweichung in T'].to_numpy(), group['Restwelligkeit'].to_numpy())
+        table.loc[group.index[knee], 'Knie'] = True
+    return table[['Kurve', 'Glaettung', 'Knie', 'Restwelligkeit', 'Abweichung in T']]
+
+def knee_smoothing(table):
+    # Gewählte Glättung je Kurve (Reihenfolge der Kurven)
+    return [float(value) for value in table[table['Knie']].sort_values('Kurve')['Glaettung']]
+
+def interpolate_curve_set(curve_set, smoothing=DEFAULT_SMOOTHING, progress=None):
+    # Interpoliert alle Kurven. smoothing gilt für alle Kurven oder ist eine Liste je Kurve.
+    # Ergebnis: Spalten H_fine_i, B_fine_i (i ab 1) und die Zwischenergebnisse je Kurve für die Darstellung.
+    # progress(Anteil) wird nach jeder Kurve aufgerufen.
+    if np.isscalar(smoothing):
+        smoothing = [smoothing] * len(curve_set)
+    new_columns = {}
+    all_data = []
+    for i, ((H_values, B_values), curve_smoothing) in enumerate(zip(curve_set, smoothing), start=1):
+        H_sorted, B_sorted, H_fine, B_fine = interpolate_curve(H_values, B_values, curve_smoothing)
+        new_columns[f'H_fine_{i}'] = H_fine
+        new_columns[f'B_fine_{i}'] = B_fine
+        all_data.append((H_sorted, B_sorted, H_fine, B_fine, i))
+        if progress is not None:
+            progress(i / len(curve_set))
+    return new_columns, all_data
+
+def interpolated_dataframe(new_columns, attrs=None, smoothing=DEFAULT_SMOOTHING, automatic=False):
+    new_dataframe = padded_dataframe(new_columns)
+    new_dataframe.attrs.update(attrs or {})
+    new_dataframe.attrs['Glaettung_Interpolation'] = smoothing if np.isscalar(smoothing) else list(smoothing)
+    new_dataframe.attrs['Glaettung_automatisch'] = automatic
+    return new_dataframe
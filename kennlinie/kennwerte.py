@@ -0,0 +1,298 @@
+import numpy as np
+import pandas as pd
+from scipy.integrate import cumulative_trapezoid
+from scipy.interpolate import interp1d
+from scipy.signal import savgol_filter
+from .interpolation import DEFAULT_SMOOTHING, dedup_mean, fit_smoothing_spline
+from .kurvensatz import padded_dataframe
+
+# Kennwerte der Hystereseschleife ohne Oberfläche: Remanenz, Koerzitivfeldstärke, Permeabilität,
+# Magnetisierung/Polarisation und Ummagnetisierungsverluste. Alle Funktionen arbeiten auf Arrays
+# (pandas-Series werden ebenfalls akzeptiert).
+
+# Konstante für die magnetische Feldkonstante μ0
+MU_0 = 4 * np.pi * 10**-7
+
+# Trapezregel (np.trapz heißt ab numpy 2.0 np.trapezoid)
+trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+# Kurzbezeichnungen der Kurven eines Kurvensatzes für Spaltennamen (Neukurve, obere, untere Grenzkurve)
+CURVE_SUFFIXES = ['neu', 'oben', 'unten']
+
+# Amplitudenpermeabilität B / (μ0 H) erst ab diesem Anteil von max|H| (bei H -> 0 ist sie nicht bestimmt)
+AMPLITUDE_MIN_H_FRACTION = 0.01
+
+# Funktion zur Berechnung der Remanenz mit linearer Interpolation
+def calculate_remanence(h_values, b_values):
+    h_values, b_values = np.asarray(h_values), np.asarray(b_values)
+    zero_crossing_index = np.where(np.diff(np.sign(h_values)))[0]
+
+    if len(zero_crossing_index) == 0:
+        return None  # Kein Schnittpunkt mit der Y-Achse gefunden
+
+    zero_crossing_index = zero_crossing_index[0]
+
+    # Werte vor und nach dem Schnittpunkt
+    h1, h2 = h_values[zero_crossing_index], h_values[zero_crossing_index + 1]
+    b1, b2 = b_values[zero_crossing_index], b_values[zero_crossing_index + 1]
+
+    # Lineare Interpolation
+    return b1 + (b2 - b1) * (0 - h1) / (h2 - h1)
+
+# Funktion zur Berechnung der Koerzitivfeldstärke mit linearer Interpolation
+def calculate_coercivity(h_values, b_values):
+    h_values, b_values = np.asarray(h_values), np.asarray(b_values)
+    zero_crossing_index = np.where(np.diff(np.sign(b_values)))[0]
+
+    if len(zero_crossing_index) == 0:
+        return None  # Kein Schnittpunkt mit der X-Achse gefunden
+
+    zero_crossing_index = zero_crossing_index[0]
+
+    # Werte vor und nach dem Schnittpunkt
+    b1, b2 = b_values[zero_crossing_index], b_values[zero_crossing_index + 1]
+    h1, h2 = h_values[zero_crossing_index], h_values[zero_crossing_index + 1]
+
+    # Lineare Interpolation
+    return h1 + (h2 - h1) * (0 - b1) / (b2 - b1)
+
+def axis_crossings(curve_set):
+    # Alle Nulldurchgänge von H (Remanenz) und von B (Koerzitivfeldstärke) auf allen Kurven in einem Durchgang:
+    # die Kurven werden aneinandergehängt, Paare über Kurvengrenzen hinweg und mit NaN werden verworfen und
+    # der jeweils andere Wert linear interpoliert. Ergebnis: Tabelle mit Kurve (ab 0), Art ('H=0' bzw. 'B=0'),
+    # Index (gebrochene Position in der Kurve), H und B am Nulldurchgang.
+    arrays = [(np.asarray(H, dtype=np.float64), np.asarray(B, dtype=np.float64)) for H, B in curve_set]
+    lengths = np.array([len(H) for H, _ in arrays])
+    H = np.concatenate([H for H, _ in arrays])
+    B = np.concatenate([B for _, B in arrays])
+    curve = np.repeat(np.arange(len(arrays)), lengths)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    same_curve = curve[:-1] == curve[1:]
+
+    frames = []
+    for kind, x, y in (('H=0', H, B), ('B=0', B, H)):
+        sign = np.sign(x)
+        # Vorzeichenwechsel; ein Punkt genau auf der Achse zählt einmal (als Ende des Paares davor)
+        pairs = same_curve & (sign[:-1] != sign[1:]) & (sign[:-1] != 0) & np.isfinite(x[:-1]) & np.isfinite(x[1:])
+        i = np.flatnonzero(pairs)
+        fraction = x[i] / (x[i] - x[i + 1])
+        value = y[i] + (y[i + 1] - y[i]) * fraction
+        frames.append(pd.DataFrame({'Kurve': curve[i], 'Art': kind, 'Index': i - offsets[curve[i]] + fraction,
+                                    'H in A/m': 0.0 if kind == 'H=0' else value,
+                                    'B in T': value if kind == 'H=0' else 0.0}))
+    return pd.concat(frames, ignore_index=True)
+
+def loop_characteristics(curve_set, branches=None, crossings=None):
+    # Br+, Br-, Hc+, Hc- und Asymmetrie der Schleife aus allen Nulldurchgängen der Grenzkurven (Standard: alle
+    # Kurven außer der Neukurve, die durch den Ursprung läuft). Asymmetrie: Verschiebung der Schleife
+    # (Mittelwert aus positivem und negativem Wert) absolut und bezogen auf die halbe Spannweite in %.
+    if crossings is None:
+        crossings = axis_crossings(curve_set)
+    if branches is None:
+        branches = range(1, len(curve_set)) if len(curve_set) >= 3 else range(len(curve_set))
+    limit = crossings[crossings['Kurve'].isin(list(branches))]
+    remanence = limit.loc[limit['Art'] == 'H=0', 'B in T']
+    coercivity = limit.loc[limit['Art'] == 'B=0', 'H in A/m']
+    result = {'Br+ in T': remanence[remanence > 0].max(), 'Br- in T': remanence[remanence < 0].min(),
+              'Hc+ in A/m': coercivity[coercivity > 0].max(), 'Hc- in A/m': coercivity[coercivity < 0].min()}
+    for name, unit in (('Br', 'T'), ('Hc', 'A/m')):
+        upper, lower = result[f'{name}+ in {unit}'], result[f'{name}- in {unit}']
+        result[f'Asymmetrie {name} in {unit}'] = (upper + lower) / 2
+        result[f'Asymmetrie {name} in %'] = 100 * (upper + lower) / (upper - lower)
+    result['Nulldurchgaenge H=0'] = len(remanence)
+    result['Nulldurchgaenge B=0'] = len(coercivity)
+    return result
+
+# Funktion zur Berechnung der Magnetisierung
+def magnetization(B, H):
+    return B / MU_0 - H
+
+# Funktion zur Berechnung der Polarisation
+def polarization(B, H):
+    return B - MU_0 * H
+
+# Kumulierte Energiedichte w = Integral H dB entlang der Kurve in J/m³ (Trapezregel)
+def energy_density(H, B):
+    return cumulative_trapezoid(H, B, initial=0)
+
+def derived_quantities(curve_set, permeability=False, energy=False, suffixes=CURVE_SUFFIXES):
+    # Magnetisierung M und Polarisation J (optional μr und Energiedichte w) für alle Kurven eines Kurvensatzes,
+    # ganz auf Arrays. Ergebnis: DataFrame mit den Spalten H_x, M_x, J_x[, mu_r_x][, w_x] je Kurve x
+    # (x aus suffixes, sonst die Nummer der Kurve); kürzere Kurven werden mit NaN aufgefüllt.
+    columns = {}
+    for i, (H, B) in enumerate(curve_set):
+        suffix = suffixes[i] if i < len(suffixes) else str(i + 1)
+        H = np.asarray(H, dtype=np.float64)
+        B = np.asarray(B, dtype=np.float64)
+        columns[f'H_{suffix}'] = H
+        columns[f'M_{suffix}'] = magnetization(B, H)
+        columns[f'J_{suffix}'] = polarization(B, H)
+        if permeability:
+            columns[f'mu_r_{suffix}'] = permeability_curve(H, B)[1]
+        if energy:
+            columns[f'w_{suffix}'] = energy_density(H, B)
+    return padded_dataframe(columns)
+
+# Funktion zur Berechnung der relativen Permeabilität durch Steigungsberechnung
+def relative_permeability(H, B):
+    # Glättung der Daten
+    B_smooth = savgol_filter(B, window_length=11, polyorder=3)
+    H_smooth = savgol_filter(H, window_length=11, polyorder=3)
+
+    # Berechnung der Steigung mittels zentraler Differenzenmethode auf den geglätteten Daten
+    dB_dH = np.gradient(B_smooth, H_smooth)
+
+    return dB_dH / MU_0
+
+def permeability_curve(H, B, smoothing=DEFAULT_SMOOTHING):
+    # Relative differentielle (dB/dH / μ0) und Amplitudenpermeabilität (B / (μ0 H)) in voller Auflösung an den
+    # Stellen H. B und dB/dH stammen aus einer glättenden Spline über die ganze Kurve (Aufwand linear in der
+    # Punktzahl, keine Unterabtastung nötig). Gibt (B geglättet, mu_diff, mu_amp) zurück; mu_amp ist NaN bei
+    # |H| < AMPLITUDE_MIN_H_FRACTION * max|H|.
+    H = np.asarray(H, dtype=np.float64)
+    spline = fit_smoothing_spline(*dedup_mean(H, B), smoothing=smoothing)
+    B_smooth = spline(H)
+    mu_diff = spline.derivative(H) / MU_0
+    mu_amp = np.full(H.shape, np.nan)
+    valid = np.abs(H) >= AMPLITUDE_MIN_H_FRACTION * np.max(np.abs(H))
+    mu_amp[valid] = B_smooth[valid] / (MU_0 * H[valid])
+    return B_smooth, mu_diff, mu_amp
+
+def permeability_curves(curve_set, smoothing=DEFAULT_SMOOTHING, suffixes=CURVE_SUFFIXES):
+    # Permeabilitäten aller Kurven (smoothing für alle Kurven oder als Liste je Kurve). Ergebnis:
+    # - DataFrame mit H_x, B_x, B_glatt_x, mu_diff_x, mu_amp_x je Kurve x
+    # - Kennwerte je Kurve: maximale differentielle Permeabilität mit ihrer Feldstärke; für die Neukurve
+    #   (erste Kurve) zusätzlich Anfangspermeabilität (Steigung bei H -> 0) und maximale Amplitudenpermeabilität
+    if np.isscalar(smoothing):
+        smoothing = [smoothing] * len(curve_set)
+    columns = {}
+    rows = []
+    for i, ((H, B), curve_smoothing) in enumerate(zip(curve_set, smoothing)):
+        suffix = suffixes[i] if i < len(suffixes) else str(i + 1)
+        H = np.asarray(H, dtype=np.float64)
+        B_smooth, mu_diff, mu_amp = permeability_curve(H, B, curve_smoothing)
+        columns.update({f'H_{suffix}': H, f'B_{suffix}': np.asarray(B, dtype=np.float64), f'B_glatt_{suffix}': B_smooth,
+                        f'mu_diff_{suffix}': mu_diff, f'mu_amp_{suffix}': mu_amp})
+        row = {'Kurve': suffix, 'mu_initial': np.nan, 'H bei mu_initial in A/m': np.nan,
+               'mu_max': np.nan, 'H bei mu_max in A/m': np.nan}
+        peak = np.argmax(mu_diff)
+        row.update({'mu_diff_max': mu_diff[peak], 'H bei mu_diff_max in A/m': H[peak]})
+        if i == 0:
+            start = np.argmin(np.abs(H))
+            row.update({'mu_initial': mu_diff[start], 'H bei mu_initial in A/m': H[start]})
+            if np.isfinite(mu_amp).any():
+                peak = np.nanargmax(mu_amp)
+                row.update({'mu_max': mu_amp[peak], 'H bei mu_max in A/m': H[peak]})
+        rows.append(row)
+    return padded_dataframe(columns), pd.DataFrame(rows)
+
+def linear_roots(func, grid, breakpoints):
+    # Nullstellen der stückweise linearen Funktion func (interp1d oder Differenz zweier interp1d mit den Stützstellen
+    # breakpoints): Vorzeichenwechsel auf dem Gitter werden vektorisiert gesucht, in jedem dieser Intervalle wird
+    # func zusätzlich an den Stützstellen ausgewertet. Zwischen benachbarten Punkten ist func dann linear und die
+    # Nullstelle ergibt sich geschlossen. Ergebnis: je Gitterintervall mit Vorzeichenwechsel die erste Nullstelle.
+    values = func(grid)
+    brackets = np.flatnonzero(values[:-1] * values[1:] < 0)
+    if len(brackets) == 0:
+        return np.empty(0)
+    breakpoints = np.asarray(breakpoints, dtype=np.float64)
+    owner = np.searchsorted(grid, breakpoints, side='right') - 1
+    inside = np.isin(owner, brackets) & (breakpoints > grid[np.clip(owner, 0, len(grid) - 1)])
+    points = np.unique(np.concatenate((grid[brackets], grid[brackets + 1], breakpoints[inside])))
+    values = func(points)
+    pairs = np.flatnonzero(values[:-1] * values[1:] < 0)
+    roots = points[pairs] - values[pairs] * (points[pairs + 1] - points[pairs]) / (values[pairs + 1] - values[pairs])
+    roots = np.sort(np.concatenate((roots, points[values == 0])))
+    # Nur Nullstellen innerhalb der Intervalle mit Vorzeichenwechsel, je Intervall die erste
+    root_owner = np.searchsorted(grid, roots, side='right') - 1
+    roots, root_owner = roots[np.isin(root_owner, brackets)], root_owner[np.isin(root_owner, brackets)]
+    return roots[np.unique(root_owner, return_index=True)[1]]
+
+def find_intersection(H_upper_interp, H_lower_interp, B_diff):
+    H_values = np.linspace(0, min(H_upper_interp.x[-1], H_lower_interp.x[-1]), 10000)
+    return linear_roots(B_diff, H_values, np.concatenate((H_upper_interp.x, H_lower_interp.x))).tolist()
+
+def find_zero_crossing(interp_func, H_range):
+    roots = linear_roots(interp_func, H_range, interp_func.x)
+    return float(roots[0]) if len(roots) else None
+
+def polygon_area(H, B):
+    # Vorzeichenbehaftete Fläche ∮ H dB des geschlossenen Polygons (Gaußsche Trapezformel, O(n)). Der letzte Punkt
+    # wird mit dem ersten verbunden. Koordinaten werden vorher zentriert (weniger Auslöschung bei großen Werten).
+    H, B = np.asarray(H, dtype=np.float64), np.asarray(B, dtype=np.float64)
+    if len(H) < 3:
+        return 0.0
+    H = H - H.mean()
+    B = B - B.mean()
+    return (np.dot(H, np.roll(B, -1)) - np.dot(np.roll(H, -1), B)) / 2
+
+def loop_polygon(H_upper, B_upper, H_lower, B_lower):
+    # Geschlossene Schleife aus den gemessenen Punkten: obere Grenzkurve mit steigendem H, dann untere Grenzkurve
+    # mit fallendem H (die Reihenfolge der Eingabe ist beliebig); NaN aus aufgefüllten Spalten werden entfernt
+    branches = []
+    for H, B, ascending in ((H_upper, B_upper, True), (H_lower, B_lower, False)):
+        H, B = np.asarray(H, dtype=np.float64), np.asarray(B, dtype=np.float64)
+        valid = np.isfinite(H) & np.isfinite(B)
+        H, B = H[valid], B[valid]
+        if len(H) > 1 and (H[-1] > H[0]) != ascending:
+            H, B = H[::-1], B[::-1]
+        branches.append((H, B))
+    return np.concatenate([H for H, _ in branches]), np.concatenate([B for _, B in branches])
+
+def loop_area(H_upper, B_upper, H_lower, B_lower):
+    # Von der Schleife umschlossene Fläche in Ws/m³ (Ummagnetisierungsverluste je Volumen und Zyklus), exakt für
+    # die stückweise linear verbundenen Messpunkte, ohne Neuabtastung und ohne Annahme einer symmetrischen Schleife.
+    # Auch für verschobene Schleifen und Teilschleifen (ohne Nulldurchgang) gültig. Überkreuzen sich die Kurven an
+    # den Spitzen (Rauschen), werden die kleinen Gegenschleifen wie in ∮ H dB abgezogen.
+    return abs(polygon_area(*loop_polygon(H_upper, B_upper, H_lower, B_lower)))
+
+def branch_segment(interp_func, start, end):
+    # Punkte der linear interpolierten Kurve zwischen start und end (Messpunkte dazwischen und beide Grenzen) und
+    # das exakte Integral ∫ B dH von start bis end
+    H = interp_func.x[(interp_func.x > min(start, end)) & (interp_func.x < max(start, end))]
+    H = np.concatenate(([min(start, end)], H, [max(start, end)]))
+    B = interp_func(H)
+    area = trapezoid(B, H)
+    return H, B, area if start <= end else -area
+
+def loss_area(H_upper, B_upper, H_lower, B_lower, num_points=10000):
+    # Ummagnetisierungsverluste je Volumen in Ws/m³: 'total_area' ist die von der Schleife umschlossene Fläche
+    # (loop_area). Zur Darstellung werden außerdem die Flächen unter beiden Kurven vom jeweiligen Nulldurchgang bis
+    # zum ersten Schnittpunkt beider Kurven bzw. bis zum Ende der kürzeren Kurve bestimmt (exakt auf den
+    # Messpunkten). Ergebnis: dict mit Nulldurchgängen, Schnittpunkten, Integrationsgrenze, Punkten und Teilflächen.
+    H_upper, B_upper = np.asarray(H_upper), np.asarray(B_upper)
+    H_lower, B_lower = np.asarray(H_lower), np.asarray(B_lower)
+
+    # Lineare Interpolation innerhalb der Datenbereiche
+    H_upper_interp = interp1d(H_upper, B_upper, kind='linear', fill_value="extrapolate")
+    H_lower_interp = interp1d(H_lower, B_lower, kind='linear', fill_value="extrapolate")
+    B_diff = lambda H: H_upper_interp(H) - H_lower_interp(H)
+
+    result = {'H_upper_interp': H_upper_interp, 'H_lower_interp': H_lower_interp}
+    result['intersections'] = find_intersection(H_upper_interp, H_lower_interp, B_diff)
+    result['upper_zero_crossing'] = find_zero_crossing(H_upper_interp, np.linspace(H_upper.min(), H_upper.max(), num_points))
+    result['lower_zero_crossing'] = find_zero_crossing(H_lower_interp, np.linspace(H_lower.min(), H_lower.max(), num_points))
+
+    if result['intersections']:
+        upper_limit = result['intersections'][0]
+    else:
+        upper_limit = min(H_upper[-1], H_lower[-1])
+    result['upper_limit'] = upper_limit
+
+    # Fläche unter der oberen und unteren Hysteresekurve
+    for name, interp in (('upper', H_upper_interp), ('lower', H_lower_interp)):
+        zero_crossing = result[f'{name}_zero_crossing']
+        if zero_crossing is None:
+            result[f'H_area_{name}'] = result[f'B_area_{name}'] = result[f'area_{name}'] = None
+            continue
+        result[f'H_area_{name}'], result[f'B_area_{name}'], result[f'area_{name}'] = branch_segment(interp, zero_crossing, upper_limit)
+
+    result['total_area'] = loop_area(H_upper, B_upper, H_lower, B_lower)
+    return result
+
+def loss_factor(total_area, duration, density):
+    # Verlustkennzahl in W/kg bei der Messfrequenz 1 / (0.8 * Messdauer) und hochgerechnet auf 50 Hz
+    loss = total_area / (0.8 * duration * density)
+    frequency = 1 / (0.8 * duration)
+    loss_50Hz = loss * 50 * 0.8 * duration
+    return loss, frequency, loss_50Hz
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+# Kurvensatz: Neukurve, obere und untere Grenzkurve als eigene, zusammenhängende float64-Arrays mit ihrer
+# echten Länge. In CSV/NPZ-Dateien bleibt das bisherige Spaltenlayout (H/B-Paare nebeneinander) erhalten;
+# kürzere Kurven werden dort mit leeren Zellen (NaN) aufgefüllt statt mit wiederholten Endpunkten.
+
+BRANCH_NAMES = ['Neukurve', 'Obere Grenzkurve', 'Untere Grenzkurve']
+
+def default_pairs(num_columns):
+    return [(i, i + 1) for i in range(0, num_columns - 1, 2)]
+
+def valid_range(*columns):
+    # Bereich von der ersten bis zur letzten Zeile, in der mindestens eine Spalte einen Wert hat
+    valid = np.zeros(len(columns[0]), dtype=bool)
+    for column in columns:
+        valid |= ~np.isnan(column)
+    if not valid.any():
+        return 0, 0
+    return np.argmax(valid), len(valid) - np.argmax(valid[::-1])
+
+def fill_gaps(values):
+    # Füllt einzelne fehlende Werte innerhalb der Kurve linear (über den Zeilenindex), an den Rändern mit dem
+    # nächsten gültigen Wert – wie interpolate().bfill().ffill(), aber nur innerhalb der echten Kurvenlänge.
+    missing = np.isnan(values)
+    if not missing.any() or missing.all():
+        return values
+    index = np.arange(len(values))
+    values = values.copy()
+    values[missing] = np.interp(index[missing], index[~missing], values[~missing])
+    return values
+
+def strip_repeated_edges(x, y):
+    # Entfernt wiederholte Punkte am Anfang und Ende, wie sie durch das frühere Auffüllen mit bfill/ffill
+    # entstanden sind (ein Exemplar bleibt jeweils erhalten). Spalten ohne gültigen Wert ergeben eine leere Kurve.
+    n = len(x)
+    if np.isnan(x).all() or np.isnan(y).all():
+        return x[:0], y[:0]
+    if n < 2:
+        return x, y
+    same_as_last = (x == x[-1]) & (y == y[-1])
+    same_as_first = (x == x[0]) & (y == y[0])
+    if same_as_last.all():
+        return x[:1], y[:1]
+    stop = n - np.argmin(same_as_last[::-1]) + 1
+    start = max(np.argmin(same_as_first) - 1, 0)
+    return x[start:stop], y[start:stop]
+
+def padded_dataframe(columns):
+    # DataFrame aus Spalten unterschiedlicher Länge; kürzere Spalten werden mit NaN aufgefüllt
+    num_rows = max((len(values) for values in columns.values()), default=0)
+    data = {}
+    for name, values in columns.items():
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) < num_rows:
+            values = np.concatenate([values, np.full(num_rows - len(values), np.nan)])
+        data[name] = values
+    return pd.DataFrame(data)
+
+class CurveSet:
+
+    def __init__(self, branches, column_names=None, attrs=None, extra_columns=None):
+        self.branches = [(np.ascontiguousarray(x, dtype=np.float64), np.ascontiguousarray(y, dtype=np.float64)) for x, y in branches]
+        if column_names is None:
+            column_names = [name for i in range(len(self.branches)) for name in (f'H_{i}', f'B_{i}')]
+        self.column_names = list(column_names)
+        self.attrs = dict(attrs or {})
+        # Spalten ohne Partner (z.B. eine zusätzliche letzte Spalte), werden unverändert mitgeführt
+        self.extra_columns = dict(extra_columns or {})
+
+    @classmethod
+    def from_dataframe(cls, df, pairs=None, fill=True, drop_repeated_padding=True):
+        # Liest die H/B-Spaltenpaare (Standard: (0, 1), (2, 3), (4, 5)) und entfernt die Auffüllung am Ende.
+        # Mit drop_repeated_padding werden auch wiederholte Randpunkte älterer, mit ffill aufgefüllter Dateien entfernt.
+        # Eine ungepaarte letzte Spalte (nur bei den Standardpaaren) bleibt in extra_columns erhalten.
+        extra_columns = {}
+        if pairs is None and len(df.columns) % 2:
+            values = df.iloc[:, -1].to_numpy(dtype=np.float64)
+            start, stop = valid_range(values)
+            extra_columns[df.columns[-1]] = fill_gaps(values[start:stop]) if fill else values[start:stop]
+        pairs = pairs or default_pairs(len(df.columns))
+        branches = []
+        column_names = []
+        for x_col, y_col in pairs:
+            x = df.iloc[:, x_col].to_numpy(dtype=np.float64)
+            y = df.iloc[:, y_col].to_numpy(dtype=np.float64)
+            start, stop = valid_range(x, y)
+            x, y = x[start:stop], y[start:stop]
+            if fill:
+                x, y = fill_gaps(x), fill_gaps(y)
+            if drop_repeated_padding:
+                x, y = strip_repeated_edges(x, y)
+            branches.append((x, y))
+            column_names += [df.columns[x_col], df.columns[y_col]]
+        return cls(branches, column_names, df.attrs, extra_columns)
+
+    def to_dataframe(self):
+        columns = {}
+        for (x, y), (x_name, y_name) in zip(self.branches, zip(self.column_names[::2], self.column_names[1::2])):
+            columns[x_name] = x
+            columns[y_name] = y
+        columns.update(self.extra_columns)
+        df = padded_dataframe(columns)
+        df.attrs.update(self.attrs)
+        return df
+
+    def __len__(self):
+        return len(self.branches)
+
+    def __iter__(self):
+        return iter(self.branches)
+
+    def __getitem__(self, index):
+        return self.branches[index]
+
+    @property
+    def lengths(self):
+        return [len(x) for x, _ in self.branches]
+
+    @property
+    def nbytes(self):
+        return sum(x.nbytes + y.nbytes for x, y in self.branches)
@@ -0,0 +1,143 @@
+import hashlib
+import numpy as np
+from scipy.interpolate import CubicSpline, interp1d
+
+# Neuberechnung der Kennlinien mit vorgegebener Punktzahl oder vorgegebener maximaler Abweichung
+# (genutzt von 3_Modifikation.py)
+
+# Stützstellen für die Abschätzung der Krümmung bei der adaptiven Punktverteilung
+DENSITY_GRID = 4096
+# Ordnung der Ableitung, die den Interpolationsfehler bestimmt
+DENSITY_ORDER = {'cubic': 4, 'quadratic': 3}
+# Grundanteil der Punktdichte, damit auch nahezu gerade Abschnitte (Sättigung) Punkte erhalten
+DENSITY_FLOOR = 0.1
+# Mindestanzahl der Punkte einer reduzierten Tabelle
+MIN_POINTS = 4
+
+class BoundNotReached(ValueError):
+    # Die maximale Abweichung ist mit der zulässigen Punktzahl nicht erreichbar
+    pass
+
+def data_hash(*arrays):
+    # Prüfsumme über Inhalt, Länge und Datentyp der Arrays
+    digest = hashlib.blake2b(digest_size=20)
+    for values in arrays:
+        values = np.ascontiguousarray(values)
+        digest.update(f"{values.dtype.str}{values.shape}".encode())
+        digest.update(values.data)
+    return digest.hexdigest()
+
+def fit_interpolator(H, B, method):
+    # Sortiert die Kurve nach H und passt einen kubischen Spline ('cubic') bzw. eine quadratische
+    # Interpolation ('quadratic') an
+    sorted_indices = np.argsort(H)
+    H_sorted = np.array(H)[sorted_indices]
+    B_sorted = np.array(B)[sorted_indices]
+    if method == 'cubic':
+        return CubicSpline(H_sorted, B_sorted)
+    elif method == 'quadratic':
+        return interp1d(H_sorted, B_sorted, kind='quadratic')
+    raise ValueError(f"Unbekannte Interpolationsmethode: {method}")
+
+class InterpolatorCache:
+    # Angepasste Interpolatoren je Kurve und Methode. Ein Eintrag wird wiederverwendet, solange die
+    # Prüfsumme der Eingangsdaten gleich bleibt; invalidate() verwirft Einträge, wenn sich Daten ändern.
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, curve, H, B, method):
+        digest = data_hash(H, B)
+        entry = self.entries.get((curve, method))
+        if entry is not None and entry[0] == digest:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        interpolator = fit_interpolator(H, B, method)
+        self.entries[(curve, method)] = (digest, interpolator)
+        return interpolator
+
+    def invalidate(self, *curves):
+        # Ohne Angabe werden alle Einträge verworfen, sonst nur die der genannten Kurven
+        if not curves:
+            self.entries.clear()
+            return
+        for key in [key for key in self.entries if key[0] in curves]:
+            del self.entries[key]
+
+def generate_points(H, B, num_points, method, cache=None, curve=None):
+    # Wertet die Interpolation der Kurve an num_points gleichabständigen H-Werten aus. Mit cache wird der
+    # Interpolator unter dem Namen curve wiederverwendet (z.B. bei geänderter Punktzahl).
+    if cache is not None:
+        interpolator = cache.get(curve, H, B, method)
+    else:
+        interpolator = fit_interpolator(H, B, method)
+    H_new = np.linspace(interpolator.x[0], interpolator.x[-1], num_points)
+    B_new = interpolator(H_new)
+    return H_new, B_new
+
+def point_distribution(interpolator, method):
+    # Gibt eine Funktion zurück, die num_points H-Werte dicht im Knie und dünn in der Sättigung verteilt.
+    # Der Interpolationsfehler zwischen zwei Punkten wächst mit h^k * |B^(k)| (k = 4 kubisch, 3 quadratisch);
+    # bei einer Punktdichte proportional zu |B^(k)|^(1/k) ist er überall etwa gleich groß.
+    # Die Randpunkte sind immer enthalten.
+    order = DENSITY_ORDER[method]
+    grid = np.linspace(interpolator.x[0], interpolator.x[-1], DENSITY_GRID)
+    derivative = interpolator(grid)
+    for _ in range(order):
+        derivative = np.gradient(derivative, grid)
+    density = np.abs(derivative) ** (1 / order)
+    density += DENSITY_FLOOR * density.mean() + np.finfo(float).tiny
+    cumulative = np.concatenate(([0.0], np.cumsum((density[1:] + density[:-1]) / 2 * np.diff(grid))))
+    cumulative /= cumulative[-1]
+    return lambda num_points: np.interp(np.linspace(0, 1, num_points), cumulative, grid)
+
+def reduce_points(H, B, max_error, method, relative=False, cache=None, curve=None, max_points=None):
+    # Kleinste adaptiv verteilte Tabelle, deren Interpolation mit method die Originaldaten an allen Original-H-Werten
+    # höchstens um max_error (in T bzw. mit relative=True als Anteil von max|B|) verfehlt.
+    # Gibt (H_new, B_new, erreichte maximale Abweichung) zurück. Sind mindestens so viele Punkte wie im Original
+    # zulässig, werden notfalls die Originalpunkte zurückgegeben (Abweichung 0), sonst BoundNotReached.
+    if cache is not None:
+        interpolator = cache.get(curve, H, B, method)
+    else:
+        interpolator = fit_interpolator(H, B, method)
+    H_check = interpolator.x
+    B_check = interpolator(H_check)
+    bound = max_error * np.max(np.abs(B_check)) if relative else max_error
+    original_allowed = max_points is None or max_points >= len(H_check)
+    max_points = max(MIN_POINTS, min(max_points or len(H_check), len(H_check)))
+    positions = point_distribution(interpolator, method)
+
+    def table(num_points):
+        H_new = positions(num_points)
+        B_new = interpolator(H_new)
+        error = np.max(np.abs(fit_interpolator(H_new, B_new, method)(H_check) - B_check))
+        return H_new, B_new, error
+
+    def fallback(best):
+        if original_allowed:
+            return H_check, B_check, 0.0
+        raise BoundNotReached(f"Maximale Abweichung {bound:.3g} T ist mit {max_points} Punkten nicht erreichbar "
+                              f"(erreicht: {best[2]:.3g} T)")
+
+    # Punktzahl verdoppeln, bis die Schranke eingehalten wird, danach Bisektion
+    low, high = MIN_POINTS - 1, MIN_POINTS
+    best = table(high)
+    while best[2] > bound:
+        if high == max_points:
+            return fallback(best)
+        low, high = high, min(2 * high, max_points)
+        best = table(high)
+    while high - low > 1:
+        middle = (low + high) // 2
+        candidate = table(middle)
+        if candidate[2] <= bound:
+            high, best = middle, candidate
+        else:
+            low = middle
+    # Die Abweichung fällt nicht streng monoton mit der Punktzahl und kann NaN sein (wird von 'best[2] > bound' nicht
+    # erkannt); das Ergebnis wird daher nochmals gegen die Schranke geprüft
+    if not best[2] <= bound:
+        return fallback(best)
+    return best
@@ -0,0 +1,148 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from .datenimport import load_dataframe
+from .filterung import FILTER_PARAMS_FIRST, FILTER_PARAMS_SECOND, first_filter, second_filter
+from .interpolation import DEFAULT_SMOOTHING, interpolate_curve_set, interpolated_dataframe, knee_smoothing, sweep_smoothing
+from .kennwerte import calculate_coercivity, calculate_remanence, loss_area, loss_factor, permeability_curves
+from .kurvensatz import CurveSet
+from .speicherformat import with_output_format, write_table
+
+# Gesamte Auswertung ohne Oberfläche: Import -> Filterung -> Interpolation -> Kennwerte (Br, Hc, μr, Verluste).
+# Aufruf: python -m kennlinie.pipeline DATEI_ODER_ORDNER [...] [--ausgabe ORDNER] [--prozesse N]
+
+# Reihenfolge der Verarbeitungsschritte für den Zeitbericht
+STAGES = ['Import', 'Filterung', 'Interpolation', 'Kennwerte']
+
+def analyse_curves(new_columns, duration=None, density=None):
+    # Kennwerte aus den interpolierten Kurven (H_fine_1: Neukurve, _2: obere, _3: untere Grenzkurve)
+    H_upper, B_upper = new_columns['H_fine_2'], new_columns['B_fine_2']
+    H_lower, B_lower = new_columns['H_fine_3'], new_columns['B_fine_3']
+    H_initial, B_initial = new_columns['H_fine_1'], new_columns['B_fine_1']
+
+    results = {
+        'Br_oben in T': calculate_remanence(H_upper, B_upper),
+        'Br_unten in T': calculate_remanence(H_lower, B_lower),
+        'Hc_negativ in A/m': calculate_coercivity(H_upper, B_upper),
+        'Hc_positiv in A/m': calculate_coercivity(H_lower, B_lower),
+    }
+    # Permeabilität der Neukurve in voller Auflösung
+    _, permeability = permeability_curves(CurveSet([(H_initial, B_initial)]))
+    results['mu_r_max'] = permeability['mu_diff_max'].iloc[0]
+    results['mu_initial'] = permeability['mu_initial'].iloc[0]
+    results['mu_amplitude_max'] = permeability['mu_max'].iloc[0]
+    results['Verlustflaeche in Ws/m3'] = loss_area(H_upper, B_upper, H_lower, B_lower)['total_area']
+    if duration and density and results['Verlustflaeche in Ws/m3'] is not None:
+        loss, frequency, loss_50Hz = loss_factor(results['Verlustflaeche in Ws/m3'], duration, density)
+        results.update({'Verluste in W/kg': loss, 'Frequenz in Hz': frequency, 'Verluste 50 Hz in W/kg': loss_50Hz})
+    return results
+
+def process_file(file_path, output_dir=None, smoothing=DEFAULT_SMOOTHING, output_format=None, use_cache=True,
+                 duration=None, density=None, params_first=FILTER_PARAMS_FIRST, params_second=FILTER_PARAMS_SECOND):
+    # Verarbeitet eine Exportdatei vollständig und gibt eine Zeile für die Zusammenfassung zurück
+    # (Kennwerte, Zeiten je Verarbeitungsschritt, Fehler). Mit output_dir wird die interpolierte Kennlinie gespeichert.
+    summary = {'Datei': os.path.basename(file_path), 'Kennlinie': None, 'Zeilen': 0,
+               'Groesse in MB': os.path.getsize(file_path) / 1e6, 'Fehler': None}
+    timings = {}
+    start = time.perf_counter()
+    try:
+        df, _, _, Kennlinienwerte = load_dataframe(file_path, use_cache)
+        timings['Import'] = time.perf_counter() - start
+        if df is None:
+            raise ValueError("Datensatz nicht gefunden")
+        summary.update({'Kennlinie': Kennlinienwerte, 'Zeilen': len(df)})
+
+        step = time.perf_counter()
+        final_columns = second_filter(first_filter(CurveSet.from_dataframe(df), params_first), params_second)
+        timings['Filterung'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        filtered = CurveSet([(final_columns[f'H_refiltered_{i}'], final_columns[f'B_filtered_{i}']) for i in range(3)])
+        # 'auto': Glättung je Kurve wählen (ohne weitere Prozesse, die Dateien laufen bereits parallel)
+        automatic = smoothing == 'auto'
+        curve_smoothing = knee_smoothing(sweep_smoothing(filtered, workers=1)) if automatic else smoothing
+        new_columns, _ = interpolate_curve_set(filtered, curve_smoothing)
+        if output_dir:
+            new_dataframe = interpolated_dataframe(new_columns, df.attrs, curve_smoothing, automatic)
+            new_dataframe.attrs.update({'Filterparameter_erste': params_first, 'Filterparameter_zweite': params_second})
+            name = f"{os.path.splitext(os.path.basename(file_path))[0]}_interpoliert.csv"
+            write_table(new_dataframe, os.path.join(output_dir, with_output_format(name, output_format)), Quelldatei=os.path.basename(file_path))
+        timings['Interpolation'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        summary.update(analyse_curves(new_columns, duration, density))
+        timings['Kennwerte'] = time.perf_counter() - step
+    except Exception as e:
+        summary['Fehler'] = str(e)
+    for stage in STAGES:
+        summary[f'Zeit {stage} in s'] = timings.get(stage, 0.0)
+    summary['Zeit in s'] = time.perf_counter() - start
+    return summary
+
+def collect_files(paths):
+    # Dateien direkt übernehmen, aus Ordnern alle .txt-Dateien
+    file_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            file_paths += [os.path.join(path, filename) for filename in sorted(os.listdir(path)) if filename.endswith(".txt")]
+        else:
+            file_paths.append(path)
+    return file_paths
+
+def run_pipeline(paths, output_dir=None, workers=None, **options):
+    # Verarbeitet alle Dateien parallel und gibt die Zusammenfassung als DataFrame zurück
+    file_paths = collect_files(paths)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    if workers == 1 or len(file_paths) <= 1:
+        results = [process_file(file_path, output_dir, **options) for file_path in file_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_file, file_path, output_dir, **options) for file_path in file_paths]
+            results = [future.result() for future in futures]
+    summary = pd.DataFrame(results)
+    summary.attrs['Gesamtzeit in s'] = time.perf_counter() - start
+    return summary
+
+def throughput_report(summary):
+    # Durchsatz der gesamten Pipeline und Anteil der einzelnen Verarbeitungsschritte
+    total_time = summary.attrs.get('Gesamtzeit in s', summary['Zeit in s'].sum())
+    ok = summary[summary['Fehler'].isna()]
+    lines = [f"{len(summary)} Dateien ({len(summary) - len(ok)} mit Fehler), {ok['Zeilen'].sum()} Zeilen, "
+             f"{summary['Groesse in MB'].sum():.1f} MB in {total_time:.2f} s",
+             f"Durchsatz: {len(summary) / max(total_time, 1e-9):.2f} Dateien/s, "
+             f"{ok['Zeilen'].sum() / max(total_time, 1e-9):.0f} Zeilen/s, {summary['Groesse in MB'].sum() / max(total_time, 1e-9):.1f} MB/s"]
+    stage_total = sum(summary[f'Zeit {stage} in s'].sum() for stage in STAGES)
+    for stage in STAGES:
+        stage_time = summary[f'Zeit {stage} in s'].sum()
+        lines.append(f"  {stage:<14} {stage_time:8.2f} s ({100 * stage_time / max(stage_total, 1e-9):5.1f} %)")
+    return "\n".join(lines)
+
+def smoothing_argument(text):
+    return text if text == 'auto' else float(text)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Auswertung von Hysteresigraph-Exportdateien ohne Oberfläche")
+    parser.add_argument('pfade', nargs='+', help="Exportdateien (.txt) oder Ordner")
+    parser.add_argument('--ausgabe', metavar='ORDNER', help="Zielordner für interpolierte Kennlinien und Zusammenfassung")
+    parser.add_argument('--prozesse', type=int, default=None, help="Anzahl der Worker-Prozesse (Standard: Anzahl CPU-Kerne)")
+    parser.add_argument('--glaettung', type=smoothing_argument, default=DEFAULT_SMOOTHING,
+                        help="Glättung der Interpolation als Anteil des H-Bereichs oder 'auto' (Wahl je Kurve)")
+    parser.add_argument('--messdauer', type=float, default=None, help="Messdauer in s für die Verlustkennzahl")
+    parser.add_argument('--dichte', type=float, default=None, help="Dichte in kg/m³ für die Verlustkennzahl")
+    parser.add_argument('--format', choices=['csv', 'npz'], default=None, help="Ausgabeformat (Standard: csv bzw. KENNLINIE_FORMAT)")
+    parser.add_argument('--ohne-cache', action='store_true', help="Import-Cache weder lesen noch schreiben")
+    args = parser.parse_args()
+
+    summary = run_pipeline(args.pfade, args.ausgabe, args.prozesse, smoothing=args.glaettung, output_format=args.format,
+                           use_cache=not args.ohne_cache, duration=args.messdauer, density=args.dichte)
+    summary_path = os.path.join(args.ausgabe or '.', 'Pipeline_Zusammenfassung.csv')
+    summary.to_csv(summary_path, index=False)
+    columns = ['Datei', 'Kennlinie', 'Br_oben in T', 'Hc_negativ in A/m', 'mu_r_max', 'Verlustflaeche in Ws/m3', 'Fehler']
+    print(summary[[c for c in columns if c in summary.columns]].to_string(index=False))
+    print()
+    print(throughput_report(summary))
+    print(f"Zusammenfassung gespeichert als '{summary_path}'.")
@@ -0,0 +1,199 @@
+import json
+import locale
+import mmap
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Zugriff auf die Rohdaten der Hysteresigraph-Exporte (.txt).
+# Für sehr große Dateien (lange H(t)-, I(t)-, U(t)-Aufzeichnungen) wird die Datei per mmap durchsucht
+# und der Messwertteil beim ersten Zugriff einmalig in eine binäre Seitendatei (float64, zeilenweise)
+# umgewandelt. Diese wird danach nur noch per np.memmap eingeblendet, sodass Ausschnitte ohne
+# vollständiges Laden der Datei gelesen werden können.
+
+# Zuordnung der Spaltenüberschriften (erste beiden Spalten) zur Art der Kennlinie.
+# Die Exportdateien sind UTF-8 kodiert, werden unter Windows aber mit cp1252 gelesen,
+# daher sind beide Schreibweisen der Umlaute hinterlegt.
+KENNLINIEN = {
+    ('FeldstÃ¤rke in A/m', 'Flussdichte in T'): 'B(H) - Kennlinie',
+    ('Feldstärke in A/m', 'Flussdichte in T'): 'B(H) - Kennlinie',
+    ('Zeit in s', 'FeldstÃ¤rke in A/m'): 'H(t) - Kennlinie',
+    ('Zeit in s', 'Feldstärke in A/m'): 'H(t) - Kennlinie',
+    ('Zeit in s', 'Strom in A'): 'I(t) - Kennlinie',
+    ('Magnetische Spannung, A', 'Magnetischer Fluss, Vs'): 'Phi(Theta) - Kennlinie',
+    ('Strom in A', 'Verketteter magnetischer Fluss in Vs'): 'Psi(i) - Kennlinie',
+    ('Zeit in s', 'Spannung in V'): 'U(t) - Kennlinie',
+}
+
+# Anzahl der Zeilen, die der C-Parser pro Block einliest
+CHUNK_ROWS = 500000
+
+# Version von Einlesen und Bereinigung; bei Änderungen erhöhen, damit zwischengespeicherte Importe neu erzeugt werden
+PARSER_VERSION = 2
+
+# Endungen der Seitendateien (Messwerte als float64 bzw. Beschreibung als JSON)
+SIDECAR_EXTENSION = '.rohdaten.f64'
+SIDECAR_INFO_EXTENSION = '.rohdaten.json'
+
+def determine_kennlinienwerte(column_names_without_prefix):
+    return KENNLINIEN.get(tuple(column_names_without_prefix[:2]), 'Unbekannt')
+
+def find_data_start(file_path):
+    # Sucht per mmap nach der ersten Zeile mit 'Startkurve' und liefert die Zeile davor
+    # (Spaltenüberschriften) sowie die Byte-Position, an der die Messwerte beginnen.
+    if os.path.getsize(file_path) == 0:
+        return None, None
+    with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = mm.find(b'Startkurve')
+        if position < 0:
+            return None, None
+        line_start = mm.rfind(b'\n', 0, position) + 1
+        line_end = mm.find(b'\n', position)
+        data_offset = len(mm) if line_end < 0 else line_end + 1
+        if line_start == 0:
+            return None, data_offset
+        previous_start = mm.rfind(b'\n', 0, line_start - 1) + 1
+        return mm[previous_start:line_start], data_offset
+
+def parse_header(header_line):
+    # Spaltennamen mit NK_/OH_/UH_-Präfix, ohne Präfix und Art der Kennlinie aus der Überschriftenzeile.
+    # Dekodierung wie beim Öffnen im Textmodus, damit die Spaltennamen unverändert bleiben.
+    previous_line = header_line.decode(locale.getpreferredencoding(False)).strip().split('\t')
+    nk_prefix = 'NK_'
+    oh_prefix = 'OH_'
+    uh_prefix = 'UH_'
+    nk_words_with_prefix = [nk_prefix + word for word in previous_line[:2]]
+    oh_words_with_prefix = [oh_prefix + word for word in previous_line[2:4]]
+    uh_words_with_prefix = [uh_prefix + word for word in previous_line[4:]]
+    column_names_with_prefix = nk_words_with_prefix + oh_words_with_prefix + uh_words_with_prefix
+    column_names_without_prefix = previous_line[:2] + previous_line[2:4] + previous_line[4:]
+    return column_names_with_prefix, column_names_without_prefix, determine_kennlinienwerte(column_names_without_prefix)
+
+def iter_data_blocks(file_path, data_offset, num_columns=None, chunksize=CHUNK_ROWS):
+    # Liest die Messwerte ab data_offset blockweise mit dem C-Parser direkt in float64-Arrays.
+    # Nicht numerische Einträge werden zu NaN, leere Felder bleiben in ihrer Spalte.
+    with open(file_path, 'rb') as file:
+        file.seek(data_offset)
+        reader = pd.read_csv(file, sep='\t', header=None, index_col=False, names=range(num_columns) if num_columns else None,
+                             encoding='latin-1', engine='c', skip_blank_lines=True, chunksize=chunksize)
+        for chunk in reader:
+            if any(dtype.kind not in 'fiu' for dtype in chunk.dtypes):
+                chunk = chunk.apply(pd.to_numeric, errors='coerce')
+            yield chunk.to_numpy(dtype=np.float64)
+
+class RawExport:
+    # Lazy-Zugriff auf eine Exportdatei. Kopfzeile und Startposition werden beim Öffnen einmalig bestimmt,
+    # die Messwerte erst beim ersten Zugriff auf eine Spalte (über die Seitendatei).
+
+    def __init__(self, file_path, sidecar_dir=None, chunksize=CHUNK_ROWS):
+        self.file_path = file_path
+        self.chunksize = chunksize
+        header_line, self.data_offset = find_data_start(file_path)
+        if self.data_offset is None:
+            raise ValueError(f"Keine 'Startkurve' in {file_path} gefunden.")
+        if header_line:
+            self.column_names_with_prefix, self.column_names_without_prefix, self.Kennlinienwerte = parse_header(header_line)
+        else:
+            self.column_names_with_prefix, self.column_names_without_prefix, self.Kennlinienwerte = None, None, None
+
+        base = os.path.join(sidecar_dir, os.path.basename(file_path)) if sidecar_dir else file_path
+        self.sidecar_path = base + SIDECAR_EXTENSION
+        self.info_path = base + SIDECAR_INFO_EXTENSION
+        self._values = None
+        self._info = None
+
+    def _source_signature(self):
+        stat = os.stat(self.file_path)
+        return {'groesse': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'offset': self.data_offset}
+
+    def _load_info(self):
+        # Eine vorhandene Seitendatei wird nur verwendet, wenn die Quelldatei seitdem unverändert ist
+        if not (os.path.exists(self.info_path) and os.path.exists(self.sidecar_path)):
+            return None
+        with open(self.info_path, encoding='utf-8') as file:
+            info = json.load(file)
+        if info.get('quelle') != self._source_signature():
+            return None
+        return info
+
+    def build_sidecar(self):
+        # Wandelt den Messwertteil blockweise in die binäre Seitendatei um (begrenzter Speicherbedarf)
+        num_columns = len(self.column_names_with_prefix) if self.column_names_with_prefix else None
+        num_rows = 0
+        valid_lengths = None
+        temp_path = self.sidecar_path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            for block in iter_data_blocks(self.file_path, self.data_offset, num_columns, self.chunksize):
+                if num_columns is None:
+                    num_columns = block.shape[1]
+                if valid_lengths is None:
+                    valid_lengths = np.zeros(num_columns, dtype=np.int64)
+                # Echte Länge je Spalte: Index des letzten gültigen Wertes + 1
+                valid = ~np.isnan(block)
+                has_valid = valid.any(axis=0)
+                last_valid = block.shape[0] - np.argmax(valid[::-1], axis=0)
+                valid_lengths[has_valid] = num_rows + last_valid[has_valid]
+                np.ascontiguousarray(block).tofile(file)
+                num_rows += block.shape[0]
+        os.replace(temp_path, self.sidecar_path)
+
+        info = {
+            'quelle': self._source_signature(),
+            'zeilen': num_rows,
+            'spalten': num_columns or 0,
+            'gueltige_laengen': [] if valid_lengths is None else valid_lengths.tolist(),
+            'Kennlinie': self.Kennlinienwerte,
+        }
+        with open(self.info_path, 'w', encoding='utf-8') as file:
+            json.dump(info, file, ensure_ascii=False)
+        return info
+
+    @property
+    def info(self):
+        if self._info is None:
+            self._info = self._load_info() or self.build_sidecar()
+        return self._info
+
+    @property
+    def values(self):
+        # Alle Messwerte als schreibgeschützte memmap der Form (Zeilen, Spalten)
+        if self._values is None:
+            info = self.info
+            if info['zeilen'] == 0:
+                self._values = np.empty((0, info['spalten']))
+            else:
+                self._values = np.memmap(self.sidecar_path, dtype=np.float64, mode='r', shape=(info['zeilen'], info['spalten']))
+        return self._values
+
+    @property
+    def valid_lengths(self):
+        # Anzahl der Zeilen bis zum letzten gültigen Wert je Spalte (ohne NaN-Auffüllung am Ende)
+        return self.info['gueltige_laengen']
+
+    def __len__(self):
+        return self.info['zeilen']
+
+    def column_index(self, key):
+        if isinstance(key, str):
+            return self.column_names_with_prefix.index(key)
+        return key
+
+    def column(self, key, trim=False):
+        # Spalte als Sicht auf die memmap (keine Kopie). Mit trim=True ohne NaN-Auffüllung am Ende.
+        index = self.column_index(key)
+        values = self.values[:, index]
+        return values[:self.valid_lengths[index]] if trim else values
+
+    def __getitem__(self, key):
+        return self.column(key)
+
+    def to_dataframe(self, rows=slice(None)):
+        # Ausschnitt als DataFrame (kopiert nur die angeforderten Zeilen)
+        return pd.DataFrame(np.array(self.values[rows]), columns=self.column_names_with_prefix)
+
+if __name__ == '__main__':
+    # Erzeugt die Seitendateien für die angegebenen Exportdateien: python -m kennlinie.rohdaten DATEI [DATEI ...]
+    for path in sys.argv[1:]:
+        export = RawExport(path)
+        print(f"{os.path.basename(path)}: {export.Kennlinienwerte}, {len(export)} Zeilen, gültige Längen {export.valid_lengths}")
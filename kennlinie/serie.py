@@ -0,0 +1,156 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .kennwerte import axis_crossings, loop_area, loop_characteristics
+from .kurvensatz import CurveSet
+from .speicherformat import read_table
+
+# Serienauswertung bereits interpolierter Kennlinien (Ausgaben von 2_Interpolation.py bzw. der Pipeline) für
+# ganze Ordner, z.B. alle Messungen einer Fertigungscharge, oder für die Messreihen einer Materialcharakterisierung
+# (Manifest mit Frequenz, Amplitude und Dichte je Schleife). Jede Datei wird in einem eigenen Prozess ausgewertet.
+# Aufruf: python -m kennlinie.serie remanenz ORDNER [...] [--ausgabe DATEI] [--prozesse N]
+#         python -m kennlinie.serie verluste MANIFEST [...] [--ausgabe DATEI] [--prozesse N]
+
+# Dateiendungen der Kurvensätze
+CURVE_EXTENSIONS = ('.csv', '.npz')
+
+# Spalten des Manifests (eine Zeile je Schleife); fehlt 'B_peak in T', wird die gemessene Amplitude verwendet
+MANIFEST_COLUMNS = ['Datei', 'Frequenz in Hz', 'B_peak in T', 'Dichte in kg/m3']
+# Nachkommastellen der gemessenen Amplitude als Zeile der Verlustkarte
+B_PEAK_DECIMALS = 3
+
+# Standardnamen der Ausgabedateien je Auswertung
+DEFAULT_OUTPUTS = {'remanenz': 'Remanenz_Koerzitiv_Serie.csv', 'verluste': 'Verluste_Serie.csv'}
+
+def collect_curve_files(paths):
+    # Dateien direkt übernehmen, aus Ordnern alle .csv- und .npz-Dateien
+    file_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            file_paths += [os.path.join(path, filename) for filename in sorted(os.listdir(path))
+                           if filename.lower().endswith(CURVE_EXTENSIONS)]
+        else:
+            file_paths.append(path)
+    return file_paths
+
+def remanence_row(file_path):
+    # Eine Zeile der Remanenz-/Koerzitivtabelle; Fehler werden in der Spalte 'Fehler' vermerkt
+    row = {'Datei': os.path.basename(file_path), 'Kennlinie': None}
+    error = None
+    try:
+        df = read_table(file_path)
+        row['Kennlinie'] = df.attrs.get('Kennlinie')
+        curve_set = CurveSet.from_dataframe(df)
+        row.update(loop_characteristics(curve_set, crossings=axis_crossings(curve_set)))
+    except Exception as e:
+        error = str(e)
+    row['Fehler'] = error
+    return row
+
+def limit_curves(curve_set):
+    # Obere und untere Grenzkurve (ohne Neukurve, falls vorhanden)
+    if len(curve_set) >= 3:
+        return curve_set[1], curve_set[2]
+    return curve_set[0], curve_set[1]
+
+def loss_row(entry):
+    # Schleifenenergie und spezifische Verluste einer Manifest-Zeile: W = umschlossene Fläche in Ws/m³ je Zyklus,
+    # P = W * f / Dichte in W/kg. B_peak gemessen: halbe Spannweite von B auf den Grenzkurven.
+    row = {'Datei': os.path.basename(entry['Datei']), 'Frequenz in Hz': entry['Frequenz in Hz'],
+           'B_peak in T': entry.get('B_peak in T'), 'Dichte in kg/m3': entry['Dichte in kg/m3']}
+    error = None
+    try:
+        (H_upper, B_upper), (H_lower, B_lower) = limit_curves(CurveSet.from_dataframe(read_table(entry['Datei'])))
+        energy = loop_area(H_upper, B_upper, H_lower, B_lower)
+        B = np.concatenate((B_upper, B_lower))
+        row['B_peak gemessen in T'] = (np.nanmax(B) - np.nanmin(B)) / 2
+        if row['B_peak in T'] is None or np.isnan(row['B_peak in T']):
+            row['B_peak in T'] = round(row['B_peak gemessen in T'], B_PEAK_DECIMALS)
+        row['Schleifenenergie in Ws/m3'] = energy
+        row['Schleifenenergie in J/kg'] = energy / row['Dichte in kg/m3']
+        row['Verluste in W/kg'] = energy * row['Frequenz in Hz'] / row['Dichte in kg/m3']
+    except Exception as e:
+        error = str(e)
+    row['Fehler'] = error
+    return row
+
+def run_series(row_function, items, workers=None, progress=None):
+    # Wertet alle Einträge (Dateipfade bzw. Manifest-Zeilen) mit row_function parallel aus und gibt die Tabelle
+    # (eine Zeile je Messung) zurück. progress(Anteil) wird nach jeder ausgewerteten Messung aufgerufen; eine
+    # Ausnahme darin (z.B. Abbruch) verwirft die noch ausstehenden Messungen.
+    start = time.perf_counter()
+    rows = []
+    if workers == 1 or len(items) <= 1:
+        for done, item in enumerate(items, start=1):
+            rows.append(row_function(item))
+            if progress is not None:
+                progress(done / len(items))
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            for done, row in enumerate(executor.map(row_function, items, chunksize=max(1, len(items) // 64)), start=1):
+                rows.append(row)
+                if progress is not None:
+                    progress(done / len(items))
+        finally:
+            executor.shutdown(cancel_futures=True)
+    table = pd.DataFrame(rows)
+    table.attrs['Gesamtzeit in s'] = time.perf_counter() - start
+    return table
+
+def remanence_table(paths, workers=None, progress=None):
+    # Br+, Br-, Hc+, Hc- und Asymmetrie je Messung für alle Dateien in paths
+    return run_series(remanence_row, collect_curve_files(paths), workers, progress)
+
+def read_manifest(manifest_path):
+    # Manifest als CSV (Trennzeichen wird erkannt); relative Dateipfade gelten ab dem Ordner des Manifests
+    manifest = pd.read_csv(manifest_path, sep=None, engine='python')
+    missing = [column for column in MANIFEST_COLUMNS if column != 'B_peak in T' and column not in manifest.columns]
+    if missing:
+        raise ValueError(f"Im Manifest '{manifest_path}' fehlen die Spalten: {', '.join(missing)}")
+    if 'B_peak in T' not in manifest.columns:
+        manifest['B_peak in T'] = np.nan
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    manifest['Datei'] = [os.path.join(base_dir, path) for path in manifest['Datei']]
+    return manifest[MANIFEST_COLUMNS].to_dict('records')
+
+def loss_table(manifest_paths, workers=None, progress=None):
+    # Schleifenenergie und spezifische Verluste für alle Schleifen der Manifeste
+    entries = [entry for manifest_path in manifest_paths for entry in read_manifest(manifest_path)]
+    return run_series(loss_row, entries, workers, progress)
+
+def loss_map(table, values='Verluste in W/kg'):
+    # Verlustkarte: values über B_peak (Zeilen) und Frequenz (Spalten); mehrfach gemessene Punkte werden gemittelt
+    valid = table[table['Fehler'].isna()]
+    return valid.pivot_table(index='B_peak in T', columns='Frequenz in Hz', values=values, aggfunc='mean')
+
+def map_path(output_path):
+    return f"{os.path.splitext(output_path)[0]}_Karte.csv"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serienauswertung interpolierter Kennlinien")
+    parser.add_argument('auswertung', choices=list(DEFAULT_OUTPUTS),
+                        help="remanenz: Br, Hc und Asymmetrie je Messung; verluste: Verlustkarte aus Manifesten")
+    parser.add_argument('pfade', nargs='+', help="Kurvensätze (.csv/.npz) oder Ordner bzw. Manifeste (Datei, "
+                                                 "Frequenz in Hz, B_peak in T, Dichte in kg/m3)")
+    parser.add_argument('--ausgabe', default=None, help="Zieldatei der Tabelle (Standard: Remanenz_Koerzitiv_Serie.csv "
+                                                        "bzw. Verluste_Serie.csv, Verlustkarte in *_Karte.csv)")
+    parser.add_argument('--prozesse', type=int, default=None, help="Anzahl der Worker-Prozesse (Standard: Anzahl CPU-Kerne)")
+    args = parser.parse_args()
+
+    output_path = args.ausgabe or DEFAULT_OUTPUTS[args.auswertung]
+    if args.auswertung == 'remanenz':
+        table = remanence_table(args.pfade, args.prozesse)
+    else:
+        table = loss_table(args.pfade, args.prozesse)
+        losses = loss_map(table)
+        losses.to_csv(map_path(output_path))
+        print("Verluste in W/kg (Zeilen: B_peak in T, Spalten: Frequenz in Hz):")
+        print(losses.to_string())
+        print(f"Verlustkarte gespeichert als '{map_path(output_path)}'.")
+    table.to_csv(output_path, index=False)
+    print(table.to_string(index=False))
+    print(f"{len(table)} Dateien in {table.attrs['Gesamtzeit in s']:.2f} s ausgewertet, Tabelle gespeichert als '{output_path}'.")
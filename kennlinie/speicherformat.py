@@ -0,0 +1,109 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Binäres Zwischenformat für die Übergabe zwischen den Verarbeitungsschritten.
+# Eine .npz-Datei enthält jede Spalte als eigenes float64-Array (verlustfrei, ohne Textumwandlung)
+# sowie die Spaltennamen und Metadaten (Art der Kennlinie, Filterparameter, Quelldatei, ...) als JSON.
+# NaN-Auffüllung am Spaltenende wird nicht gespeichert, sondern beim Lesen wiederhergestellt.
+# CSV-Dateien können keine Metadaten enthalten; sie werden daneben in DATEI.csv.meta.json abgelegt.
+
+BINARY_EXTENSION = '.npz'
+CSV_EXTENSION = '.csv'
+METADATA_KEY = '__metadaten__'
+ZIP_MAGIC = b'PK\x03\x04'
+METADATA_SIDECAR_EXTENSION = '.meta.json'
+
+# Standardformat für Ausgaben mit festem Dateinamen, umschaltbar über die Umgebungsvariable KENNLINIE_FORMAT=npz
+DEFAULT_FORMAT = os.environ.get('KENNLINIE_FORMAT', 'csv').lower().lstrip('.')
+
+# Dateitypen für die Tk-Dateidialoge
+FILETYPES = [("CSV files", "*.csv"), ("NPZ files", "*.npz"), ("All files", "*.*")]
+
+def is_binary_file(file_path):
+    # Erkennung am Dateiinhalt (npz ist ein Zip-Archiv), unabhängig von der Dateiendung
+    with open(file_path, 'rb') as file:
+        return file.read(4) == ZIP_MAGIC
+
+def with_output_format(file_path, output_format=None):
+    # Ersetzt die Dateiendung entsprechend dem gewählten Ausgabeformat
+    output_format = (output_format or DEFAULT_FORMAT).lower().lstrip('.')
+    extension = BINARY_EXTENSION if output_format == 'npz' else CSV_EXTENSION
+    return os.path.splitext(file_path)[0] + extension
+
+def json_default(value):
+    # numpy-Werte in Metadaten (z.B. np.float64, Arrays von Parametern) als Python-Werte speichern
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+def dump_metadata(metadata):
+    return json.dumps(metadata, ensure_ascii=False, default=json_default)
+
+def write_binary(df, file_path, metadata=None):
+    arrays = {}
+    for i, column in enumerate(df.columns):
+        values = df.iloc[:, i].to_numpy()
+        if values.dtype.kind not in 'fiub':
+            raise ValueError(f"Spalte '{column}' ist nicht numerisch und kann nicht binär gespeichert werden.")
+        if values.dtype.kind == 'f' and len(values) and np.isnan(values[-1]):
+            valid = np.flatnonzero(~np.isnan(values))
+            values = values[:valid[-1] + 1 if len(valid) else 0]
+        arrays[f'spalte_{i}'] = values
+    # Spaltennamen als Liste in Spaltenreihenfolge (doppelte Namen und Zahlen als Namen bleiben erhalten)
+    header = {'spalten': list(df.columns), 'zeilen': len(df), 'metadaten': metadata or {}}
+    arrays[METADATA_KEY] = np.array(dump_metadata(header))
+    # np.savez hängt sonst selbst '.npz' an
+    with open(file_path, 'wb') as file:
+        np.savez(file, **arrays)
+
+def read_binary(file_path):
+    with np.load(file_path, allow_pickle=False) as archive:
+        header = json.loads(str(archive[METADATA_KEY]))
+        columns = [archive[f'spalte_{i}'] for i in range(len(header['spalten']))]
+    num_rows = header.get('zeilen', max((len(values) for values in columns), default=0))
+    for i, values in enumerate(columns):
+        if len(values) < num_rows:
+            columns[i] = np.concatenate([values, np.full(num_rows - len(values), np.nan)])
+    df = pd.DataFrame(dict(enumerate(columns)), index=pd.RangeIndex(num_rows))
+    df.columns = header['spalten']
+    df.attrs.update(header['metadaten'])
+    return df
+
+def write_table(df, file_path, **metadata):
+    # Speichert den DataFrame je nach Dateiendung als CSV oder binär (.npz).
+    # Metadaten aus df.attrs werden übernommen und durch die übergebenen Werte ergänzt.
+    if file_path.lower().endswith(BINARY_EXTENSION):
+        write_binary(df, file_path, {**df.attrs, **metadata})
+    else:
+        df.to_csv(file_path, index=False)
+        write_sidecar(file_path, {**df.attrs, **metadata})
+
+def write_sidecar(file_path, metadata):
+    # Metadaten einer CSV-Datei; eine veraltete Begleitdatei wird entfernt, wenn keine Metadaten vorliegen
+    sidecar_path = file_path + METADATA_SIDECAR_EXTENSION
+    if metadata:
+        with open(sidecar_path, 'w', encoding='utf-8') as file:
+            file.write(dump_metadata(metadata))
+    elif os.path.exists(sidecar_path):
+        os.remove(sidecar_path)
+
+def read_sidecar(file_path):
+    sidecar_path = file_path + METADATA_SIDECAR_EXTENSION
+    if not os.path.exists(sidecar_path):
+        return {}
+    with open(sidecar_path, encoding='utf-8') as file:
+        return json.load(file)
+
+def read_table(file_path):
+    # Liest CSV- oder Binärdateien; das Format wird am Inhalt erkannt. Metadaten stehen in df.attrs.
+    if is_binary_file(file_path):
+        df = read_binary(file_path)
+    else:
+        df = pd.read_csv(file_path)
+        df.attrs.update(read_sidecar(file_path))
+    df.attrs['Eingabedatei'] = os.path.basename(file_path)
+    return df
@@ -0,0 +1,171 @@
+import argparse
+import os
+import struct
+import time
+import numpy as np
+from .kurvensatz import CurveSet
+from .modifikation import fit_interpolator
+from .speicherformat import read_table
+
+# Nachschlagetabellen B(H) und H(B) für Simulationsprogramme (FEM, Netzwerksimulation), die die Kennlinie
+# sehr oft abfragen. Die Tabellen sind monoton und gleichabständig: der Index einer Abfrage wird direkt
+# berechnet (O(1), keine Suche), dazwischen wird linear interpoliert.
+# Aufruf: python -m kennlinie.tabellen DATEI [--ausgabe ORDNER] [--punkte N]
+
+# Stützstellen je Tabelle
+DEFAULT_TABLE_POINTS = 4096
+
+# Binärformat: Kopf (Kennung, Anzahl n, x0, Schrittweite als little-endian) und n float32-Werte
+BINARY_MAGIC = b'KLT1'
+BINARY_HEADER = struct.Struct('<4sIdd')
+
+# Textformate für FEM-Programme: Spaltenreihenfolge und Kopfzeile
+TEXT_FORMATS = {
+    'femm': {'columns': ('B', 'H'), 'header': None},
+    'comsol': {'columns': ('H', 'B'), 'header': '% {0} {1}'},
+}
+UNITS = {'H': 'H [A/m]', 'B': 'B [T]'}
+# FEMM erwartet eine Kurve im ersten Quadranten ab (0, 0) mit steigendem B; zulässiges |B(0)| als Anteil von max|B|
+FEMM_ORIGIN_TOLERANCE = 0.01
+# Nachkommastellen von B in der FEMM-Tabelle (passend zu fmt '%.9g'), damit B auch nach dem Schreiben streng steigt
+FEMM_B_DECIMALS = 8
+
+class LookupTable:
+    # Werte y an den Stellen x0 + i * step. Außerhalb des Tabellenbereichs wird mit der Steigung des
+    # ersten bzw. letzten Abschnitts linear fortgesetzt.
+    def __init__(self, x0, step, values, x_name='H', y_name='B'):
+        self.x0 = float(x0)
+        self.step = float(step)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.x_name = x_name
+        self.y_name = y_name
+        self._inverse_step = 1 / self.step
+        self._slopes = np.diff(self.values)
+
+    @property
+    def x(self):
+        return self.x0 + self.step * np.arange(len(self.values))
+
+    def __call__(self, x):
+        # Stapelauswertung mit möglichst wenigen Zwischenarrays (Steigungen je Abschnitt sind vorberechnet).
+        # Einzelne Abfragen werden als Array mit einem Element gerechnet und als Skalar zurückgegeben.
+        scalar = np.ndim(x) == 0
+        position = np.atleast_1d(np.asarray(x, dtype=np.float64)) - self.x0
+        position *= self._inverse_step
+        index = position.astype(np.intp)
+        np.clip(index, 0, len(self.values) - 2, out=index)
+        position -= index
+        result = self._slopes.take(index)
+        result *= position
+        result += self.values.take(index)
+        return result[0] if scalar else result
+
+def build_tables(source, num_points=DEFAULT_TABLE_POINTS):
+    # Tabellen B(H) und H(B) aus einer Interpolationsfunktion mit Attribut x (CubicSpline, interp1d, ...).
+    # B wird vor dem Invertieren monoton steigend gemacht (kleine Welligkeit der Quelle).
+    H = np.linspace(source.x[0], source.x[-1], num_points)
+    B = np.maximum.accumulate(source(H))
+    forward = LookupTable(H[0], H[1] - H[0], B, 'H', 'B')
+    # Für gleiche B-Werte gilt das erste H
+    B_unique, first = np.unique(B, return_index=True)
+    if len(B_unique) < 2:
+        raise ValueError("Die Kennlinie ist konstant und kann nicht invertiert werden.")
+    B_grid = np.linspace(B_unique[0], B_unique[-1], num_points)
+    inverse = LookupTable(B_grid[0], B_grid[1] - B_grid[0], np.interp(B_grid, B_unique, H[first]), 'B', 'H')
+    return forward, inverse
+
+def check_table(table, source, inverse=False, num_queries=1_000_000, seed=0):
+    # Wertet num_queries zufällige Abfragen im Tabellenbereich als Stapel aus und vergleicht mit der Quelle.
+    # Abweichung in der Einheit von B: bei B(H) |Tabelle - Quelle|, bei H(B) |Quelle(Tabelle(B)) - B|.
+    # Sie enthält auch die Glättung nicht monotoner Abschnitte der Quelle (Überschwinger der Spline).
+    x_max = table.x0 + table.step * (len(table.values) - 1)
+    queries = np.random.default_rng(seed).uniform(table.x0, x_max, num_queries)
+    start = time.perf_counter()
+    result = table(queries)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    reference = source(result if inverse else queries)
+    elapsed_source = time.perf_counter() - start
+    deviation = np.max(np.abs(reference - queries)) if inverse else np.max(np.abs(result - reference))
+    return {'Abfragen/s': num_queries / max(elapsed, 1e-12),
+            'Abfragen/s Quelle': num_queries / max(elapsed_source, 1e-12),
+            'Max. Abweichung in T': deviation}
+
+def write_binary_table(table, file_path):
+    with open(file_path, 'wb') as file:
+        file.write(BINARY_HEADER.pack(BINARY_MAGIC, len(table.values), table.x0, table.step))
+        file.write(table.values.astype('<f4').tobytes())
+
+def read_binary_table(file_path, x_name='H', y_name='B'):
+    with open(file_path, 'rb') as file:
+        magic, num_points, x0, step = BINARY_HEADER.unpack(file.read(BINARY_HEADER.size))
+        if magic != BINARY_MAGIC:
+            raise ValueError(f"'{file_path}' ist keine Kennlinientabelle.")
+        values = np.frombuffer(file.read(4 * num_points), dtype='<f4')
+    return LookupTable(x0, step, values, x_name, y_name)
+
+def femm_curve(table):
+    # Erster Quadrant der Tabelle B(H) ab (0, 0) mit streng steigendem B. Nur Kurven, die im Ursprung bzw. bei ihrem
+    # kleinsten positiven H nahe B = 0 beginnen (Neukurve, Kommutierungskurve), sind geeignet; Hystereseäste
+    # (B(0) = Remanenz) werden mit ValueError abgelehnt.
+    H, B = table.x, table.values
+    if H[-1] <= 0:
+        raise ValueError("Die Kennlinie hat keine Punkte mit H > 0 und ist für FEMM nicht geeignet.")
+    B_start = float(np.interp(0.0, H, B))
+    if abs(B_start) > FEMM_ORIGIN_TOLERANCE * np.max(np.abs(B)):
+        raise ValueError(f"Die Kennlinie beginnt nicht im Ursprung (B = {B_start:.3g} T bei H = {max(H[0], 0.0):.3g} A/m) "
+                         f"und ist für FEMM nicht geeignet (nur Neukurven).")
+    positive = H > 0
+    H = np.concatenate(([0.0], H[positive]))
+    B = np.round(np.concatenate(([0.0], np.maximum(B[positive], 0.0))), FEMM_B_DECIMALS)
+    rising = np.concatenate(([True], np.diff(B) > 0))
+    return H[rising], B[rising]
+
+def write_text_table(table, file_path, text_format='comsol'):
+    # Zweispaltige Tabelle im Textformat des FEM-Programms (femm: B H ab (0, 0), comsol: H B mit Kopfzeile)
+    spec = TEXT_FORMATS[text_format]
+    if text_format == 'femm':
+        H, B = femm_curve(table)
+        data = {'H': H, 'B': B}
+    else:
+        data = {table.x_name: table.x, table.y_name: table.values}
+    header = spec['header'].format(*(UNITS[name] for name in spec['columns'])) if spec['header'] else ''
+    np.savetxt(file_path, np.column_stack([data[name] for name in spec['columns']]), fmt='%.9g',
+               delimiter='\t', header=header, comments='')
+
+def export_tables(source, output_dir, name, num_points=DEFAULT_TABLE_POINTS, text_formats=('femm', 'comsol')):
+    # Schreibt B(H) und H(B) binär sowie B(H) in den Textformaten; gibt die Prüfergebnisse je Tabelle zurück.
+    # Für das Textformat ungeeignete Kurven (z.B. Hystereseäste für FEMM) werden übersprungen und mit dem Grund
+    # im Bericht vermerkt.
+    forward, inverse = build_tables(source, num_points)
+    report = {}
+    for table, suffix, is_inverse in ((forward, 'BH', False), (inverse, 'HB', True)):
+        report[suffix] = check_table(table, source, inverse=is_inverse)
+        write_binary_table(table, os.path.join(output_dir, f'{name}_{suffix}.bin'))
+    for text_format in text_formats:
+        try:
+            write_text_table(forward, os.path.join(output_dir, f'{name}_BH_{text_format}.txt'), text_format)
+        except ValueError as e:
+            report[f'BH_{text_format}'] = f"nicht geschrieben: {e}"
+    return report
+
+def format_report(name, report):
+    return "\n".join(f"{name} {suffix}: {values}" if isinstance(values, str) else
+                     f"{name} {suffix}: {values['Abfragen/s'] / 1e6:.1f} Mio. Abfragen/s "
+                     f"(Spline: {values['Abfragen/s Quelle'] / 1e6:.1f} Mio.), "
+                     f"max. Abweichung {values['Max. Abweichung in T']:.2e} T"
+                     for suffix, values in report.items())
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Nachschlagetabellen B(H) und H(B) aus modifizierten Kennlinien")
+    parser.add_argument('datei', help="Kennlinien mit Spaltenpaaren H, B (z.B. modified_data_cubic.csv)")
+    parser.add_argument('--ausgabe', metavar='ORDNER', default='.', help="Zielordner der Tabellen")
+    parser.add_argument('--punkte', type=int, default=DEFAULT_TABLE_POINTS, help="Stützstellen je Tabelle")
+    args = parser.parse_args()
+
+    os.makedirs(args.ausgabe, exist_ok=True)
+    df = read_table(args.datei)
+    base_name = os.path.splitext(os.path.basename(args.datei))[0]
+    for i, (H, B) in enumerate(CurveSet.from_dataframe(df), start=1):
+        name = f'{base_name}_{df.columns[2 * (i - 1) + 1]}'
+        print(format_report(name, export_tables(fit_interpolator(H, B, 'cubic'), args.ausgabe, name, args.punkte)))
@@ -0,0 +1,169 @@
+import argparse
+import json
+import numpy as np
+import pandas as pd
+from scipy.optimize import nnls
+
+# Verlustmodelle für die spezifischen Ummagnetisierungsverluste P(f, B_peak) in W/kg, angepasst an die Schleifen-
+# energien einer Messreihe (Tabelle von kennlinie.serie verluste). Ersetzt die lineare Hochrechnung auf 50 Hz,
+# die Wirbelstrom- und Zusatzverluste nicht richtig abbildet.
+#   Steinmetz:  P = k f^alpha B^beta
+#   Bertotti:   W = k_h B^beta_h + k_c f B^2 + k_e f^0.5 B^1.5 (Energie je Zyklus in J/kg: Hysterese-, Wirbelstrom-
+#               und Zusatzverluste), P = W f
+# Aufruf: python -m kennlinie.verlustmodell VERLUSTTABELLE [...] [--ausgabe DATEI] [--frequenz F ...] [--b-peak B ...]
+
+# Exponenten der Hystereseverluste, unter denen beim Bertotti-Modell der mit dem kleinsten Fehler gewählt wird
+HYSTERESIS_EXPONENTS = np.linspace(1.4, 2.6, 121)
+
+def fit_errors(predicted, measured):
+    # Relative Abweichung des Modells von den Messwerten
+    relative = predicted / measured - 1
+    return {'RMS rel. Abweichung': float(np.sqrt(np.mean(relative ** 2))), 'Max. rel. Abweichung': float(np.max(np.abs(relative)))}
+
+class SteinmetzModel:
+    name = 'Steinmetz'
+
+    def __init__(self, k, alpha, beta, errors=None):
+        self.k = float(k)
+        self.alpha = float(alpha)
+        self.beta = float(beta)
+        self.errors = errors or {}
+        self._log_k = np.log(self.k)
+
+    def predict(self, f, B_peak):
+        # P in W/kg; Stapelauswertung als exp(ln k + alpha ln f + beta ln B) mit möglichst wenigen Zwischenarrays
+        result = np.log(np.asarray(f, dtype=np.float64))
+        result *= self.alpha
+        result = result + self.beta * np.log(np.asarray(B_peak, dtype=np.float64))
+        result += self._log_k
+        # Skalare Eingaben ergeben einen Skalar (ohne out=, das nur für Arrays zulässig ist)
+        return np.exp(result, out=result) if isinstance(result, np.ndarray) else np.exp(result)
+
+    def parameters(self):
+        return {'k': self.k, 'alpha': self.alpha, 'beta': self.beta}
+
+class BertottiModel:
+    name = 'Bertotti'
+
+    def __init__(self, k_h, beta_h, k_c, k_e, errors=None):
+        self.k_h = float(k_h)
+        self.beta_h = float(beta_h)
+        self.k_c = float(k_c)
+        self.k_e = float(k_e)
+        self.errors = errors or {}
+
+    def energy(self, f, B_peak):
+        # Energie je Zyklus in J/kg
+        f = np.asarray(f, dtype=np.float64)
+        B_peak = np.asarray(B_peak, dtype=np.float64)
+        sqrt_B = np.sqrt(B_peak)
+        result = np.sqrt(f) * (self.k_e * sqrt_B)
+        result += self.k_c * f * B_peak
+        result *= B_peak
+        result += self.k_h * np.exp(self.beta_h * np.log(B_peak))
+        return result
+
+    def separation(self, f, B_peak):
+        # Anteile von Hysterese-, Wirbelstrom- und Zusatzverlusten an P in W/kg
+        f = np.asarray(f, dtype=np.float64)
+        B_peak = np.asarray(B_peak, dtype=np.float64)
+        return {'Hysterese': self.k_h * B_peak ** self.beta_h * f, 'Wirbelstrom': self.k_c * f ** 2 * B_peak ** 2,
+                'Zusatz': self.k_e * f ** 1.5 * B_peak ** 1.5}
+
+    def predict(self, f, B_peak):
+        # P in W/kg
+        result = self.energy(f, B_peak)
+        result *= f
+        return result
+
+    def parameters(self):
+        return {'k_h': self.k_h, 'beta_h': self.beta_h, 'k_c': self.k_c, 'k_e': self.k_e}
+
+MODELS = {model.name: model for model in (SteinmetzModel, BertottiModel)}
+
+def fit_steinmetz(f, B_peak, P):
+    # Lineare Ausgleichsrechnung in logarithmischen Koordinaten: ln P = ln k + alpha ln f + beta ln B
+    f, B_peak, P = (np.asarray(values, dtype=np.float64) for values in (f, B_peak, P))
+    design = np.column_stack((np.ones_like(f), np.log(f), np.log(B_peak)))
+    (log_k, alpha, beta), *_ = np.linalg.lstsq(design, np.log(P), rcond=None)
+    model = SteinmetzModel(np.exp(log_k), alpha, beta)
+    model.errors = fit_errors(model.predict(f, B_peak), P)
+    return model
+
+def fit_bertotti(f, B_peak, W, exponents=HYSTERESIS_EXPONENTS):
+    # Für alle Hysterese-Exponenten gleichzeitig: gewichtete lineare Ausgleichsrechnung für k_h, k_c, k_e (relative
+    # Abweichung von W, da W über mehrere Größenordnungen reicht) über die gestapelten Normalgleichungen.
+    # Gewählt wird der Exponent mit dem kleinsten Fehler und nicht negativen Koeffizienten; gibt es keinen,
+    # wird je Exponent mit nicht negativen kleinsten Quadraten gerechnet. Sind die Normalgleichungen singulär
+    # (z.B. nur eine Frequenz oder mehrfach gemessene Punkte), wird je Exponent mit lstsq gerechnet.
+    f, B_peak, W = (np.asarray(values, dtype=np.float64) for values in (f, B_peak, W))
+    if len(W) < 3:
+        raise ValueError("Für das Bertotti-Modell werden mindestens drei Schleifen benötigt.")
+    exponents = np.asarray(exponents, dtype=np.float64)
+    design = np.empty((len(exponents), len(W), 3))
+    design[:, :, 0] = B_peak ** exponents[:, None]
+    design[:, :, 1] = f * B_peak ** 2
+    design[:, :, 2] = np.sqrt(f) * B_peak ** 1.5
+    design /= W[:, None]
+    gram = np.einsum('mni,mnj->mij', design, design)
+    right = design.sum(axis=1)
+    try:
+        coefficients = np.linalg.solve(gram, right[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        coefficients = np.array([np.linalg.lstsq(design[m], np.ones(len(W)), rcond=None)[0] for m in range(len(exponents))])
+    residuals = np.sum((np.einsum('mni,mi->mn', design, coefficients) - 1) ** 2, axis=1)
+    residuals[np.any(coefficients < 0, axis=1)] = np.inf
+    if np.all(np.isinf(residuals)):
+        for m in range(len(exponents)):
+            coefficients[m], residuals[m] = nnls(design[m], np.ones(len(W)))
+    best = int(np.argmin(residuals))
+    k_h, k_c, k_e = coefficients[best]
+    model = BertottiModel(k_h, exponents[best], k_c, k_e)
+    model.errors = fit_errors(model.energy(f, B_peak), W)
+    return model
+
+def fit_models(table):
+    # Beide Modelle aus der Verlusttabelle (Zeilen mit Fehler werden übergangen)
+    valid = table[table['Fehler'].isna()] if 'Fehler' in table.columns else table
+    f, B_peak = valid['Frequenz in Hz'].to_numpy(), valid['B_peak in T'].to_numpy()
+    return {'Steinmetz': fit_steinmetz(f, B_peak, valid['Verluste in W/kg'].to_numpy()),
+            'Bertotti': fit_bertotti(f, B_peak, valid['Schleifenenergie in J/kg'].to_numpy())}
+
+def save_models(models, file_path):
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump({name: {'Parameter': model.parameters(), 'Abweichung': model.errors} for name, model in models.items()},
+                  file, ensure_ascii=False, indent=2)
+
+def load_models(file_path):
+    with open(file_path, encoding='utf-8') as file:
+        data = json.load(file)
+    return {name: MODELS[name](**values['Parameter'], errors=values.get('Abweichung')) for name, values in data.items()}
+
+def format_models(models):
+    lines = []
+    for name, model in models.items():
+        parameters = ", ".join(f"{key} = {value:.5g}" for key, value in model.parameters().items())
+        errors = ", ".join(f"{key} {100 * value:.2f} %" for key, value in model.errors.items())
+        lines.append(f"{name}: {parameters} ({errors})")
+    return "\n".join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Steinmetz- und Bertotti-Verlustmodell aus einer Verlusttabelle")
+    parser.add_argument('tabellen', nargs='+', help="Verlusttabellen von 'python -m kennlinie.serie verluste'")
+    parser.add_argument('--ausgabe', default='Verlustmodell.json', help="Zieldatei der Modellparameter")
+    parser.add_argument('--frequenz', type=float, nargs='*', default=[50.0], help="Frequenzen in Hz für die Vorhersage")
+    parser.add_argument('--b-peak', type=float, nargs='*', default=None, help="Amplituden in T für die Vorhersage "
+                                                                              "(Standard: gemessene Amplituden)")
+    args = parser.parse_args()
+
+    table = pd.concat([pd.read_csv(path) for path in args.tabellen], ignore_index=True)
+    models = fit_models(table)
+    save_models(models, args.ausgabe)
+    print(format_models(models))
+    B_values = args.b_peak or sorted(table['B_peak in T'].dropna().unique())
+    f_grid, B_grid = np.meshgrid(args.frequenz, B_values)
+    prediction = pd.DataFrame({'Frequenz in Hz': f_grid.ravel(), 'B_peak in T': B_grid.ravel()})
+    for name, model in models.items():
+        prediction[f'{name} in W/kg'] = model.predict(prediction['Frequenz in Hz'].to_numpy(), prediction['B_peak in T'].to_numpy())
+    print(prediction.to_string(index=False))
+    print(f"Modellparameter gespeichert als '{args.ausgabe}'.")